@@ -1,29 +1,11 @@
 # Importación de librerías necesarias
-import pandas as pd
-import numpy as np
+import argparse
+from pipeline.ingesta import ingerir_delitos
+from pipeline.carga import tipar_delitos, guardar_artefacto, ruta_artefacto_de
+from pipeline.metricas import etapa
 
-# Función para corregir coordenadas geográficas
-def corregir_coordenadas(lat, lon):
-    try:
-        lat = float(lat)
-        lon = float(lon)
-    except ValueError:
-        return np.nan, np.nan
-
-    # Rango válido para CABA
-    lat_min, lat_max = -34.7, -34.5
-    lon_min, lon_max = -58.6, -58.3
-    
-    # Si la latitud o longitud están fuera de rango, intentar corregir
-    if not (lat_min <= lat <= lat_max):
-        lat = lat / 1e6 if abs(lat) > 90 else lat
-    if not (lon_min <= lon <= lon_max):
-        lon = lon / 1e6 if abs(lon) > 180 else lon
-    
-    # Si después de la corrección sigue fuera de rango, retornar NaN
-    if not (lat_min <= lat <= lat_max) or not (lon_min <= lon <= lon_max):
-        return np.nan, np.nan
-    return lat, lon
+# Carpeta de datos
+dataset_dir = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset'
 
 # Lista de archivos de delitos
 archivos_delitos = [
@@ -31,35 +13,42 @@ archivos_delitos = [
     'delitos_2019.xlsx', 'delitos_2021.xlsx', 'delitos_2022.xlsx', 'delitos_2023.xlsx'
 ]
 
-# Lista para almacenar los dataframes limpios
-datasets_limpios = []
-
-# Carga y limpieza de cada archivo
-for archivo in archivos_delitos:
-    print(f"Cargando y limpiando: {archivo}")
-    df = pd.read_excel(f'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/{archivo}')  # Ruta corregida
-    
-    # Conversión explícita a float
-    df['latitud'] = pd.to_numeric(df['latitud'], errors='coerce')
-    df['longitud'] = pd.to_numeric(df['longitud'], errors='coerce')
-    
-    # Corrección de coordenadas geográficas
-    df[['latitud', 'longitud']] = df.apply(
-        lambda row: corregir_coordenadas(row['latitud'], row['longitud']), axis=1, result_type="expand")
-    
-    # Eliminación de registros con coordenadas NaN
-    df = df.dropna(subset=['latitud', 'longitud'])
-    
-    # Agregar el dataframe limpio a la lista
-    datasets_limpios.append(df)
-
-# Unificación de todos los datasets limpios en un solo DataFrame
-delitos_total = pd.concat(datasets_limpios, ignore_index=True)
-
-# Verificación del dataset final
-print("Número total de delitos después de la limpieza:", delitos_total.shape[0])
-print("Columnas del dataset final:", delitos_total.columns)
-
-# Guardar el DataFrame limpio en un archivo CSV
-delitos_total.to_csv('C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv', index=False)
-print("Archivo CSV generado: delitos_total.csv")
+# Esquema de columnas (tipos conocidos de antemano, sin inferencia)
+esquema_path = f'{dataset_dir}/delitos_2023.xlsx.delitos_2023_revisado.vrt'
+
+# El bloque principal es necesario para usar el pool de procesos en Windows
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Carga y limpieza de los archivos anuales de delitos")
+    parser.add_argument('--completo', action='store_true', help="Volver a leer todos los Excel ignorando la caché")
+    parser.add_argument('--procesos', type=int, default=None, help="Cantidad de procesos para leer los Excel")
+    args = parser.parse_args()
+
+    # Carga incremental: sólo se leen los Excel nuevos o modificados, el resto sale de la caché
+    with etapa('carga_limpieza') as registro:
+        delitos_total, conteos_por_archivo = ingerir_delitos(
+            dataset_dir, archivos_delitos, esquema_path, procesos=args.procesos, forzar=args.completo)
+        registro['filas_entrada'] = sum(c.get('total', 0) for c in conteos_por_archivo.values())
+        registro['filas_salida'] = len(delitos_total)
+
+    # Conteos de calidad de datos por archivo
+    for archivo, conteos in conteos_por_archivo.items():
+        print(f"  {archivo}: {conteos.get('validas')} válidos de {conteos.get('total')} | "
+              f"reescalados: {conteos.get('reescaladas')} | no convertibles: {conteos.get('no_convertibles')} | "
+              f"fuera de rango: {conteos.get('fuera_de_rango')}")
+
+    # Verificación del dataset final
+    print("Número total de delitos después de la limpieza:", delitos_total.shape[0])
+    print("Columnas del dataset final:", delitos_total.columns)
+
+    # Guardar el DataFrame limpio en un archivo CSV
+    with etapa('guardado_csv', len(delitos_total)):
+        delitos_total.to_csv(f'{dataset_dir}/delitos_total.csv', index=False)
+    print("Archivo CSV generado: delitos_total.csv")
+
+    # Guardar también el almacén particionado por anio y tipo que leen los demás scripts
+    almacen_path = ruta_artefacto_de(f'{dataset_dir}/delitos_total.csv')
+    with etapa('guardado_almacen', len(delitos_total)) as registro:
+        delitos_tipados = tipar_delitos(delitos_total.copy())
+        guardar_artefacto(delitos_tipados, almacen_path)
+        registro['filas_salida'] = len(delitos_tipados)
+    print(f"Almacén particionado generado: {almacen_path}")
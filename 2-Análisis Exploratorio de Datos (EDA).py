@@ -1,11 +1,20 @@
 # Análisis Exploratorio de Datos (EDA)
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import folium
 from folium.plugins import HeatMap
 import webbrowser
 import os
+import argparse
+from pipeline.carga import cargar_delitos
+from pipeline.grilla import Grilla, densidad_grilla
+from pipeline.mapas import CELDA_CALOR, generar_teselas, puntos_calor_agregados
+
+# Modo del mapa: puntos agregados por celda (por defecto), teselas PNG o la muestra de puntos crudos
+parser = argparse.ArgumentParser(description="Análisis exploratorio de delitos")
+parser.add_argument('--modo', choices=['agregado', 'teselas', 'muestra'], default='agregado',
+                    help="agregado: un punto ponderado por celda; teselas: PNG para un TileLayer; muestra: 60.000 puntos")
+args = parser.parse_args()
 
 # Configuración de gráficos
 plt.style.use('ggplot')
@@ -14,8 +23,8 @@ plt.style.use('ggplot')
 output_dir = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/EDA'
 os.makedirs(output_dir, exist_ok=True)
 
-# Cargar el archivo consolidado de delitos
-delitos_total = pd.read_csv('C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv')
+# Cargar el archivo consolidado de delitos (artefacto tipado, ya validado)
+delitos_total = cargar_delitos('C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv')
 
 # Verificación rápida del DataFrame
 print("Cantidad de registros en el DataFrame:", len(delitos_total))
@@ -30,40 +39,41 @@ else:
     print("Generando el mapa de calor de densidad delictiva...")
     mapa_delitos = folium.Map(location=[-34.6083, -58.3712], zoom_start=12)
 
-    # Usar una muestra de 60,000 puntos para optimizar el rendimiento
-    sample_delitos = delitos_total.sample(min(60000, len(delitos_total)))
-
-    # Filtrar datos con coordenadas válidas y convertirlas a flotante
-    sample_delitos['latitud'] = pd.to_numeric(sample_delitos['latitud'], errors='coerce')
-    sample_delitos['longitud'] = pd.to_numeric(sample_delitos['longitud'], errors='coerce')
-    sample_delitos = sample_delitos.dropna(subset=['latitud', 'longitud'])
-    sample_delitos = sample_delitos[(sample_delitos['latitud'] != 0) & (sample_delitos['longitud'] != 0)]
-
-    # Filtrar el rango geográfico válido para CABA
-    sample_delitos = sample_delitos[
-        (sample_delitos['latitud'].between(-34.7, -34.5)) &
-        (sample_delitos['longitud'].between(-58.6, -58.3))
-    ]
-
-    # Crear la lista de coordenadas para el mapa de calor
-    heat_data = [[float(row['latitud']), float(row['longitud'])] for _, row in sample_delitos.iterrows()]
+    if args.modo == 'teselas':
+        # Teselas PNG pre-renderizadas desde la grilla fina (se guardan junto al HTML)
+        grilla = Grilla(cell_size=CELDA_CALOR)
+        raster = densidad_grilla(grilla, delitos_total['latitud'], delitos_total['longitud'], bordes='inferior')
+        url_teselas = generar_teselas(grilla, raster, os.path.join(output_dir, 'teselas_delitos'))
+        folium.raster_layers.TileLayer(tiles=url_teselas, attr='Densidad delictiva', name='Densidad delictiva',
+                                       overlay=True, min_zoom=10, max_zoom=15).add_to(mapa_delitos)
+        hay_capa = True
+    else:
+        if args.modo == 'muestra':
+            # Usar una muestra de 60,000 puntos para optimizar el rendimiento
+            sample_delitos = delitos_total.sample(min(60000, len(delitos_total)))
+            heat_data = sample_delitos[['latitud', 'longitud']].astype(float).values.tolist()
+        else:
+            # Todos los registros, agregados en un punto ponderado por celda no vacía
+            heat_data = puntos_calor_agregados(delitos_total['latitud'], delitos_total['longitud'])
 
-    print(f"Cantidad de puntos en el mapa de calor: {len(heat_data)}")
+        print(f"Cantidad de puntos en el mapa de calor: {len(heat_data)}")
 
-    # Verificar si la lista de puntos está vacía
-    if len(heat_data) == 0:
-        print("No hay puntos válidos para el mapa de calor.")
-    else:
-        # Definir el gradiente de colores en hexadecimal
-        gradient = {
-            0.1: '#0000FF',  # Azul
-            0.5: '#00FF00',  # Verde
-            1.0: '#FF0000'   # Rojo
-        }
+        # Verificar si la lista de puntos está vacía
+        hay_capa = len(heat_data) > 0
+        if not hay_capa:
+            print("No hay puntos válidos para el mapa de calor.")
+        else:
+            # Definir el gradiente de colores en hexadecimal
+            gradient = {
+                0.1: '#0000FF',  # Azul
+                0.5: '#00FF00',  # Verde
+                1.0: '#FF0000'   # Rojo
+            }
 
-        # Añadir el mapa de calor con el gradiente personalizado
-        HeatMap(heat_data, radius=8, blur=15, max_zoom=12, gradient=gradient).add_to(mapa_delitos)
+            # Añadir el mapa de calor con el gradiente personalizado
+            HeatMap(heat_data, radius=8, blur=15, max_zoom=12, gradient=gradient).add_to(mapa_delitos)
 
+    if hay_capa:
         # Guardar el mapa
         output_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/EDA/mapa_delitos.html'
         mapa_delitos.save(output_path)
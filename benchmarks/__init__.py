@@ -0,0 +1 @@
+# Benchmarks del pipeline con datos sintéticos (no necesitan los archivos del dataset)
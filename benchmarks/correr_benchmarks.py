@@ -0,0 +1,230 @@
+# Benchmark de todas las etapas del pipeline con datos sintéticos: tiempo y memoria por etapa, en JSON
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.sinteticos import ANIOS, generar_alojamientos, generar_delitos
+from pipeline.carga import cargar_delitos, guardar_artefacto, tipar_delitos
+from pipeline.compilado import compilar_modelo, predecir_proba
+from pipeline.coordenadas import limpiar_coordenadas
+from pipeline import metricas
+from pipeline.entrenamiento import ajustar_final, evaluar_modelos
+from pipeline.grilla import Grilla, densidad_en_puntos, densidad_grilla
+from pipeline.mapas import puntos_calor_agregados
+from pipeline.pesos import pesos_por_anio
+
+TAMANIOS = (100_000, 1_000_000, 10_000_000)
+
+# Una etapa se marca como regresión si tarda o usa memoria más de este factor respecto de la anterior
+UMBRAL_REGRESION = 1.2
+
+# Diferencias de tiempo (segundos) y de memoria (MiB) menores a esto son ruido de medición y no se marcan
+MINIMO_SEGUNDOS = 0.05
+MINIMO_MIB = 8
+
+
+def revision():
+    """Commit actual del repositorio (o None fuera de git)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def etapa(tamanio, nombre, filas_entrada):
+    """Etapa de pipeline/metricas.py con el tamaño del benchmark; el bloque completa 'filas_salida'."""
+    gc.collect()
+    with metricas.etapa(nombre, filas_entrada, tamanio=tamanio) as registro:
+        yield registro
+    print(f"  {nombre:<26} {registro['segundos']:8.3f} s | +{registro['memoria_incremento_mib']:8.1f} MiB "
+          f"(pico {registro['memoria_pico_mib']:.1f}) | {registro['filas_entrada']} -> {registro['filas_salida']} filas")
+
+
+def generar_mapa(ruta, heat_data):
+    # Igual que generar_mapa de porlas.py
+    import folium
+    from folium.plugins import HeatMap
+
+    mapa = folium.Map(location=[-34.6083, -58.3712], zoom_start=12)
+    HeatMap(heat_data, radius=8, blur=15, max_zoom=12).add_to(mapa)
+    mapa.save(ruta)
+
+
+def etapas_delitos(n, directorio, grilla, alojamientos):
+    """Limpieza, consolidación, carga, densidad, búsqueda de alojamientos y mapas por tipo para n delitos."""
+    # Un archivo por año, como los delitos_YYYY.xlsx
+    por_anio = np.full(len(ANIOS), n // len(ANIOS))
+    por_anio[:n % len(ANIOS)] += 1
+    partes = [generar_delitos(int(m), semilla=anio, anio=anio) for anio, m in zip(ANIOS, por_anio)]
+
+    with etapa(n, 'limpieza_coordenadas', n) as r:
+        partes = [limpiar_coordenadas(parte)[0] for parte in partes]
+        r['filas_salida'] = sum(len(p) for p in partes)
+
+    ruta_csv = os.path.join(directorio, f'delitos_{n}.csv')
+    with etapa(n, 'consolidacion', r['filas_salida']) as r:
+        delitos = tipar_delitos(pd.concat(partes, ignore_index=True))
+        del partes
+        guardar_artefacto(delitos, os.path.splitext(ruta_csv)[0])
+        r['filas_salida'] = len(delitos)
+    del delitos
+
+    with etapa(n, 'carga', r['filas_salida']) as r:
+        delitos = cargar_delitos(ruta_csv, columnas=['anio', 'tipo', 'latitud', 'longitud'])
+        r['filas_salida'] = len(delitos)
+
+    with etapa(n, 'densidad_grilla', len(delitos)) as r:
+        raster = densidad_grilla(grilla, delitos['latitud'], delitos['longitud'], pesos_por_anio(delitos['anio']))
+        r['filas_salida'] = int((raster > 0).sum())
+
+    with etapa(n, 'busqueda_alojamientos', len(alojamientos)) as r:
+        densidad = densidad_en_puntos(grilla, raster, alojamientos['latitud'], alojamientos['longitud'])
+        r['filas_salida'] = int((densidad > 0).sum())
+
+    dir_mapas = os.path.join(directorio, f'mapas_{n}')
+    os.makedirs(dir_mapas, exist_ok=True)
+    with etapa(n, 'mapas_por_tipo', len(delitos)) as r:
+        lat = delitos['latitud'].to_numpy(dtype=np.float64)
+        lon = delitos['longitud'].to_numpy(dtype=np.float64)
+        grupos = delitos.groupby('tipo', observed=True).indices
+        for tipo, posiciones in grupos.items():
+            generar_mapa(os.path.join(dir_mapas, f'mapa_delitos_{tipo}.html'),
+                         puntos_calor_agregados(lat[posiciones], lon[posiciones]))
+        r['filas_salida'] = len(grupos)
+    return densidad
+
+
+def etapas_modelos(alojamientos, densidad, procesos):
+    """Clústeres de alojamientos, validación cruzada de los tres modelos y predicción (sklearn y compilada)."""
+    from sklearn.cluster import DBSCAN
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.naive_bayes import GaussianNB
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    n = len(alojamientos)
+    with etapa(None, 'clusters_alojamientos', n) as r:
+        cluster = DBSCAN(eps=0.001, min_samples=5).fit(alojamientos[['latitud', 'longitud']].to_numpy()).labels_
+        r['filas_salida'] = int(len(set(cluster)))
+
+    # Categoría por cuartiles de densidad (los umbrales fijos de 2- densidad.py dependen del tamaño real)
+    cortes = np.quantile(densidad, [0.25, 0.5, 0.75])
+    seguridad = np.array(['Muy Seguro', 'Seguro', 'Moderado', 'Riesgoso'])[np.searchsorted(cortes, densidad)]
+    X = pd.DataFrame({'latitud': alojamientos['latitud'], 'longitud': alojamientos['longitud'],
+                      'densidad': densidad, 'cluster': cluster})
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(seguridad)
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    modelos = {
+        "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42),
+        "Naive Bayes": GaussianNB(),
+        "Red Neuronal": MLPClassifier(hidden_layer_sizes=(50, 30), max_iter=1000, random_state=42),
+    }
+    with etapa(None, 'entrenamiento', n) as r:
+        evaluar_modelos(modelos, X_scaled, y, procesos=procesos)
+        modelo = ajustar_final(modelos['Random Forest'], X_scaled, y)[0]
+        r['filas_salida'] = len(modelos)
+
+    with etapa(None, 'prediccion_sklearn', n) as r:
+        r['filas_salida'] = len(modelo.predict_proba(scaler.transform(X)))
+
+    compilado = compilar_modelo({'modelo': modelo, 'scaler': scaler, 'label_encoder': label_encoder,
+                                 'features': list(X.columns)})
+    with etapa(None, 'prediccion_compilada', n) as r:
+        r['filas_salida'] = len(predecir_proba(compilado, X.to_numpy()))
+
+
+def comparar(resultados, ruta_anterior):
+    """Cociente de tiempo y memoria de cada etapa contra un JSON de otra revisión.
+
+    La memoria que se compara es el aumento sobre la del proceso al empezar la etapa: el pico
+    absoluto es casi todo intérprete, bibliotecas y lo que dejaron las etapas anteriores.
+    """
+    with open(ruta_anterior, encoding='utf-8') as f:
+        anterior = json.load(f)
+    previos = {(r['tamanio'], r['etapa']): r for r in anterior['resultados']}
+    print(f"\nComparación con {ruta_anterior} (revisión {anterior.get('revision')}):")
+    regresiones = 0
+    for r in resultados:
+        previo = previos.get((r['tamanio'], r['etapa']))
+        if previo is None:
+            continue
+        tiempo = r['segundos'] / max(previo['segundos'], 1e-9)
+        mas_lenta = tiempo > UMBRAL_REGRESION and r['segundos'] - previo['segundos'] > MINIMO_SEGUNDOS
+        # Los JSON anteriores a memoria_incremento_mib sólo tienen el pico absoluto: no se comparan
+        anterior_mib = previo.get('memoria_incremento_mib')
+        if anterior_mib is None:
+            memoria, mas_memoria = "sin dato", False
+        else:
+            cociente = r['memoria_incremento_mib'] / max(anterior_mib, 1e-9)
+            memoria = f"x{cociente:.2f}"
+            mas_memoria = cociente > UMBRAL_REGRESION and r['memoria_incremento_mib'] - anterior_mib > MINIMO_MIB
+        marca = "⚠️" if mas_lenta or mas_memoria else "  "
+        regresiones += marca != "  "
+        print(f"{marca} {str(r['tamanio']):>10} {r['etapa']:<26} tiempo x{tiempo:.2f} | memoria {memoria}")
+    print(f"Etapas más lentas o con más memoria (> x{UMBRAL_REGRESION}): {regresiones}")
+
+
+# El bloque principal es necesario para usar el pool de procesos en Windows
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline con delitos y alojamientos sintéticos")
+    parser.add_argument('--tamanios', type=int, nargs='+', default=list(TAMANIOS), help="Cantidades de delitos a generar")
+    parser.add_argument('--alojamientos', type=int, default=5000, help="Cantidad de alojamientos sintéticos")
+    parser.add_argument('--sin-modelos', action='store_true', help="Omitir entrenamiento y predicción")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos para el entrenamiento")
+    parser.add_argument('--directorio', default=None, help="Carpeta de trabajo (por defecto, una temporal que se borra)")
+    parser.add_argument('--salida', default='resultados_benchmark.json')
+    parser.add_argument('--comparar', default=None, help="JSON de otra revisión para comparar etapa por etapa")
+    args = parser.parse_args()
+
+    directorio = args.directorio or tempfile.mkdtemp(prefix='benchmark_tesis_')
+    os.makedirs(directorio, exist_ok=True)
+    grilla = Grilla()
+    alojamientos = generar_alojamientos(args.alojamientos)
+    # Los resultados van al JSON del benchmark (METRICAS_PERFIL sigue sirviendo para perfilar una etapa)
+    metricas.configurar(archivo='', resumen=False)
+    densidad = None
+    try:
+        for n in args.tamanios:
+            print(f"\n=== {n} delitos ===")
+            densidad = etapas_delitos(n, directorio, grilla, alojamientos)
+        if not args.sin_modelos and densidad is not None:
+            # Los modelos usan la densidad del tamaño más grande
+            print(f"\n=== Modelos ({len(alojamientos)} alojamientos) ===")
+            etapas_modelos(alojamientos, densidad, args.procesos)
+    finally:
+        if args.directorio is None:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    resultados = metricas.registros()
+    salida = {
+        'revision': revision(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'nucleos': os.cpu_count(),
+        'alojamientos': args.alojamientos,
+        'resultados': resultados,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    print(f"\n📝 Resultados guardados en: {args.salida}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
@@ -0,0 +1,144 @@
+# Datos sintéticos con la forma de los delitos (esquema del .vrt) y de los alojamientos, dentro de CABA
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Años de los archivos delitos_YYYY.xlsx que lee 1-Carga y limpieza de datos.py
+ANIOS = (2016, 2017, 2018, 2019, 2021, 2022, 2023)
+
+# Tipos y subtipos con proporciones aproximadas a las del mapa del delito
+TIPOS = {
+    'Robo': (0.45, ['Robo total', 'Robo automotor']),
+    'Hurto': (0.30, ['Hurto total', 'Hurto automotor']),
+    'Lesiones': (0.12, ['Siniestro vial', 'Lesiones dolosas']),
+    'Amenazas': (0.08, ['Amenazas']),
+    'Vialidad': (0.04, ['Siniestro vial']),
+    'Homicidio': (0.01, ['Doloso', 'Siniestro vial']),
+}
+
+# Barrio, comuna y un centro aproximado de cada barrio (los delitos se concentran alrededor)
+BARRIOS = [
+    ('PALERMO', 14, -34.580, -58.425), ('BALVANERA', 3, -34.609, -58.403), ('SAN NICOLAS', 1, -34.603, -58.377),
+    ('RECOLETA', 2, -34.588, -58.397), ('MONSERRAT', 1, -34.613, -58.382), ('CABALLITO', 6, -34.617, -58.442),
+    ('FLORES', 7, -34.632, -58.463), ('BELGRANO', 13, -34.562, -58.456), ('ALMAGRO', 5, -34.606, -58.421),
+    ('CONSTITUCION', 1, -34.627, -58.384), ('SAN TELMO', 1, -34.622, -58.372), ('BARRACAS', 4, -34.645, -58.384),
+    ('VILLA CRESPO', 15, -34.598, -58.442), ('MATADEROS', 9, -34.660, -58.507), ('LINIERS', 9, -34.643, -58.520),
+    ('VILLA LUGANO', 8, -34.676, -58.471), ('NUÑEZ', 13, -34.545, -58.463), ('BOCA', 4, -34.634, -58.363),
+]
+
+# Rango de coordenadas generado (CABA, un poco más chico que LAT/LON_MIN/MAX)
+LAT_SINTETICA = (-34.695, -34.527)
+LON_SINTETICA = (-58.531, -58.335)
+
+MESES = ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO', 'JULIO', 'AGOSTO',
+         'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE']
+DIAS = ['LUNES', 'MARTES', 'MIERCOLES', 'JUEVES', 'VIERNES', 'SABADO', 'DOMINGO']
+
+# Fracción de coordenadas con los problemas que corrige pipeline/coordenadas.py
+FRACCION_ESCALADAS = 0.01
+FRACCION_FALTANTES = 0.005
+FRACCION_CERO = 0.005
+FRACCION_FUERA = 0.002
+
+
+def _coordenadas(rng, n):
+    # Mitad alrededor del centro de cada barrio, mitad uniforme en la ciudad
+    lat = rng.uniform(*LAT_SINTETICA, n)
+    lon = rng.uniform(*LON_SINTETICA, n)
+    barrio = rng.integers(0, len(BARRIOS), n)
+    cerca = rng.random(n) < 0.5
+    centros = np.array([[b[2], b[3]] for b in BARRIOS])
+    lat[cerca] = centros[barrio[cerca], 0] + rng.normal(0, 0.006, cerca.sum())
+    lon[cerca] = centros[barrio[cerca], 1] + rng.normal(0, 0.006, cerca.sum())
+    np.clip(lat, *LAT_SINTETICA, out=lat)
+    np.clip(lon, *LON_SINTETICA, out=lon)
+    return lat, lon, barrio
+
+
+def _ensuciar(rng, lat, lon):
+    # Coordenadas multiplicadas por 1e6, faltantes, en cero y fuera de CABA
+    problema = rng.random(len(lat))
+    corte = np.cumsum([FRACCION_ESCALADAS, FRACCION_FALTANTES, FRACCION_CERO, FRACCION_FUERA])
+    escaladas = problema < corte[0]
+    lat[escaladas] = np.round(lat[escaladas] * 1e6)
+    lon[escaladas] = np.round(lon[escaladas] * 1e6)
+    faltantes = (problema >= corte[0]) & (problema < corte[1])
+    lat[faltantes] = np.nan
+    lon[faltantes] = np.nan
+    ceros = (problema >= corte[1]) & (problema < corte[2])
+    lat[ceros] = 0.0
+    lon[ceros] = 0.0
+    fuera = (problema >= corte[2]) & (problema < corte[3])
+    lat[fuera] -= 1.0
+
+
+def _como_texto(valores):
+    # Texto como en el .vrt (OGRVRTLayer con latitud/longitud String); faltantes como nulos.
+    # Se guarda con pyarrow para que decenas de millones de filas no ocupen un objeto por valor
+    return pd.array(pc.cast(pa.array(valores, from_pandas=True), pa.string()), dtype='string[pyarrow]')
+
+
+def generar_delitos(n, semilla=0, anio=None):
+    """DataFrame de n delitos con las columnas del .vrt (id-sum, anio, mes, ..., latitud, longitud, cantidad).
+
+    Las columnas de texto van como category para poder generar decenas de millones de filas.
+    latitud/longitud son texto, como en el .vrt, así la limpieza mide también la conversión a
+    número; una fracción de valores está escalada, falta, es cero o queda fuera de rango, como los
+    que corrige la limpieza. Con anio, todos los delitos son de ese año.
+    """
+    rng = np.random.default_rng(semilla)
+    anios = np.full(n, anio, dtype=np.int64) if anio is not None else rng.choice(ANIOS, n)
+    dia_del_anio = rng.integers(0, 365, n)
+    fecha = pd.to_datetime(anios.astype(str), format='%Y') + pd.to_timedelta(dia_del_anio, unit='D')
+    nombres_tipo = list(TIPOS)
+    tipo = rng.choice(len(nombres_tipo), n, p=[TIPOS[t][0] for t in nombres_tipo])
+    subtipos = sorted({s for _, lista in TIPOS.values() for s in lista})
+    # Subtipo: uno de los del tipo, elegido al azar
+    opciones = np.array([[subtipos.index(s) for s in (TIPOS[t][1] * 2)[:2]] for t in nombres_tipo])
+    subtipo = opciones[tipo, rng.integers(0, 2, n)]
+    lat, lon, barrio = _coordenadas(rng, n)
+    # Seis decimales, como las coordenadas publicadas
+    lat, lon = np.round(lat, 6), np.round(lon, 6)
+    _ensuciar(rng, lat, lon)
+
+    def categoria(codigos, valores):
+        return pd.Categorical.from_codes(codigos, categories=valores)
+
+    return pd.DataFrame({
+        'id-sum': np.arange(n, dtype=np.int64),
+        'anio': anios,
+        'mes': categoria(fecha.month.to_numpy() - 1, MESES),
+        'dia': categoria(fecha.dayofweek.to_numpy(), DIAS),
+        'fecha': fecha,
+        'franja': rng.integers(0, 24, n),
+        'tipo': categoria(tipo, nombres_tipo),
+        'subtipo': categoria(subtipo, subtipos),
+        'uso_arma': categoria(rng.integers(0, 2, n), ['NO', 'SI']),
+        'uso_moto': categoria(rng.integers(0, 2, n), ['NO', 'SI']),
+        'barrio': categoria(barrio, [b[0] for b in BARRIOS]),
+        'comuna': pd.Categorical(np.array([str(b[1]) for b in BARRIOS])[barrio]),
+        'latitud': _como_texto(lat),
+        'longitud': _como_texto(lon),
+        'cantidad': np.ones(n, dtype=np.int64),
+    })
+
+
+def generar_alojamientos(n, semilla=1):
+    """DataFrame de n alojamientos con las columnas de alojamientos-geocodificados.csv usadas por los scripts."""
+    rng = np.random.default_rng(semilla)
+    lat, lon, barrio = _coordenadas(rng, n)
+    calles = np.array(['Av. Corrientes', 'Av. Santa Fe', 'Perú', 'Báez', 'Defensa', 'Av. de Mayo', 'Florida'])
+    calle = calles[rng.integers(0, len(calles), n)]
+    altura = rng.integers(1, 5000, n)
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'nombre': [f'Alojamiento {i}' for i in range(1, n + 1)],
+        'tipo': rng.choice(['HOTEL 3 ESTRELLAS', 'HOSTEL', 'APART HOTEL'], n),
+        'calle': calle,
+        'altura': altura.astype(np.float64),
+        'direccion': [f'{c} {a}' for c, a in zip(calle, altura)],
+        'barrio': [BARRIOS[b][0] for b in barrio],
+        'latitud': lat,
+        'longitud': lon,
+    })
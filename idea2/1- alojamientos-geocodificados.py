@@ -1,11 +1,31 @@
 from geopy.geocoders import Nominatim #lo voy a usar para convertir las direcciones en coordenadas
 from geopy.extra.rate_limiter import RateLimiter #lo voy a usar para espaciar las consultas
 import pandas as pd #lo voy a usar para leer el dataset
-import time #atado a la segunda línea
+import numpy as np
+import argparse #opciones de la caché de geocodificación
+import os
+import sys
+
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.calles import CONFIANZA_MINIMA, construir_indice_calles, fuentes_calles, geocodificar_por_interpolacion
+from pipeline.geocodificacion import TAMANIO_LOTE, geocodificar_direcciones
+
+parser = argparse.ArgumentParser(description="Geocodificación de alojamientos turísticos")
+parser.add_argument('--cache', default='C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/geocodigos.sqlite',
+                    help="Caché de direcciones ya geocodificadas (SQLite)")
+parser.add_argument('--lote', type=int, default=TAMANIO_LOTE, help="Direcciones geocodificadas entre cada guardado")
+parser.add_argument('--reintentar', action='store_true', help="Volver a consultar las direcciones que no se encontraron")
+parser.add_argument('--confianza-minima', type=float, default=CONFIANZA_MINIMA,
+                    help="Confianza desde la cual se acepta la interpolación local sin consultar a Nominatim")
+parser.add_argument('--sin-red', action='store_true', help="Usar sólo la interpolación local (sin Nominatim)")
+args = parser.parse_args()
 
 # Crear el geocodificador con Nominatim
 geolocator = Nominatim(user_agent="alojamientos_caba") #lo voy a usar para convertir las direcciones en coordenadas
-geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1) # Limitar a 1 consulta por segundo
+# Limitar a 1 consulta por segundo; los errores se reintentan y, si persisten, se dejan para la próxima corrida
+geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1, max_retries=2, error_wait_seconds=5,
+                      swallow_exceptions=False)
 
 # Ruta del archivo de alojamientos
 alojamientos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/alojamientos-turisticos.csv' # Ruta del archivo CSV, luego tengo que poner la URL
@@ -20,36 +40,39 @@ print(alojamientos.head()) # Mostrar las primeras filas del DataFrame
 print("Columnas del archivo de alojamientos:") # Pongo el título para que en la siguiente línea se entienda qué se está mostrando
 print(alojamientos.columns) # Mostrar las columnas del DataFrame
 
-# Crear columnas de latitud y longitud
-alojamientos['latitud'] = None # se crea la columna latitud
-alojamientos['longitud'] = None # se crea la columna longitud
-
 # Límites geográficos de CABA - esto lo hago para filtrar ubicaciones por fuera de CABA
 lat_min, lat_max = -34.705, -34.534 
 lon_min, lon_max = -58.531, -58.350
 
-# Función para obtener coordenadas a partir de la dirección
-def obtener_coordenadas(direccion):
-    try:
-        location = geolocator.geocode(direccion + ", Buenos Aires, Argentina")
-        if location:
-            return location.latitude, location.longitude
-    except Exception as e:
-        print(f"Error al geocodificar: {direccion} -> {e}")
-    return None, None
-
-# Iterar sobre el DataFrame para obtener coordenadas
-for idx, row in alojamientos.iterrows():
-    direccion = row['direccion']  # Ajusta el nombre si es diferente
-    lat, lon = obtener_coordenadas(direccion)
-    # Filtrar coordenadas que estén dentro de CABA
-    if lat and lon and (lat_min <= lat <= lat_max) and (lon_min <= lon <= lon_max):
-        alojamientos.at[idx, 'latitud'] = lat
-        alojamientos.at[idx, 'longitud'] = lon
-        print(f"Geocodificado: {direccion} -> ({lat}, {lon}) [CABA]")
-    else:
-        print(f"Descartado: {direccion} -> ({lat}, {lon}) [Fuera de CABA]")
-    time.sleep(1)  # Esperar para no saturar el servicio
+# Primero se interpola sobre las calles de los datasets que ya traen calle, altura y coordenadas
+dataset_dir = os.path.dirname(alojamientos_path)
+puntos = fuentes_calles(dataset_dir)
+indice_calles = construir_indice_calles(puntos['calle'], puntos['altura'], puntos['latitud'], puntos['longitud'])
+print(f"Índice de calles: {len(indice_calles)} calles con {len(puntos)} puntos de referencia")
+lat, lon, confianza = geocodificar_por_interpolacion(indice_calles, alojamientos['calle'], alojamientos['altura'])
+locales = confianza >= args.confianza_minima
+fuente = np.where(locales, 'interpolacion', None).astype(object)
+print(f"Ubicados por interpolación local: {int(locales.sum())} de {len(alojamientos)}")
+
+# Obtener coordenadas del resto: sólo las direcciones nuevas o modificadas van a Nominatim, las demás salen de la caché
+faltantes = ~locales
+if args.sin_red:
+    lat[faltantes], lon[faltantes], confianza[faltantes] = np.nan, np.nan, 0.0
+elif faltantes.any():
+    lat_red, lon_red, conteos = geocodificar_direcciones(alojamientos['direccion'][faltantes], geocode, args.cache,
+                                                         lote=args.lote, reintentar_no_encontradas=args.reintentar)
+    print(f"Consultas a Nominatim: {conteos['consultadas']} | sin resultado: {conteos['no_encontradas']} | errores: {conteos['errores']}")
+    lat[faltantes], lon[faltantes] = lat_red, lon_red
+    encontradas = faltantes & ~np.isnan(lat)
+    fuente[encontradas], confianza[encontradas] = 'nominatim', np.nan
+
+# Filtrar coordenadas que estén dentro de CABA
+dentro = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+alojamientos['latitud'] = pd.Series(lat, index=alojamientos.index).where(dentro)
+alojamientos['longitud'] = pd.Series(lon, index=alojamientos.index).where(dentro)
+alojamientos['fuente_coordenadas'] = fuente
+alojamientos['confianza'] = confianza
+print(f"Descartados (sin coordenadas o fuera de CABA): {int((~dentro).sum())}")
 
 # Eliminar filas que no lograron obtener coordenadas o están fuera de CABA
 alojamientos = alojamientos.dropna(subset=['latitud', 'longitud'])
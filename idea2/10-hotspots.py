@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.hotspots import (CELDA_HOTSPOT, EPS_M, cargar_celdas, detectar_hotspots,
+                               features_hotspots, grilla_hotspots, guardar_celdas)
+from pipeline.metricas import etapa
+
+# El bloque principal es necesario para usar el pool de procesos en Windows
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Detección de hotspots delictivos sobre delitos_total")
+    parser.add_argument('--celda', type=float, default=CELDA_HOTSPOT, help="Tamaño de celda del pre-binneo (grados)")
+    parser.add_argument('--eps', type=float, default=EPS_M, help="Radio de vecindad del DBSCAN (metros)")
+    parser.add_argument('--peso-minimo', type=float, default=None,
+                        help="Peso de delitos dentro del radio para que una celda sea núcleo (por defecto, 3 veces "
+                             "el esperado con el grupo repartido en toda la ciudad, y no menos que la cantidad "
+                             "que un reparto uniforme alcanzaría por azar en algún círculo con probabilidad 0.05)")
+    parser.add_argument('--por-tipo', action='store_true', help="Además, hotspots de cada tipo de delito")
+    parser.add_argument('--por-anio', action='store_true', help="Además, hotspots de cada año")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos para los grupos (por defecto, todos los núcleos)")
+    args = parser.parse_args()
+
+    # === Rutas de archivos ===
+    delitos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv'
+    alojamientos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/alojamientos-geocodificados-2.csv'
+    hotspots_geojson = 'hotspots.geojson'
+    hotspots_celdas = 'hotspots.npz'
+    grupos_geojson = 'hotspots_por_grupo.geojson'
+    alojamientos_salida_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/alojamientos-hotspots.csv'
+
+    import geopandas as gpd
+
+    grilla = grilla_hotspots(args.celda)
+    opciones = dict(eps_m=args.eps, peso_minimo=args.peso_minimo, procesos=args.procesos)
+
+    # === Hotspots de todos los delitos (capa del mapa y features de los alojamientos) ===
+    with etapa('hotspots') as registro:
+        general, = detectar_hotspots(delitos_path, grilla, **opciones)
+        tabla = general['tabla']
+        registro['filas_salida'] = len(tabla)
+    print(f"Hotspots encontrados: {len(tabla)} ({int(tabla['delitos'].sum())} delitos en "
+          f"{int(tabla['celdas'].sum())} celdas, peso mínimo {general['celdas']['peso_minimo']:.1f})")
+    gpd.GeoDataFrame(tabla, geometry='geometry', crs='EPSG:4326').to_file(hotspots_geojson, driver='GeoJSON')
+    guardar_celdas(hotspots_celdas, grilla, general['celdas'], tabla)
+    print(f"Hotspots guardados en: {hotspots_geojson} y {hotspots_celdas}")
+    print(tabla.drop(columns='geometry').sort_values('peso', ascending=False).head(10).to_string(index=False))
+
+    # === Hotspots por tipo y/o año, un grupo por proceso ===
+    if args.por_tipo or args.por_anio:
+        with etapa('hotspots_por_grupo') as registro:
+            grupos = detectar_hotspots(delitos_path, grilla, por_tipo=args.por_tipo, por_anio=args.por_anio, **opciones)
+            tablas = pd.concat([g['tabla'] for g in grupos], ignore_index=True)
+            registro['filas_salida'] = len(tablas)
+        print(f"Hotspots de {len(grupos)} grupos: {len(tablas)}")
+        gpd.GeoDataFrame(tablas, geometry='geometry', crs='EPSG:4326').to_file(grupos_geojson, driver='GeoJSON')
+        print(f"Hotspots por grupo guardados en: {grupos_geojson}")
+
+    # === Hotspot, peso y distancia al hotspot más cercano de cada alojamiento ===
+    if os.path.exists(alojamientos_path):
+        alojamientos = pd.read_csv(alojamientos_path)
+        with etapa('features_hotspots', len(alojamientos)) as registro:
+            extra = features_hotspots(cargar_celdas(hotspots_celdas), pd.to_numeric(alojamientos['latitud'], errors='coerce'),
+                                      pd.to_numeric(alojamientos['longitud'], errors='coerce'))
+            registro['filas_salida'] = int((extra['hotspot'] >= 0).sum())
+        alojamientos = pd.concat([alojamientos, extra.set_index(alojamientos.index)], axis=1)
+        alojamientos.to_csv(alojamientos_salida_path, index=False)
+        print(f"Alojamientos dentro de un hotspot: {int((extra['hotspot'] >= 0).sum())} de {len(alojamientos)}")
+        print(f"Archivo guardado en: {alojamientos_salida_path}")
+    else:
+        print(f"No se encuentra {alojamientos_path}; se omiten las features de los alojamientos.")
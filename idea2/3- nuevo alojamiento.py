@@ -1,13 +1,26 @@
 # Importación de librerías necesarias
 import pandas as pd
 import numpy as np
-import lightgbm as lgb
+import argparse
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 import matplotlib.pyplot as plt
-import geopandas as gpd
-from shapely.geometry import Point, Polygon
 import os
+import sys
+
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.carga import cargar_delitos
+from pipeline.clusters import cargar_clusters, asignar_clusters
+from pipeline.pesos import pesos_por_anio
+from pipeline.grilla import Grilla, cargar_raster, densidad_grilla, densidad_en_puntos
+from pipeline.servicio import cargar_modelo
+
+# Modo de uso: una ubicación por teclado (por defecto) o un archivo con muchas candidatas
+parser = argparse.ArgumentParser(description="Predicción de la categoría de seguridad de nuevos alojamientos")
+parser.add_argument('--archivo', help="CSV con columnas latitud/longitud de las ubicaciones candidatas")
+parser.add_argument('--salida', default='predicciones_candidatos.csv', help="CSV de salida del modo masivo")
+args = parser.parse_args()
 
 # Crear la carpeta de salida si no existe
 output_dir = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/EDA'
@@ -16,93 +29,75 @@ os.makedirs(output_dir, exist_ok=True)
 # Ruta corregida del archivo consolidado de delitos
 delitos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv'
 
-# Carga del archivo consolidado de delitos con manejo de tipos mixtos
-print(f"Cargando archivo consolidado de delitos desde: {delitos_path}")
-delitos_total = pd.read_csv(delitos_path, low_memory=False)
+# Artefactos de los otros scripts: ráster de densidad (4- .py) y DBSCAN de los alojamientos (2- densidad.py)
+raster_path = 'grid_densidad.npz'
+clusters_path = 'dbscan_alojamientos.npz'
 
-# Limpieza y verificación de datos de delitos
-delitos_total['latitud'] = pd.to_numeric(delitos_total['latitud'], errors='coerce')
-delitos_total['longitud'] = pd.to_numeric(delitos_total['longitud'], errors='coerce')
-delitos_total = delitos_total.dropna(subset=['latitud', 'longitud'])
-delitos_total = delitos_total[(delitos_total['latitud'] != 0) & (delitos_total['longitud'] != 0)]
-print(f"Total de registros de delitos después de la limpieza: {len(delitos_total)}")
+# Clúster que se usa si no está el DBSCAN guardado (el mismo que usa el servicio)
+CLUSTER_FIJO = 1
 
-# Asignación de ponderación a los delitos según el año
-def asignar_peso(anio):
-    if anio == 2023:
-        return 1.0
-    elif anio == 2022:
-        return 0.75
-    elif anio == 2021:
-        return 0.50
-    else:
-        return 0.15
-
-# Asignar el peso a cada delito
-delitos_total['peso'] = delitos_total['anio'].apply(asignar_peso)
-
-# Crear la grilla para calcular densidad delictiva
-xmin, ymin, xmax, ymax = -58.6, -34.7, -58.3, -34.5
-cell_size = 0.005
-x_coords = np.arange(xmin, xmax, cell_size)
-y_coords = np.arange(ymin, ymax, cell_size)
-
-# Generar polígonos de la grilla
-polygons = []
-for x in x_coords:
-    for y in y_coords:
-        polygons.append(Polygon([(x, y), (x + cell_size, y), (x + cell_size, y + cell_size), (x, y + cell_size)]))
-
-grid = gpd.GeoDataFrame({'geometry': polygons})
-
-# Convertir puntos de delitos a geodataframe
-delitos_gdf = gpd.GeoDataFrame(
-    delitos_total, geometry=gpd.points_from_xy(delitos_total.longitud, delitos_total.latitud))
-
-# Asegurar que el índice del geodataframe esté reseteado
-grid = grid.reset_index()
-grid = grid.rename(columns={'index': 'grid_id'})
-
-# Unir la grilla con los delitos para contar la cantidad en cada celda ponderada
-print("Calculando densidad delictiva ponderada en la grilla...")
-joined = gpd.sjoin(grid, delitos_gdf, how="left", predicate="contains")
-
-# Calcular densidad agrupando por la columna correcta y sumando el peso
-if 'grid_id' in joined.columns:
-    densidad = joined.groupby('grid_id')['peso'].sum().reset_index(name='densidad')
+if os.path.exists(raster_path):
+    # Densidad ponderada ya calculada por 4- .py: no hace falta leer los delitos
+    grilla, densidad_raster = cargar_raster(raster_path)
+    print(f"Ráster de densidad cargado desde: {raster_path}")
 else:
-    print("Error: No se encontró la columna 'grid_id' en el resultado del join.")
-    exit()
-
-# Añadir la densidad al geodataframe de la grilla
-grid['densidad'] = 0
-grid.loc[densidad['grid_id'], 'densidad'] = densidad['densidad']
-
-# Función para calcular densidad delictiva en una ubicación dada
-def calcular_densidad_promedio(lat, lon):
-    punto = Point(lon, lat)
-    celda = grid[grid.contains(punto)]
-    if len(celda) > 0:
-        return celda['densidad'].iloc[0]
-    return 0
-
-# Cargar el modelo entrenado
-model = lgb.Booster(model_file='modelo_lightgbm.txt')
-
-# Predicción de un nuevo alojamiento con coordenadas dinámicas
-latitud = float(input("Ingrese la latitud del nuevo alojamiento: "))
-longitud = float(input("Ingrese la longitud del nuevo alojamiento: "))
-
-# Calcular la densidad para las coordenadas dadas
-densidad = calcular_densidad_promedio(latitud, longitud)
-
-# Ejemplo de clúster, puedes cambiarlo si tienes un algoritmo de clustering diferente
-cluster = 1
-
-nuevo_alojamiento = np.array([[latitud, longitud, densidad, cluster]])
-
-# Realizar la predicción
-prediccion = model.predict(nuevo_alojamiento)
-categoria_predicha = np.argmax(prediccion[0])
-categoria = ['Muy Seguro', 'Seguro', 'Moderado', 'Riesgoso'][categoria_predicha]
-print(f"\nCategoría de seguridad predicha para el nuevo alojamiento: {categoria}")
+    # Carga del consolidado de delitos (almacén tipado y validado; sólo las columnas de la grilla)
+    print(f"No se encuentra {raster_path}; cargando archivo consolidado de delitos desde: {delitos_path}")
+    delitos_total = cargar_delitos(delitos_path, columnas=['anio', 'latitud', 'longitud'])
+    print(f"Total de registros de delitos después de la limpieza: {len(delitos_total)}")
+
+    # Asignar el peso a cada delito según el año (vectorizado, esquema configurable en pipeline/pesos.py)
+    delitos_total['peso'] = pesos_por_anio(delitos_total['anio'])
+
+    # Crear la grilla para calcular densidad delictiva
+    xmin, ymin, xmax, ymax = -58.6, -34.7, -58.3, -34.5
+    cell_size = 0.005
+    grilla = Grilla(xmin, ymin, xmax, ymax, cell_size)
+
+    # Densidad ponderada por celda: el índice de celda sale de las coordenadas (sin sjoin)
+    print("Calculando densidad delictiva ponderada en la grilla...")
+    densidad_raster = densidad_grilla(grilla, delitos_total['latitud'], delitos_total['longitud'], delitos_total['peso'])
+
+# Cargar el modelo entrenado y las muestras núcleo del DBSCAN de 2- densidad.py (si no están, clúster fijo)
+predecir, categorias = cargar_modelo('modelo_lightgbm.txt')
+clusters = cargar_clusters(clusters_path) if os.path.exists(clusters_path) else None
+if clusters is None:
+    print(f"No se encuentra {clusters_path}; se usa el clúster {CLUSTER_FIJO} para todas las ubicaciones")
+
+if args.archivo:
+    # Modo masivo: todas las ubicaciones candidatas de un archivo en una sola pasada
+    candidatos = pd.read_csv(args.archivo)
+    candidatos = candidatos.rename(columns={'lat': 'latitud', 'lon': 'longitud'})
+    if 'latitud' not in candidatos.columns or 'longitud' not in candidatos.columns:
+        raise KeyError("El archivo de candidatos debe tener las columnas 'latitud' y 'longitud' (o 'lat' y 'lon').")
+    latitudes = pd.to_numeric(candidatos['latitud'], errors='coerce').to_numpy()
+    longitudes = pd.to_numeric(candidatos['longitud'], errors='coerce').to_numpy()
+    print(f"Puntuando {len(candidatos)} ubicaciones candidatas desde: {args.archivo}")
+else:
+    # Predicción de un nuevo alojamiento con coordenadas dinámicas
+    latitudes = np.array([float(input("Ingrese la latitud del nuevo alojamiento: "))])
+    longitudes = np.array([float(input("Ingrese la longitud del nuevo alojamiento: "))])
+
+# Densidad y clúster calculados para todas las coordenadas a la vez
+densidades = densidad_en_puntos(grilla, densidad_raster, latitudes, longitudes)
+if clusters is not None:
+    cluster = asignar_clusters(clusters, latitudes, longitudes)
+else:
+    cluster = np.full(len(latitudes), CLUSTER_FIJO)
+
+# Realizar la predicción (una sola llamada al modelo para toda la matriz)
+matriz = np.column_stack([latitudes, longitudes, densidades, cluster])
+prediccion = np.asarray(predecir(matriz))
+categoria_predicha = np.asarray(categorias)[np.argmax(prediccion, axis=1)]
+
+if args.archivo:
+    candidatos['densidad'] = densidades
+    candidatos['cluster'] = cluster
+    candidatos['seguridad'] = categoria_predicha
+    for i, categoria in enumerate(categorias):
+        candidatos[f'prob_{categoria}'] = prediccion[:, i]
+    candidatos.to_csv(args.salida, index=False)
+    print(f"Predicciones guardadas en: {args.salida}")
+    print(candidatos['seguridad'].value_counts())
+else:
+    print(f"\nCategoría de seguridad predicha para el nuevo alojamiento: {categoria_predicha[0]} (clúster {cluster[0]})")
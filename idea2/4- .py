@@ -1,68 +1,90 @@
-import pandas as pd
-import numpy as np
-import geopandas as gpd
-from shapely.geometry import Point, Polygon
+import argparse
 import os
+import sys
 
-# === Ruta y carga del archivo consolidado de delitos ===
-delitos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv'
-print(f"Cargando archivo consolidado de delitos desde: {delitos_path}")
-delitos_total = pd.read_csv(delitos_path, low_memory=False)
-
-# === Limpieza de coordenadas ===
-delitos_total['latitud'] = pd.to_numeric(delitos_total['latitud'], errors='coerce')
-delitos_total['longitud'] = pd.to_numeric(delitos_total['longitud'], errors='coerce')
-delitos_total = delitos_total.dropna(subset=['latitud', 'longitud'])
-delitos_total = delitos_total[(delitos_total['latitud'] != 0) & (delitos_total['longitud'] != 0)]
-print(f"Total de registros de delitos después de la limpieza: {len(delitos_total)}")
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.cubo import construir_cubo, guardar_cubo
+from pipeline.densidad_anual import actualizar_rasters_anuales, combinar_rasters
+from pipeline.grilla import Grilla, grilla_geodataframe, guardar_raster
+from pipeline.kde import NUCLEOS, suavizar_raster
+from pipeline.metricas import etapa
+from pipeline.pesos import factores_anuales_vida_media, pesos_por_anio
+from pipeline.piramide import guardar_piramide
 
-# === Asignar peso por año ===
-def asignar_peso(anio):
-    if anio == 2023:
-        return 1.0
-    elif anio == 2022:
-        return 0.75
-    elif anio == 2021:
-        return 0.50
-    else:
-        return 0.15
+# === Opciones: grilla de conteos (por defecto) o superficie suavizada por KDE ===
+parser = argparse.ArgumentParser(description="Grilla de densidad delictiva ponderada")
+parser.add_argument('--kde', type=float, metavar='METROS',
+                    help="Ancho de banda en metros: genera una superficie KDE en lugar del conteo por celda")
+parser.add_argument('--nucleo', choices=NUCLEOS, default='gaussiano', help="Núcleo del KDE")
+parser.add_argument('--celda-kde', type=float, default=0.001, help="Tamaño de celda (grados) de la superficie KDE")
+parser.add_argument('--vida-media', type=float, metavar='AÑOS',
+                    help="Ponderar por fecha con decaimiento exponencial en lugar del peso fijo por año")
+parser.add_argument('--referencia', type=float, metavar='AÑO',
+                    help="Año decimal de referencia del decaimiento (por defecto, el fin del último año)")
+parser.add_argument('--cubo', action='store_true',
+                    help="Generar también el cubo celda x tipo x subtipo x franja x año x arma x moto")
+args = parser.parse_args()
 
-delitos_total['peso'] = delitos_total['anio'].apply(asignar_peso)
+# === Ruta del archivo consolidado de delitos ===
+delitos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv'
 
 # === Crear la grilla de CABA ===
 xmin, ymin, xmax, ymax = -58.6, -34.7, -58.3, -34.5
 cell_size = 0.005
-x_coords = np.arange(xmin, xmax, cell_size)
-y_coords = np.arange(ymin, ymax, cell_size)
+if args.kde:
+    # La superficie KDE se calcula sobre una grilla más fina, con celdas semiabiertas
+    grilla, bordes = Grilla(xmin, ymin, xmax, ymax, args.celda_kde), 'inferior'
+else:
+    grilla, bordes = Grilla(xmin, ymin, xmax, ymax, cell_size), 'estricto'
 
-polygons = []
-for x in x_coords:
-    for y in y_coords:
-        polygons.append(Polygon([(x, y), (x + cell_size, y), (x + cell_size, y + cell_size), (x, y + cell_size)]))
+# === Rásters por año: sólo se vuelven a binnear los años nuevos o con datos cambiados ===
+print(f"Actualizando rásters anuales desde: {delitos_path}")
+rasters_dir = os.path.join('rasters_anuales', f"celda_{grilla.cell_size:g}_{bordes}")
+with etapa('rasters_anuales') as registro:
+    rasters_anuales = actualizar_rasters_anuales(delitos_path, rasters_dir, grilla, bordes, vida_media=args.vida_media)
+    total_delitos = sum(r['conteo'].sum() for r in rasters_anuales.values())
+    registro['filas_salida'] = total_delitos
+print(f"Total de registros de delitos en la grilla: {total_delitos:.0f} ({len(rasters_anuales)} años)")
 
-grid = gpd.GeoDataFrame({'geometry': polygons})
-grid = grid.reset_index().rename(columns={'index': 'grid_id'})
+# === Peso por año: esquema fijo (2023: 1, 2022: 0.75, 2021: 0.5, resto 0.15) o vida media ===
+if args.vida_media:
+    referencia = args.referencia if args.referencia is not None else max(rasters_anuales) + 1
+    factores = factores_anuales_vida_media(rasters_anuales, referencia, args.vida_media)
+    densidad_raster = combinar_rasters(rasters_anuales, factores, clave='intra')
+else:
+    factores = {anio: float(pesos_por_anio([anio])[0]) for anio in rasters_anuales}
+    densidad_raster = combinar_rasters(rasters_anuales, factores)
+print("Pesos por año: " + ", ".join(f"{anio}: {peso:.3f}" for anio, peso in sorted(factores.items())))
 
-# === Convertir delitos a GeoDataFrame ===
-delitos_gdf = gpd.GeoDataFrame(
-    delitos_total, geometry=gpd.points_from_xy(delitos_total.longitud, delitos_total.latitud))
-delitos_gdf.set_crs(epsg=4326, inplace=True)
+if args.kde:
+    # === Superficie KDE expresada en delitos por celda de 0.005° ===
+    print(f"Calculando densidad suavizada (KDE {args.nucleo}, {args.kde:.0f} m)...")
+    with etapa('kde', grilla.nx * grilla.ny):
+        densidad_raster = suavizar_raster(grilla, densidad_raster, ancho_banda_m=args.kde, nucleo=args.nucleo,
+                                          celda_referencia=cell_size)
 
-# === Join espacial entre delitos y grilla ===
-print("Calculando densidad delictiva ponderada en la grilla...")
-grid.set_crs(epsg=4326, inplace=True)
-joined = gpd.sjoin(grid, delitos_gdf, how="left", predicate="contains")
+# === Geodataframe de la grilla con grid_id y densidad ===
+with etapa('guardado_geojson', grilla.nx * grilla.ny):
+    grid = grilla_geodataframe(grilla, densidad_raster, crs='EPSG:4326')
 
-# === Calcular densidad delictiva por celda ===
-if 'grid_id' in joined.columns:
-    densidad = joined.groupby('grid_id')['peso'].sum().reset_index(name='densidad')
-else:
-    raise KeyError("No se encontró la columna 'grid_id' en el resultado del join.")
+    # === Guardar la grilla como GeoJSON ===
+    grid.to_file("grid_densidad.geojson", driver='GeoJSON')
+print("✅ Archivo 'grid_densidad.geojson' guardado correctamente.")
 
-# === Agregar densidad al grid (convertir a float para evitar FutureWarning) ===
-grid['densidad'] = 0.0
-grid.loc[densidad['grid_id'], 'densidad'] = densidad['densidad'].astype(float)
+# === Guardar también el ráster binario (lo lee el servicio de puntuación sin parsear GeoJSON) ===
+guardar_raster("grid_densidad.npz", grilla, densidad_raster)
+print("✅ Archivo 'grid_densidad.npz' guardado correctamente.")
 
-# === Guardar la grilla como GeoJSON ===
-grid.to_file("grid_densidad.geojson", driver='GeoJSON')
-print("✅ Archivo 'grid_densidad.geojson' guardado correctamente.")
+# === Pirámide multirresolución para los mapas (cada nivel agrupa 2x2 celdas del anterior) ===
+with etapa('piramide', grilla.nx * grilla.ny):
+    meta = guardar_piramide("piramide_densidad", grilla, densidad_raster)
+print(f"✅ Pirámide 'piramide_densidad' guardada con {len(meta['formas'])} niveles.")
+
+# === Cubo de agregados para consultas por tipo, franja horaria, año, arma y moto ===
+if args.cubo:
+    with etapa('cubo') as registro:
+        cubo = construir_cubo(delitos_path, Grilla(xmin, ymin, xmax, ymax, cell_size))
+        registro['filas_salida'] = len(cubo['conteo'])
+    guardar_cubo("cubo_delitos.npz", cubo)
+    print(f"✅ Cubo 'cubo_delitos.npz' guardado con {len(cubo['conteo'])} combinaciones no vacías.")
@@ -1,29 +1,65 @@
 import folium
-import geopandas as gpd
 import pandas as pd
 import os
+import sys
+import argparse
+
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.grilla import EXTENSION_CABA, cargar_raster, tabla_densidad
+from pipeline.mapas import capa_alojamientos, grilla_topojson
+from pipeline.piramide import abrir_piramide, leer_ventana, nivel_para_zoom
+
+# === Opciones del mapa ===
+parser = argparse.ArgumentParser(description="Mapa de densidad delictiva y alojamientos")
+parser.add_argument('--zoom', type=int, default=12, help="Zoom inicial; elige el nivel de la pirámide a mostrar")
+parser.add_argument('--ventana', type=float, nargs=4, metavar=('XMIN', 'YMIN', 'XMAX', 'YMAX'),
+                    default=list(EXTENSION_CABA), help="Zona a mostrar (sólo se leen esas celdas)")
+parser.add_argument('--colorear-seguridad', action='store_true',
+                    help="Colorear los alojamientos según la categoría de seguridad de alojamientos-geocodificados-2.csv")
+parser.add_argument('--hotspots', default='hotspots.geojson', help="Contorno de los hotspots (10-hotspots.py), si existe")
+args = parser.parse_args()
 
 # === Rutas de archivos ===
 grid_geojson_path = "grid_densidad.geojson"
+piramide_path = "piramide_densidad"
 alojamientos_csv_path = "C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/alojamientos-geocodificados.csv"
+alojamientos_seguridad_path = "C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/alojamientos-geocodificados-2.csv"
 output_path = "mapa_densidad_delictiva.html"
 
 # === Verificar existencia de archivos ===
-if not os.path.exists(grid_geojson_path):
+if not os.path.exists(piramide_path) and not os.path.exists(grid_geojson_path):
     raise FileNotFoundError(f"No se encuentra el archivo {grid_geojson_path}. Ejecutá primero el script que genera la grilla con densidad.")
+if args.colorear_seguridad:
+    # El archivo con la categoría de seguridad (2- densidad.py) también trae las coordenadas
+    alojamientos_csv_path = alojamientos_seguridad_path
 if not os.path.exists(alojamientos_csv_path):
     raise FileNotFoundError(f"No se encuentra el archivo {alojamientos_csv_path}. Asegurate de que esté en la ruta correcta.")
 
 # === Cargar grilla con densidad delictiva ===
-grid = gpd.read_file(grid_geojson_path)
+if os.path.exists(piramide_path):
+    # Nivel de la pirámide acorde al zoom, leyendo sólo las celdas de la ventana
+    piramide = abrir_piramide(piramide_path)
+    nivel = nivel_para_zoom(piramide, args.zoom)
+    grilla, densidad = leer_ventana(piramide, nivel, *args.ventana)
+    print(f"Nivel {nivel} de la pirámide (celda de {grilla.cell_size:.4f}°, {grilla.nx * grilla.ny} celdas)")
+else:
+    grilla, densidad = cargar_raster(grid_geojson_path)
+
+# Grilla como TopoJSON: sólo celdas con delitos, coordenadas enteras y bordes compartidos
+grid_topojson = grilla_topojson(grilla, densidad)
+tabla = tabla_densidad(grilla, densidad)
+tabla = tabla[tabla['densidad'] > 0]
+print(f"Celdas con delitos en el mapa: {len(tabla)}")
 
 # === Crear mapa centrado en CABA ===
-mapa = folium.Map(location=[-34.6, -58.45], zoom_start=12, tiles='cartodbpositron')
+mapa = folium.Map(location=[-34.6, -58.45], zoom_start=args.zoom, tiles='cartodbpositron')
 
 # === Capa de calor por densidad delictiva ===
 folium.Choropleth(
-    geo_data=grid,
-    data=grid,
+    geo_data=grid_topojson,
+    topojson="objects.grilla",
+    data=tabla,
     columns=["grid_id", "densidad"],
     key_on="feature.properties.grid_id",
     fill_color="YlOrRd",
@@ -32,9 +68,20 @@ folium.Choropleth(
     legend_name="Densidad Delictiva Ponderada"
 ).add_to(mapa)
 
+# === Contorno de los hotspots delictivos ===
+if os.path.exists(args.hotspots):
+    folium.GeoJson(
+        args.hotspots,
+        name="Hotspots",
+        style_function=lambda _: {'color': '#800026', 'weight': 2, 'fillOpacity': 0},
+        tooltip=folium.GeoJsonTooltip(fields=['hotspot', 'delitos', 'area_km2'],
+                                      aliases=['Hotspot', 'Delitos', 'Área (km²)'])
+    ).add_to(mapa)
+    print(f"Hotspots en el mapa: {args.hotspots}")
+
 # === Cargar alojamientos turísticos ===
 try:
-    alojamientos = pd.read_csv(alojamientos_csv_path, encoding='latin1', sep=';')
+    alojamientos = pd.read_csv(alojamientos_csv_path, encoding='latin1', sep=',')
 except Exception as e:
     raise RuntimeError(f"Error al leer el CSV de alojamientos: {e}")
 
@@ -43,23 +90,22 @@ print("Columnas detectadas en el archivo de alojamientos:")
 print(alojamientos.columns)
 
 # === Asegurar que las columnas de ubicación existan ===
-if 'lat' not in alojamientos.columns or 'lon' not in alojamientos.columns:
-    raise KeyError("El archivo no contiene las columnas 'lat' y 'lon' necesarias para ubicar los alojamientos.")
+# (1- alojamientos-geocodificados.py las guarda como latitud y longitud, separadas por coma)
+if 'latitud' not in alojamientos.columns or 'longitud' not in alojamientos.columns:
+    raise KeyError("El archivo no contiene las columnas 'latitud' y 'longitud' necesarias para ubicar los alojamientos.")
+if args.colorear_seguridad and 'seguridad' not in alojamientos.columns:
+    raise KeyError(f"El archivo {alojamientos_csv_path} no contiene la columna 'seguridad'. Ejecutá primero 2- densidad.py.")
 
 # === Limpiar datos nulos ===
-alojamientos = alojamientos.dropna(subset=['lat', 'lon'])
+alojamientos['latitud'] = pd.to_numeric(alojamientos['latitud'], errors='coerce')
+alojamientos['longitud'] = pd.to_numeric(alojamientos['longitud'], errors='coerce')
+alojamientos = alojamientos.dropna(subset=['latitud', 'longitud'])
 
-# === Agregar marcadores de alojamientos ===
-for _, row in alojamientos.iterrows():
-    nombre = row.get('establecimiento', 'Alojamiento')
-    lat = row['lat']
-    lon = row['lon']
-    
-    folium.Marker(
-        location=[lat, lon],
-        popup=nombre,
-        icon=folium.Icon(color='green', icon='hotel', prefix='fa')
-    ).add_to(mapa)
+# === Agregar los alojamientos en una sola capa agrupada (armada desde arrays) ===
+nombres = alojamientos['establecimiento'].fillna('Alojamiento') if 'establecimiento' in alojamientos.columns else None
+categorias = alojamientos['seguridad'].tolist() if args.colorear_seguridad else None
+capa_alojamientos(alojamientos['latitud'], alojamientos['longitud'], nombres, categorias).add_to(mapa)
+print(f"Alojamientos en el mapa: {len(alojamientos)}")
 
 # === Guardar el mapa como HTML ===
 mapa.save(output_path)
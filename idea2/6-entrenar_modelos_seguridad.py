@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
+import argparse
 import joblib
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.naive_bayes import GaussianNB
@@ -14,110 +15,169 @@ from sklearn.metrics import (
     ConfusionMatrixDisplay
 )
 
-# === Rutas ===
-data_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/alojamientos-geocodificados-2.csv'
-modelo_guardado = 'mejor_modelo.pkl'
-reporte_txt = 'resultados_modelos.txt'
-
-# === Cargar datos ===
-df = pd.read_csv(data_path)
-print(f"Total de registros cargados: {len(df)}")
-
-# === Features y target ===
-X = df[['latitud', 'longitud', 'densidad', 'cluster']]
-y = df['seguridad']
-
-# === Codificar clases de seguridad ===
-label_encoder = LabelEncoder()
-y_encoded = label_encoder.fit_transform(y)
-clases = label_encoder.classes_
-clase_ids = np.arange(len(clases))
-
-# === Escalar features ===
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-# === Separar datos ===
-X_train, X_test, y_train, y_test = train_test_split(X_scaled, y_encoded, test_size=0.2, stratify=y_encoded, random_state=42)
-
-# === Inicializar modelos ===
-modelos = {
-    "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42),
-    "Naive Bayes": GaussianNB(),
-    "Red Neuronal": MLPClassifier(hidden_layer_sizes=(50, 30), max_iter=1000, random_state=42)
-}
-
-# === Evaluación ===
-mejor_modelo = None
-mejor_score = 0
-modelo_nombre = ''
-reportes = []
-
-for nombre, modelo in modelos.items():
-    print(f"\n🔍 Entrenando modelo: {nombre}")
-    modelo.fit(X_train, y_train)
-    y_pred = modelo.predict(X_test)
-
-    # === Accuracy train vs test
-    acc_train = modelo.score(X_train, y_train)
-    acc_test = modelo.score(X_test, y_test)
-
-    # === Cross-validation
-    scores_cv = cross_val_score(modelo, X_scaled, y_encoded, cv=5)
-    acc_cv_mean = scores_cv.mean()
-    acc_cv_std = scores_cv.std()
-
-    # === Classification Report
-    reporte = classification_report(
-        y_test, y_pred,
-        labels=clase_ids,
-        target_names=clases,
-        digits=4,
-        zero_division=0
-    )
-
-    # === Matriz de confusión
-    cm = confusion_matrix(y_test, y_pred, labels=clase_ids)
-    disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=clases)
-    disp.plot()
-    plt.title(f"Matriz de confusión - {nombre}")
-    plt.savefig(f"confusion_{nombre.replace(' ', '_')}.png")
-    plt.close()
-
-    # === Consolidar resultados
-    resumen = f"""
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.entorno import RADIOS_M, features_entorno, indexar_capas, leer_capas
+from pipeline.busqueda import buscar, estimador
+from pipeline.entrenamiento import FOLDS, ajustar_final, evaluar_modelos
+from pipeline.metricas import etapa
+
+# El bloque principal es necesario para usar el pool de procesos en Windows
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Entrenamiento de modelos de seguridad de alojamientos")
+    parser.add_argument('--entorno', action='store_true',
+                        help="Agregar distancia y cantidad de cajeros, estaciones, paradas, comisarías y gastronomía cercanos")
+    parser.add_argument('--radios', type=float, nargs='+', default=list(RADIOS_M), help="Radios (metros) para los conteos")
+    parser.add_argument('--folds', type=int, default=FOLDS, help="Folds de la validación cruzada")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos para entrenar (por defecto, todos los núcleos)")
+    parser.add_argument('--buscar', action='store_true',
+                        help="Buscar hiperparámetros por successive halving en lugar de usar los fijos")
+    parser.add_argument('--cache-busqueda', default='cache_busqueda', help="Carpeta de la caché de la búsqueda")
+    args = parser.parse_args()
+
+    # === Rutas ===
+    dataset_dir = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset'
+    data_path = os.path.join(dataset_dir, 'alojamientos-geocodificados-2.csv')
+    modelo_guardado = 'mejor_modelo.pkl'
+    reporte_txt = 'resultados_modelos.txt'
+
+    # === Cargar datos ===
+    with etapa('carga_alojamientos') as registro:
+        df = pd.read_csv(data_path)
+        registro['filas_salida'] = len(df)
+    print(f"Total de registros cargados: {len(df)}")
+
+    # === Features y target ===
+    X = df[['latitud', 'longitud', 'densidad', 'cluster']]
+    y = df['seguridad']
+
+    # === Features de entorno (un índice espacial por capa, consultado para todos los alojamientos juntos) ===
+    entorno = None
+    if args.entorno:
+        with etapa('features_entorno', len(df)) as registro:
+            capas = leer_capas(dataset_dir)
+            indices = indexar_capas(capas)
+            extra = features_entorno(indices, df['latitud'], df['longitud'], args.radios)
+            registro['filas_salida'] = len(extra)
+        X = pd.concat([X, extra.set_index(X.index)], axis=1)
+        # Las coordenadas de cada capa viajan con el modelo para calcular lo mismo al puntuar
+        entorno = {'capas': {nombre: capas[nombre] for nombre in indices}, 'radios': list(args.radios)}
+        print(f"Features de entorno: {len(extra.columns)} ({', '.join(indices)})")
+    print(f"Features del modelo: {list(X.columns)}")
+
+    # === Codificar clases de seguridad ===
+    label_encoder = LabelEncoder()
+    y_encoded = label_encoder.fit_transform(y)
+    clases = label_encoder.classes_
+    clase_ids = np.arange(len(clases))
+
+    # === Escalar features ===
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # === Inicializar modelos ===
+    modelos = {
+        "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42),
+        "Naive Bayes": GaussianNB(),
+        "Red Neuronal": MLPClassifier(hidden_layer_sizes=(50, 30), max_iter=1000, random_state=42)
+    }
+
+    # === Evaluación: todos los (modelo, fold) en paralelo; las métricas salen de las predicciones fuera de fold ===
+    print(f"\n🔍 Entrenando modelos: {', '.join(modelos)} ({args.folds} folds)")
+    historial = []
+    with etapa('entrenamiento', len(X_scaled)) as registro:
+        if args.buscar:
+            # La mejor configuración de cada modelo reemplaza a la fija (con sus resultados a recurso completo)
+            resultados, historial = buscar(X_scaled, y_encoded, args.cache_busqueda, folds=args.folds,
+                                           procesos=args.procesos)
+            modelos = {nombre: estimador(nombre, resultado['params']) for nombre, resultado in resultados.items()}
+        else:
+            resultados = evaluar_modelos(modelos, X_scaled, y_encoded, folds=args.folds, procesos=args.procesos)
+        registro['filas_salida'] = len(resultados)
+
+    mejor_score = 0
+    modelo_nombre = ''
+    reportes = []
+
+    for nombre, resultado in resultados.items():
+        y_pred = resultado['prediccion']
+
+        # === Accuracy train vs prueba (fuera de fold)
+        acc_train = resultado['acc_train']
+        acc_test = float(np.mean(y_pred == y_encoded))
+        acc_cv_mean = resultado['acc_folds'].mean()
+        acc_cv_std = resultado['acc_folds'].std()
+
+        # === Classification Report
+        reporte = classification_report(
+            y_encoded, y_pred,
+            labels=clase_ids,
+            target_names=clases,
+            digits=4,
+            zero_division=0
+        )
+
+        # === Matriz de confusión
+        cm = confusion_matrix(y_encoded, y_pred, labels=clase_ids)
+        disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=clases)
+        disp.plot()
+        plt.title(f"Matriz de confusión - {nombre}")
+        plt.savefig(f"confusion_{nombre.replace(' ', '_')}.png")
+        plt.close()
+
+        # === Consolidar resultados
+        resumen = f"""
 Modelo: {nombre}
 Train Accuracy: {acc_train:.4f}
-Test Accuracy : {acc_test:.4f}
+Test Accuracy : {acc_test:.4f} (predicciones fuera de fold)
 Cross-val mean: {acc_cv_mean:.4f} (± {acc_cv_std:.4f})
+Tiempo de ajuste: {resultado['tiempo']:.2f} s ({args.folds} folds)
+Memoria       : {resultado['memoria_incremento'] / 2**20:.1f} MiB (aumento durante el ajuste, peor fold)
+Hiperparámetros: {resultado.get('params', 'fijos')}
 
 Clasificación:
 {reporte}
 """
-    print(resumen)
-    reportes.append(resumen)
-
-    if acc_test > mejor_score:
-        mejor_score = acc_test
-        mejor_modelo = modelo
-        modelo_nombre = nombre
-
-# === Guardar el mejor modelo con scaler y label encoder ===
-joblib.dump({
-    "modelo": mejor_modelo,
-    "scaler": scaler,
-    "label_encoder": label_encoder
-}, modelo_guardado)
-
-print(f"\n💾 Mejor modelo guardado: {modelo_nombre} con accuracy {mejor_score:.4f}")
-print(f"📁 Archivo: {modelo_guardado}")
-
-# === Guardar los reportes de todos los modelos ===
-with open(reporte_txt, 'w', encoding='utf-8') as f:
-    f.write("Comparación de Modelos de Clasificación de Seguridad\n")
-    f.write("="*60 + "\n")
-    for r in reportes:
-        f.write(r + "\n" + "-"*60 + "\n")
-
-print(f"📝 Reporte completo guardado en: {reporte_txt}")
+        print(resumen)
+        reportes.append(resumen)
+
+        if acc_test > mejor_score:
+            mejor_score = acc_test
+            modelo_nombre = nombre
+
+    # === Un solo ajuste final del mejor modelo, con todos los datos ===
+    with etapa('ajuste_final', len(X_scaled)):
+        mejor_modelo, tiempo_final, memoria_final = ajustar_final(modelos[modelo_nombre], X_scaled, y_encoded)
+    reportes.append(f"""
+Ajuste final: {modelo_nombre}
+Tiempo: {tiempo_final:.2f} s | Memoria: {memoria_final / 2**20:.1f} MiB (aumento durante el ajuste)
+""")
+
+    # === Guardar el mejor modelo con scaler y label encoder ===
+    joblib.dump({
+        "modelo": mejor_modelo,
+        "scaler": scaler,
+        "label_encoder": label_encoder,
+        "features": list(X.columns),
+        "entorno": entorno
+    }, modelo_guardado)
+
+    print(f"\n💾 Mejor modelo guardado: {modelo_nombre} con accuracy {mejor_score:.4f}")
+    print(f"📁 Archivo: {modelo_guardado}")
+
+    # === Ranking de la búsqueda: exactitud de cada configuración en cada ronda ===
+    if historial:
+        ranking = sorted(historial, key=lambda h: (h['modelo'], -h['ronda'], -h['accuracy']))
+        reportes.append("Búsqueda de hiperparámetros (successive halving)\n" + "\n".join(
+            f"{h['modelo']} | ronda {h['ronda'] + 1} | recurso {h['presupuesto']} | "
+            f"accuracy {h['accuracy']:.4f} | {h['params']}" for h in ranking))
+
+    # === Guardar los reportes de todos los modelos ===
+    with open(reporte_txt, 'w', encoding='utf-8') as f:
+        f.write("Comparación de Modelos de Clasificación de Seguridad\n")
+        f.write("="*60 + "\n")
+        for r in reportes:
+            f.write(r + "\n" + "-"*60 + "\n")
+
+    print(f"📝 Reporte completo guardado en: {reporte_txt}")
     
\ No newline at end of file
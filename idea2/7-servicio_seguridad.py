@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.servicio import ServicioSeguridad, atender_stdin, crear_servidor_http
+
+# === Rutas de los artefactos (generados por 4- .py y por el entrenamiento) ===
+raster_path = "grid_densidad.npz"
+modelo_path = "modelo_lightgbm.txt"
+clusters_path = "dbscan_alojamientos.npz"
+
+parser = argparse.ArgumentParser(description="Servicio de puntuación de seguridad para nuevos alojamientos")
+parser.add_argument('--modo', choices=['http', 'stdin'], default='http',
+                    help="http: servidor local (POST /puntuar, GET /metricas); stdin: una consulta JSON por línea")
+parser.add_argument('--host', default='127.0.0.1')
+parser.add_argument('--puerto', type=int, default=8000)
+parser.add_argument('--raster', default=raster_path, help="grid_densidad.npz o grid_densidad.geojson")
+parser.add_argument('--modelo', default=modelo_path, help="modelo_lightgbm.txt, mejor_modelo.pkl o mejor_modelo.npz")
+parser.add_argument('--clusters', default=clusters_path, help="DBSCAN guardado por 2- densidad.py (opcional)")
+args = parser.parse_args()
+
+# === Verificar existencia de archivos ===
+for ruta in (args.raster, args.modelo):
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"No se encuentra el archivo {ruta}. Ejecutá primero el script que lo genera.")
+
+# === Cargar artefactos una sola vez (se recargan solos si cambian en disco) ===
+ruta_clusters = args.clusters if os.path.exists(args.clusters) else None
+servicio = ServicioSeguridad(args.raster, args.modelo, ruta_clusters)
+
+if args.modo == 'stdin':
+    atender_stdin(servicio, sys.stdin, sys.stdout)
+else:
+    servidor = crear_servidor_http(servicio, args.host, args.puerto)
+    print(f"🚀 Servicio escuchando en http://{args.host}:{args.puerto} (POST /puntuar, GET /metricas)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("Servicio detenido.")
+        print(servicio.metricas())
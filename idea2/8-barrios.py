@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.barrios import asignar_barrios, etiquetas_barrio, leer_barrios, tasas_por_barrio
+from pipeline.carga import cargar_delitos, valores_particion
+from pipeline.geocodificacion import normalizar_direccion
+from pipeline.metricas import etapa
+from pipeline.pesos import pesos_por_anio
+
+# === Rutas de archivos ===
+delitos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv'
+barrios_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/barrios.csv'
+alojamientos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/alojamientos-geocodificados-2.csv'
+tasas_path = 'tasas_delitos_barrio.csv'
+alojamientos_salida_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/alojamientos-barrios.csv'
+
+# === Polígonos de barrios (el WKT se parsea una vez y queda en caché binaria) ===
+with etapa('carga_barrios') as registro:
+    barrios = leer_barrios(barrios_path)
+    registro['filas_salida'] = len(barrios['nombre'])
+print(f"Barrios cargados: {len(barrios['nombre'])}")
+
+# === Barrio de cada delito, año por año (memoria acotada al año más grande) ===
+indices, pesos = [], []
+coinciden = con_barrio_texto = 0
+for anio in valores_particion(delitos_path, 'anio'):
+    with etapa('asignacion_barrios', anio=anio) as registro:
+        delitos = cargar_delitos(delitos_path, columnas=['anio', 'latitud', 'longitud', 'barrio'], anios=[anio])
+        indice = asignar_barrios(barrios, delitos['latitud'], delitos['longitud'])
+        indices.append(indice)
+        pesos.append(pesos_por_anio(delitos['anio']))
+
+        # Comparación con la columna de texto libre 'barrio' del dataset
+        nombres, _ = etiquetas_barrio(barrios, indice)
+        texto = delitos['barrio'].astype('string')
+        hay_texto = texto.notna().to_numpy()
+        normalizado = {v: normalizar_direccion(v) for v in texto[hay_texto].unique()}
+        texto_normalizado = texto[hay_texto].map(normalizado).to_numpy()
+        poligono_normalizado = np.array([normalizar_direccion(n) if n else '' for n in nombres[hay_texto]])
+        coinciden += int((texto_normalizado == poligono_normalizado).sum())
+        con_barrio_texto += int(hay_texto.sum())
+        registro['filas_entrada'] = len(delitos)
+        registro['filas_salida'] = int((indice >= 0).sum())
+        print(f"Año {anio}: {len(delitos)} delitos, {int((indice >= 0).sum())} dentro de algún barrio")
+
+indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int16)
+pesos = np.concatenate(pesos) if pesos else np.empty(0)
+print(f"Delitos asignados: {len(indices)}")
+if con_barrio_texto:
+    print(f"Coincidencia con la columna 'barrio' del dataset: {coinciden / con_barrio_texto:.1%}")
+
+# === Tasas por barrio: delitos ponderados por año cada km² (area_metro) ===
+with etapa('tasas_barrio', len(indices)) as registro:
+    tasas = tasas_por_barrio(barrios, indices, pesos)
+    registro['filas_salida'] = len(tasas)
+tasas = tasas.sort_values('tasa_km2', ascending=False)
+tasas.to_csv(tasas_path, index=False)
+print(f"Tasas por barrio guardadas en: {tasas_path}")
+print(tasas.head(10).to_string(index=False))
+
+# === Barrio, comuna y tasa del barrio de cada alojamiento ===
+if os.path.exists(alojamientos_path):
+    alojamientos = pd.read_csv(alojamientos_path)
+    with etapa('barrios_alojamientos', len(alojamientos)) as registro:
+        indice = asignar_barrios(barrios, pd.to_numeric(alojamientos['latitud'], errors='coerce'),
+                                 pd.to_numeric(alojamientos['longitud'], errors='coerce'))
+        registro['filas_salida'] = int((indice >= 0).sum())
+    alojamientos['barrio'], alojamientos['comuna'] = etiquetas_barrio(barrios, indice)
+    tasa_barrio = np.append(tasas.sort_index()['tasa_km2'].to_numpy(), np.nan)
+    alojamientos['tasa_barrio_km2'] = tasa_barrio[indice]
+    alojamientos.to_csv(alojamientos_salida_path, index=False)
+    print(f"Alojamientos con barrio: {int((indice >= 0).sum())} de {len(alojamientos)}")
+    print(f"Archivo guardado en: {alojamientos_salida_path}")
+else:
+    print(f"No se encuentra {alojamientos_path}; se omite la asignación de alojamientos.")
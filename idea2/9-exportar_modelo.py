@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Permite importar el paquete compartido pipeline/ desde la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.compilado import cargar_compilado, compilar_modelo, guardar_compilado, paridad, predecir_proba
+from pipeline.entorno import features_entorno, indexar_capas
+
+
+def percentiles_ms(funcion, filas, repeticiones):
+    # Latencia (ms) de puntuar una fila por llamada, recorriendo las filas en orden
+    tiempos = np.empty(repeticiones)
+    for i in range(repeticiones):
+        fila = filas[i % len(filas)]
+        inicio = time.perf_counter()
+        funcion(fila)
+        tiempos[i] = (time.perf_counter() - inicio) * 1000
+    return np.percentile(tiempos, 50), np.percentile(tiempos, 99)
+
+
+def comparar(nombre, paquete, compilado, X):
+    # Predicciones de sklearn (escalando con el scaler) contra las del compilado (sin escalar)
+    correcto, distintas, diferencia = paridad(paquete, compilado, X)
+    print(f"{'✅' if correcto else '❌'} Paridad {nombre}: {distintas} de {len(X)} clases distintas, "
+          f"diferencia máxima de probabilidad {diferencia:.2e}")
+    return correcto
+
+
+parser = argparse.ArgumentParser(description="Exporta mejor_modelo.pkl a un modelo compilado de NumPy")
+parser.add_argument('--modelo', default='mejor_modelo.pkl', help="Paquete guardado por 6-entrenar_modelos_seguridad.py")
+parser.add_argument('--salida', default='mejor_modelo.npz')
+parser.add_argument('--repeticiones', type=int, default=2000, help="Consultas de una fila para medir la latencia")
+parser.add_argument('--todos', action='store_true',
+                    help="Verificar también la paridad de los otros tipos de modelo, ajustados con los mismos datos")
+args = parser.parse_args()
+
+# === Rutas ===
+dataset_dir = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset'
+data_path = os.path.join(dataset_dir, 'alojamientos-geocodificados-2.csv')
+
+# === Cargar el paquete de sklearn y compilarlo ===
+inicio = time.perf_counter()
+paquete = joblib.load(args.modelo)
+carga_pkl = (time.perf_counter() - inicio) * 1000
+compilado = compilar_modelo(paquete)
+
+# === Features de los alojamientos, igual que en el entrenamiento ===
+df = pd.read_csv(data_path)
+X = df[['latitud', 'longitud', 'densidad', 'cluster']]
+entorno = paquete.get('entorno')
+if entorno:
+    indices = indexar_capas(entorno['capas'])
+    extra = features_entorno(indices, df['latitud'], df['longitud'], entorno['radios'])
+    X = pd.concat([X, extra.set_index(X.index)], axis=1)
+X = X[list(compilado['features'])]
+
+# === Paridad con sklearn, antes de guardar: el servicio carga el .npz si existe ===
+correcto = comparar(type(paquete['modelo']).__name__, paquete, compilado, X)
+if args.todos:
+    from sklearn.base import clone
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.naive_bayes import GaussianNB
+    from sklearn.neural_network import MLPClassifier
+
+    y = paquete['label_encoder'].transform(df['seguridad'])
+    X_scaled = paquete['scaler'].transform(X)
+    for modelo in (RandomForestClassifier(n_estimators=100, random_state=42), GaussianNB(),
+                   MLPClassifier(hidden_layer_sizes=(50, 30), max_iter=1000, random_state=42)):
+        otro = {**paquete, 'modelo': clone(modelo).fit(X_scaled, y)}
+        correcto &= comparar(type(modelo).__name__, otro, compilar_modelo(otro), X)
+if not correcto:
+    sys.exit(f"❌ El compilado no coincide con sklearn; no se guarda {args.salida}")
+
+guardar_compilado(args.salida, compilado)
+inicio = time.perf_counter()
+compilado = cargar_compilado(args.salida)
+carga_npz = (time.perf_counter() - inicio) * 1000
+print(f"💾 Modelo compilado ({type(paquete['modelo']).__name__}) guardado en: {args.salida} "
+      f"({os.path.getsize(args.salida) / 2**20:.2f} MiB; el .pkl ocupa {os.path.getsize(args.modelo) / 2**20:.2f} MiB)")
+print(f"Carga: {carga_pkl:.1f} ms el .pkl, {carga_npz:.1f} ms el .npz")
+
+# === Latencia de una fila y de un lote ===
+filas = X.to_numpy()
+modelo, scaler = paquete['modelo'], paquete['scaler']
+columnas = list(X.columns)
+sk_p50, sk_p99 = percentiles_ms(
+    lambda fila: modelo.predict_proba(scaler.transform(pd.DataFrame(fila[None, :], columns=columnas))),
+    filas, args.repeticiones)
+np_p50, np_p99 = percentiles_ms(lambda fila: predecir_proba(compilado, fila), filas, args.repeticiones)
+inicio = time.perf_counter()
+modelo.predict_proba(scaler.transform(X))
+lote_sk = time.perf_counter() - inicio
+inicio = time.perf_counter()
+predecir_proba(compilado, filas)
+lote_np = time.perf_counter() - inicio
+
+print(f"\nLatencia de una fila ({args.repeticiones} consultas):")
+print(f"  sklearn  : p50 {sk_p50:.3f} ms | p99 {sk_p99:.3f} ms")
+print(f"  compilado: p50 {np_p50:.3f} ms | p99 {np_p99:.3f} ms")
+print(f"Lote de {len(filas)} filas: sklearn {lote_sk * 1000:.1f} ms, compilado {lote_np * 1000:.1f} ms")
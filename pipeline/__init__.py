@@ -0,0 +1 @@
+# Funciones compartidas por los scripts de la tesis (carga, limpieza, grilla, mapas y modelos)
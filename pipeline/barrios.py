@@ -0,0 +1,152 @@
+# Asignación de barrio y comuna por polígonos (barrios.csv) y tasas de delitos por barrio
+import os
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from pipeline.ingesta import huella_archivo
+
+# Puntos por consulta al índice espacial (acota la memoria de los pares punto-polígono)
+TAMANIO_BLOQUE = 1_000_000
+
+SIN_BARRIO = -1
+
+# Celda de la grilla de consulta rápida (~50 m): las celdas enteramente dentro de un barrio se
+# resuelven sin tocar los polígonos; sólo las que cruzan un límite van al índice espacial
+CELDA_CONSULTA = 0.0005
+
+FRONTERA = -2
+
+
+def ruta_cache_barrios(ruta_csv):
+    """Caché binaria de los polígonos que acompaña al CSV (barrios.npz)."""
+    return os.path.splitext(ruta_csv)[0] + '.npz'
+
+
+def _grilla_consulta(geometrias, arbol, cell_size=CELDA_CONSULTA):
+    # Barrio de cada celda si la celda cerrada está en el interior de uno, SIN_BARRIO si no toca
+    # ninguno y FRONTERA si cruza algún límite (ahí hay que consultar los polígonos)
+    xmin, ymin, xmax, ymax = shapely.total_bounds(geometrias)
+    nx = int(np.ceil((xmax - xmin) / cell_size))
+    ny = int(np.ceil((ymax - ymin) / cell_size))
+    iy, ix = np.divmod(np.arange(nx * ny), nx)
+    celdas = shapely.box(xmin + ix * cell_size, ymin + iy * cell_size,
+                         xmin + (ix + 1) * cell_size, ymin + (iy + 1) * cell_size)
+    raster = np.full(nx * ny, SIN_BARRIO, dtype=np.int16)
+    celda, _ = arbol.query(celdas, predicate='intersects')
+    raster[celda] = FRONTERA
+    celda, barrio = arbol.query(celdas, predicate='within')
+    interior = shapely.contains_properly(geometrias[barrio], celdas[celda])
+    raster[celda[interior]] = barrio[interior]
+    return np.array([xmin, ymin, cell_size]), raster.reshape(ny, nx)
+
+
+def _armar_barrios(nombre, comuna, area_metro, geometrias, grilla=None):
+    # Polígonos preparados, índice espacial y grilla de consulta, listos para consultas masivas
+    shapely.prepare(geometrias)
+    arbol = shapely.STRtree(geometrias)
+    origen, raster = grilla if grilla is not None else _grilla_consulta(geometrias, arbol)
+    return {
+        'nombre': nombre,
+        'comuna': comuna,
+        'area_metro': area_metro,
+        'geometrias': geometrias,
+        'arbol': arbol,
+        'origen': origen,
+        'raster': raster,
+    }
+
+
+def leer_barrios(ruta_csv, ruta_cache=None):
+    """Lee los polígonos de barrios.csv (WKT) y los deja en caché como WKB.
+
+    El WKT se parsea una sola vez: mientras el CSV no cambie (tamaño y fecha de modificación)
+    se usa la caché binaria, que también guarda la grilla de consulta rápida.
+    """
+    ruta_cache = ruta_cache or ruta_cache_barrios(ruta_csv)
+    huella = huella_archivo(ruta_csv, calcular_hash=False)
+    if os.path.exists(ruta_cache):
+        with np.load(ruta_cache, allow_pickle=False) as datos:
+            if datos['huella'].tolist() == [huella['tamanio'], huella['mtime']]:
+                wkb = np.split(datos['wkb'], datos['cortes'])
+                return _armar_barrios(datos['nombre'].tolist(), datos['comuna'], datos['area_metro'],
+                                      shapely.from_wkb([parte.tobytes() for parte in wkb]),
+                                      (datos['origen'], datos['raster']))
+
+    df = pd.read_csv(ruta_csv)
+    geometrias = shapely.from_wkt(df['geometry'].to_numpy())
+    # Polígonos con autointersecciones: se corrigen para que contains sea confiable
+    invalidas = ~shapely.is_valid(geometrias)
+    geometrias[invalidas] = shapely.make_valid(geometrias[invalidas])
+    nombre = df['nombre'].astype(str).tolist()
+    comuna = pd.to_numeric(df['comuna'], errors='coerce').fillna(SIN_BARRIO).astype(np.int16).to_numpy()
+    area_metro = pd.to_numeric(df['area_metro'], errors='coerce').to_numpy(dtype=np.float64)
+    # WKB de todos los polígonos en un solo bloque de bytes, con las posiciones de corte
+    wkb = shapely.to_wkb(geometrias)
+    cortes = np.cumsum([len(w) for w in wkb])[:-1]
+    barrios = _armar_barrios(nombre, comuna, area_metro, geometrias)
+    np.savez(ruta_cache, huella=np.array([huella['tamanio'], huella['mtime']]), nombre=np.array(nombre, dtype=str),
+             comuna=comuna, area_metro=area_metro, wkb=np.frombuffer(b''.join(wkb), dtype=np.uint8), cortes=cortes,
+             origen=barrios['origen'], raster=barrios['raster'])
+    return barrios
+
+
+def asignar_barrios(barrios, lat, lon, tamanio_bloque=TAMANIO_BLOQUE):
+    """Índice del barrio que contiene a cada punto (SIN_BARRIO si no cae en ninguno).
+
+    La mayoría de los puntos se resuelve con la grilla de consulta (celdas enteramente dentro de
+    un barrio o fuera de todos); el resto se consulta junto contra el índice espacial (por
+    bloques) en lugar de recorrer los polígonos punto por punto. Un punto sobre el límite entre
+    dos barrios queda en el de menor índice.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    resultado = np.full(len(lat), SIN_BARRIO, dtype=np.int16)
+    xmin, ymin, cell_size = barrios['origen']
+    ny, nx = barrios['raster'].shape
+    with np.errstate(invalid='ignore'):
+        ix = np.floor((lon - xmin) / cell_size)
+        iy = np.floor((lat - ymin) / cell_size)
+    # Fuera de la grilla (o sin coordenadas) no hay barrio posible
+    adentro = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+    posiciones = np.flatnonzero(adentro)
+    resultado[posiciones] = barrios['raster'][iy[posiciones].astype(np.intp), ix[posiciones].astype(np.intp)]
+
+    validos = posiciones[resultado[posiciones] == FRONTERA]
+    resultado[validos] = SIN_BARRIO
+    for inicio in range(0, len(validos), tamanio_bloque):
+        posiciones = validos[inicio:inicio + tamanio_bloque]
+        puntos = shapely.points(lon[posiciones], lat[posiciones])
+        punto, barrio = barrios['arbol'].query(puntos, predicate='intersects')
+        # Con varios barrios por punto se asigna último (y queda) el de menor índice
+        orden = np.lexsort((-barrio, punto))
+        resultado[posiciones[punto[orden]]] = barrio[orden]
+    return resultado
+
+
+def etiquetas_barrio(barrios, indice):
+    """Nombre y comuna de cada punto a partir del índice de asignar_barrios (None / -1 si no hay)."""
+    indice = np.asarray(indice)
+    nombres = np.array(list(barrios['nombre']) + [None], dtype=object)
+    comunas = np.append(barrios['comuna'], SIN_BARRIO)
+    return nombres[indice], comunas[indice]
+
+
+def tasas_por_barrio(barrios, indice, peso=None):
+    """Delitos, delitos ponderados y tasa por km² de cada barrio (según area_metro)."""
+    n = len(barrios['nombre'])
+    indice = np.asarray(indice)
+    dentro = indice != SIN_BARRIO
+    peso = np.ones(len(indice)) if peso is None else np.asarray(peso, dtype=np.float64)
+    conteo = np.bincount(indice[dentro], minlength=n)
+    ponderado = np.bincount(indice[dentro], weights=peso[dentro], minlength=n)
+    area_km2 = barrios['area_metro'] / 1e6
+    return pd.DataFrame({
+        'barrio': barrios['nombre'],
+        'comuna': barrios['comuna'],
+        'area_km2': area_km2.round(3),
+        'delitos': conteo,
+        'delitos_ponderados': ponderado,
+        'tasa_km2': ponderado / area_km2,
+    })
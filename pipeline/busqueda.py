@@ -0,0 +1,167 @@
+# Búsqueda de hiperparámetros por successive halving, con caché en disco de cada (configuración, fold)
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neural_network import MLPClassifier
+
+from pipeline.entrenamiento import FOLDS, ajustar_fold, particiones, resumir_folds
+
+# Espacio de búsqueda de cada modelo: clase, grilla de hiperparámetros y recurso que se reparte
+# en las rondas (un hiperparámetro con su valor máximo, o 'muestras': fracción de las filas)
+ESPACIO = {
+    'Random Forest': (RandomForestClassifier, {
+        'max_depth': [None, 10, 20],
+        'min_samples_leaf': [1, 2, 5],
+        'max_features': ['sqrt', 0.5],
+        'random_state': [42],
+    }, ('n_estimators', 300)),
+    'Naive Bayes': (GaussianNB, {
+        'var_smoothing': [1e-9, 1e-8, 1e-7, 1e-6],
+    }, ('muestras', 1.0)),
+    'Red Neuronal': (MLPClassifier, {
+        'hidden_layer_sizes': [(50, 30), (100,), (100, 50), (64, 64, 32)],
+        'alpha': [1e-4, 1e-3, 1e-2],
+        'learning_rate_init': [1e-3, 1e-2],
+        'random_state': [42],
+    }, ('max_iter', 1000)),
+}
+
+# Factor de eliminación: en cada ronda sigue 1 de cada ETA configuraciones con ETA veces más recurso
+ETA = 3
+
+RONDAS = 3
+
+
+def huella_datos(X, y):
+    """sha256 de la matriz de features y de las etiquetas (clave de la caché)."""
+    sha = hashlib.sha256()
+    for arreglo in (np.ascontiguousarray(X, dtype=np.float64), np.ascontiguousarray(y)):
+        sha.update(str((arreglo.shape, arreglo.dtype.str)).encode())
+        sha.update(arreglo.tobytes())
+    return sha.hexdigest()
+
+
+def configuraciones(espacio=ESPACIO):
+    """Lista de (modelo, hiperparámetros) de todas las combinaciones de la grilla."""
+    resultado = []
+    for nombre, (_, grilla, _) in espacio.items():
+        claves = sorted(grilla)
+        for valores in itertools.product(*(grilla[c] for c in claves)):
+            resultado.append((nombre, dict(zip(claves, valores))))
+    return resultado
+
+
+def estimador(nombre, params, presupuesto=None, espacio=ESPACIO):
+    """Estimador de la configuración; con presupuesto, el recurso toma ese valor."""
+    clase, _, (recurso, maximo) = espacio[nombre]
+    params = dict(params)
+    if recurso != 'muestras':
+        params[recurso] = int(presupuesto if presupuesto is not None else maximo)
+    return clase(**params)
+
+
+def presupuestos(nombre, rondas=RONDAS, eta=ETA, espacio=ESPACIO):
+    """Recurso de cada ronda: el máximo en la última y ETA veces menos en cada anterior."""
+    _, _, (recurso, maximo) = espacio[nombre]
+    valores = [maximo / eta ** (rondas - 1 - r) for r in range(rondas)]
+    return valores if recurso == 'muestras' else [max(int(round(v)), 1) for v in valores]
+
+
+def _clave(huella, nombre, params, fold, folds, semilla, presupuesto):
+    texto = json.dumps({'datos': huella, 'modelo': nombre, 'params': params, 'fold': fold, 'folds': folds,
+                        'semilla': semilla, 'presupuesto': presupuesto}, sort_keys=True, default=repr)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def _leer_cache(ruta):
+    with np.load(ruta) as datos:
+        # Las entradas anteriores a memoria_incremento sólo tienen el pico absoluto del proceso
+        incremento = datos['memoria_incremento'] if 'memoria_incremento' in datos.files else datos['memoria_pico']
+        return {'prediccion': datos['prediccion'], 'acc_train': float(datos['acc_train']),
+                'tiempo': float(datos['tiempo']), 'memoria_pico': int(datos['memoria_pico']),
+                'memoria_incremento': int(incremento)}
+
+
+def ajustar_parcial(modelo, X, y, entrenamiento, prueba, fraccion, semilla):
+    """ajustar_fold con una fracción de las filas de entrenamiento (sin avisos de convergencia)."""
+    if fraccion < 1.0:
+        orden = np.random.default_rng(semilla).permutation(entrenamiento)
+        entrenamiento = np.sort(orden[:max(int(math.ceil(fraccion * len(orden))), 2)])
+    with warnings.catch_warnings():
+        # Con pocas iteraciones la red no converge: es lo esperado en las rondas baratas
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        return ajustar_fold(modelo, X, y, entrenamiento, prueba)
+
+
+def buscar(X, y, dir_cache, espacio=ESPACIO, folds=FOLDS, rondas=RONDAS, eta=ETA, procesos=None, semilla=42):
+    """Successive halving por modelo: todas las configuraciones con poco recurso, y sólo la mejor
+    fracción 1/ETA pasa a la ronda siguiente con ETA veces más.
+
+    Cada (configuración, fold, recurso) se guarda en dir_cache con una clave que incluye la huella
+    de X e y: volver a correr con los mismos datos, o con un espacio ampliado, sólo entrena lo
+    nuevo. Todas las tareas de una ronda (de todos los modelos) van juntas al pool de procesos.
+    Devuelve (mejores, historial): la mejor configuración de cada modelo con sus resultados de
+    validación cruzada con el recurso completo, y la exactitud de cada configuración en cada ronda.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    os.makedirs(dir_cache, exist_ok=True)
+    huella = huella_datos(X, y)
+    cortes = particiones(y, folds, semilla)
+    vivas = {nombre: [p for n, p in configuraciones(espacio) if n == nombre] for nombre in espacio}
+    historial = []
+    resultados = {}
+    inicio = time.perf_counter()
+    entrenadas = en_cache = 0
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count()) as pool:
+        for ronda in range(rondas):
+            evaluadas = {nombre: len(lista) for nombre, lista in vivas.items()}
+            futuros, por_tarea = {}, {}
+            for nombre, lista in vivas.items():
+                presupuesto = presupuestos(nombre, rondas, eta, espacio)[ronda]
+                recurso = espacio[nombre][2][0]
+                for i, params in enumerate(lista):
+                    for k, (entrenamiento, prueba) in enumerate(cortes):
+                        clave = _clave(huella, nombre, params, k, folds, semilla, presupuesto)
+                        ruta = os.path.join(dir_cache, clave + '.npz')
+                        if os.path.exists(ruta):
+                            por_tarea[(nombre, i, k)] = _leer_cache(ruta)
+                            en_cache += 1
+                            continue
+                        modelo = estimador(nombre, params, None if recurso == 'muestras' else presupuesto, espacio)
+                        fraccion = presupuesto if recurso == 'muestras' else 1.0
+                        futuros[(nombre, i, k)] = (ruta, pool.submit(ajustar_parcial, modelo, X, y, entrenamiento,
+                                                                     prueba, fraccion, semilla))
+            for tarea, (ruta, futuro) in futuros.items():
+                resultado = futuro.result()
+                np.savez(ruta, **resultado)
+                por_tarea[tarea] = resultado
+                entrenadas += 1
+
+            for nombre, lista in vivas.items():
+                presupuesto = presupuestos(nombre, rondas, eta, espacio)[ronda]
+                resumenes = [resumir_folds(y, cortes, [por_tarea[(nombre, i, k)] for k in range(len(cortes))])
+                             for i in range(len(lista))]
+                puntajes = [r['acc_folds'].mean() for r in resumenes]
+                for params, puntaje in zip(lista, puntajes):
+                    historial.append({'ronda': ronda, 'modelo': nombre, 'presupuesto': presupuesto,
+                                      'params': params, 'accuracy': float(puntaje)})
+                # Orden estable: ante empates sigue la configuración listada primero
+                orden = sorted(range(len(lista)), key=lambda i: -puntajes[i])
+                if ronda < rondas - 1:
+                    vivas[nombre] = [lista[i] for i in orden[:max(int(math.ceil(len(lista) / eta)), 1)]]
+                else:
+                    resultados[nombre] = {**resumenes[orden[0]], 'params': lista[orden[0]]}
+            print(f"Ronda {ronda + 1}/{rondas}: " + ", ".join(f"{n}: {c} config." for n, c in evaluadas.items()))
+    print(f"Búsqueda en {time.perf_counter() - inicio:.1f} s: {entrenadas} ajustes nuevos, {en_cache} desde la caché")
+    return resultados, historial
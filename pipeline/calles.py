@@ -0,0 +1,162 @@
+# Geocodificación local por interpolación de alturas sobre cada calle (sin consultas por red)
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.geocodificacion import normalizar_direccion
+
+# Palabras del nombre oficial que no identifican a la calle ('CORRIENTES AV.' == 'Av. Corrientes')
+PALABRAS_IGNORADAS = {
+    'av', 'avda', 'avenida', 'pje', 'pasaje', 'calle', 'diagonal', 'boulevard', 'bv', 'de', 'del', 'la', 'las',
+    'los', 'el', 'pres', 'presidente', 'gral', 'general', 'tte', 'teniente', 'cnel', 'coronel', 'dr', 'ing',
+    'gob', 'int', 'cap', 'alte', 'almirante', 'mcal', 'mariscal', 'sgto', 'sargento', 'fray',
+}
+
+# Alturas más allá de las cuales un punto de referencia ya no sirve para ubicar a otro
+ALTURA_MAXIMA = 1000
+
+# Fuera del rango de alturas conocido sólo se extrapola hasta esta distancia (una cuadra y media)
+EXTRAPOLACION_MAXIMA = 150
+
+# Metros por unidad de altura esperables en CABA (100 alturas por cuadra de 100-130 m)
+METROS_POR_ALTURA = (0.5, 2.0)
+
+METROS_POR_GRADO = 111320.0
+
+CONFIANZA_MINIMA = 0.5
+
+
+def clave_calle(calle):
+    """Clave de la calle: palabras normalizadas, sin tipo de vía ni títulos, en orden alfabético.
+
+    'ALEM, LEANDRO N. AV.', 'Av. Leandro N. Alem' y 'Alem Leandro N' dan la misma clave.
+    """
+    if not isinstance(calle, str):
+        return None
+    palabras = [p for p in normalizar_direccion(calle).split() if p not in PALABRAS_IGNORADAS]
+    # Si la calle es sólo palabras ignoradas ('De Mayo Av.' -> 'mayo') se usa el nombre completo
+    palabras = palabras or normalizar_direccion(calle).split()
+    return ' '.join(sorted(palabras)) or None
+
+
+def fuentes_calles(dataset_dir):
+    """Puntos de referencia (calle, altura, latitud, longitud) de los datasets que ya traen ambas cosas.
+
+    Usa cajeros-automaticos.csv, paradas_bus_turistico.csv y los alojamientos ya geocodificados
+    (si existen). De los alojamientos sólo se toman los ubicados por Nominatim: los interpolados
+    son salida de esta misma geocodificación y, si se usaran, en cada corrida una estimación
+    anterior volvería como referencia exacta. Devuelve un DataFrame con la fuente de cada punto.
+    """
+    # (archivo, columnas renombradas, {columna: valores aceptados} o None)
+    lecturas = [
+        ('cajeros-automaticos.csv', {'calle': 'calle', 'altura': 'altura', 'lat': 'latitud', 'long': 'longitud'}, None),
+        ('paradas_bus_turistico.csv',
+         {'calle_nombre': 'calle', 'calle_altura': 'altura', 'lat': 'latitud', 'long': 'longitud'}, None),
+        ('alojamientos-geocodificados.csv',
+         {'calle': 'calle', 'altura': 'altura', 'latitud': 'latitud', 'longitud': 'longitud'},
+         {'fuente_coordenadas': ['nominatim']}),
+    ]
+    partes = []
+    for archivo, columnas, filtro in lecturas:
+        ruta = os.path.join(dataset_dir, archivo)
+        if not os.path.exists(ruta):
+            continue
+        filtro = filtro or {}
+        disponibles = set(pd.read_csv(ruta, nrows=0).columns)
+        if not set(filtro) <= disponibles:
+            # Archivo de una versión anterior, sin la fuente de cada fila: no se puede saber qué es exacto
+            continue
+        df = pd.read_csv(ruta, usecols=list(columnas) + list(filtro))
+        for columna, valores in filtro.items():
+            df = df[df[columna].isin(valores)]
+        df = df[list(columnas)].rename(columns=columnas)
+        df['fuente'] = os.path.splitext(archivo)[0]
+        partes.append(df)
+    puntos = pd.concat(partes, ignore_index=True)
+    for columna in ['altura', 'latitud', 'longitud']:
+        puntos[columna] = pd.to_numeric(puntos[columna], errors='coerce')
+    # Altura 0 es "sin altura" en los datasets de la Ciudad
+    puntos = puntos[(puntos['altura'] > 0) & puntos['latitud'].notna() & puntos['longitud'].notna()]
+    return puntos.reset_index(drop=True)
+
+
+def construir_indice_calles(calles, alturas, lat, lon):
+    """{clave de calle: (alturas, latitudes, longitudes)} ordenado por altura.
+
+    Los puntos repetidos en la misma calle y altura se promedian.
+    """
+    df = pd.DataFrame({'clave': [clave_calle(c) for c in calles], 'altura': np.asarray(alturas, dtype=np.float64),
+                       'latitud': np.asarray(lat, dtype=np.float64), 'longitud': np.asarray(lon, dtype=np.float64)})
+    df = df.dropna()
+    df = df.groupby(['clave', 'altura'], sort=True)[['latitud', 'longitud']].mean().reset_index()
+    return {
+        clave: (grupo['altura'].to_numpy(), grupo['latitud'].to_numpy(), grupo['longitud'].to_numpy())
+        for clave, grupo in df.groupby('clave', sort=False)
+    }
+
+
+def _metros_por_altura(alt, la, lo, i, j):
+    # Distancia entre dos puntos de referencia dividida por la diferencia de alturas
+    dy = (la[j] - la[i]) * METROS_POR_GRADO
+    dx = (lo[j] - lo[i]) * METROS_POR_GRADO * np.cos(np.radians(la[i]))
+    return np.hypot(dx, dy) / np.maximum(alt[j] - alt[i], 1.0)
+
+
+def _interpolar_calle(referencia, alturas):
+    # Coordenadas y confianza de varias alturas de una misma calle
+    alt, la, lo = referencia
+    n = len(alt)
+    lat = np.full(len(alturas), np.nan)
+    lon = np.full(len(alturas), np.nan)
+    confianza = np.zeros(len(alturas))
+
+    derecha = np.searchsorted(alt, alturas)
+    exacta = (derecha < n) & (alt[np.minimum(derecha, n - 1)] == alturas)
+    lat[exacta], lon[exacta], confianza[exacta] = la[derecha[exacta]], lo[derecha[exacta]], 1.0
+
+    if n >= 2:
+        # Segmento que contiene a la altura (o el de un extremo, para extrapolar)
+        i = np.clip(derecha - 1, 0, n - 2)
+        j = i + 1
+        t = (alturas - alt[i]) / (alt[j] - alt[i])
+        distancia = np.minimum(np.abs(alturas - alt[i]), np.abs(alturas - alt[j]))
+        adentro = (alturas > alt[0]) & (alturas < alt[-1])
+        afuera = ~adentro & (distancia <= EXTRAPOLACION_MAXIMA)
+        valida = ~exacta & (adentro | afuera) & (distancia <= ALTURA_MAXIMA)
+        conf = 1.0 - distancia / ALTURA_MAXIMA
+        conf = np.where(afuera, conf * 0.5, conf)
+        # Puntos de referencia que no parecen estar sobre la misma traza (calle con cortes o datos errados)
+        escala = _metros_por_altura(alt, la, lo, i, j)
+        conf = np.where((escala < METROS_POR_ALTURA[0]) | (escala > METROS_POR_ALTURA[1]), conf * 0.5, conf)
+        lat[valida] = (la[i] + t * (la[j] - la[i]))[valida]
+        lon[valida] = (lo[i] + t * (lo[j] - lo[i]))[valida]
+        confianza[valida] = conf[valida]
+    else:
+        # Un solo punto: sirve para alturas de la misma cuadra
+        cercana = ~exacta & (np.abs(alturas - alt[0]) <= EXTRAPOLACION_MAXIMA)
+        lat[cercana], lon[cercana] = la[0], lo[0]
+        confianza[cercana] = 0.5 * (1.0 - np.abs(alturas[cercana] - alt[0]) / ALTURA_MAXIMA)
+    return lat, lon, confianza
+
+
+def geocodificar_por_interpolacion(indice, calles, alturas):
+    """Coordenadas interpoladas y confianza (0 a 1) de cada par calle + altura.
+
+    La confianza es 1 si la altura coincide con un punto de referencia y baja con la distancia
+    (en alturas) al punto más cercano; se reduce a la mitad al extrapolar fuera del tramo conocido
+    o si los puntos del tramo no guardan la escala esperada. Sin resultado: NaN y confianza 0.
+    """
+    claves = pd.Series([clave_calle(c) for c in calles])
+    alturas = pd.to_numeric(pd.Series(list(alturas)), errors='coerce').to_numpy(dtype=np.float64)
+    lat = np.full(len(claves), np.nan)
+    lon = np.full(len(claves), np.nan)
+    confianza = np.zeros(len(claves))
+    # Se agrupan las consultas por calle para resolver cada una con una sola búsqueda ordenada
+    for clave, posiciones in claves.groupby(claves, sort=False).indices.items():
+        if clave not in indice:
+            continue
+        posiciones = posiciones[alturas[posiciones] > 0]
+        if len(posiciones):
+            lat[posiciones], lon[posiciones], confianza[posiciones] = _interpolar_calle(indice[clave], alturas[posiciones])
+    return lat, lon, confianza
@@ -0,0 +1,194 @@
+# Carga tipada y compartida del consolidado de delitos (delitos_total)
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+
+from pipeline.coordenadas import LAT_MIN, LAT_MAX, LON_MIN, LON_MAX
+
+# Columnas categóricas (pocos valores distintos repetidos millones de veces)
+COLUMNAS_CATEGORICAS = ['tipo', 'subtipo', 'barrio', 'comuna', 'uso_arma', 'uso_moto']
+
+# Archivo que marca que el almacén particionado se terminó de escribir
+MARCA_COMPLETO = '_COMPLETO'
+
+# Huella del contenido de cada año, escrita junto a las particiones
+HUELLAS_ANIO = '_huellas_anio.json'
+
+# Columnas que entran en la huella de un año (las que se binnean en los rásters anuales)
+COLUMNAS_HUELLA = ['latitud', 'longitud', 'fecha']
+
+# Tipos compactos para el resto de las columnas usadas en el análisis
+TIPOS_COMPACTOS = {
+    'latitud': np.float32,
+    'longitud': np.float32,
+    'anio': np.int16,
+    'franja': np.int8,
+}
+
+
+def ruta_artefacto_de(ruta_csv):
+    """Carpeta del almacén particionado que acompaña al CSV (mismo nombre, sin extensión)."""
+    return os.path.splitext(ruta_csv)[0]
+
+
+def tipar_delitos(df):
+    """Valida coordenadas y convierte las columnas de delitos a tipos compactos.
+
+    Aplica el mismo filtro que repetían los scripts (números válidos, distintos de cero y dentro
+    de CABA). Los valores faltantes de anio/franja se guardan como -1.
+    """
+    df['latitud'] = pd.to_numeric(df['latitud'], errors='coerce')
+    df['longitud'] = pd.to_numeric(df['longitud'], errors='coerce')
+    df = df.dropna(subset=['latitud', 'longitud'])
+    df = df[(df['latitud'] != 0) & (df['longitud'] != 0)]
+    df = df[df['latitud'].between(LAT_MIN, LAT_MAX) & df['longitud'].between(LON_MIN, LON_MAX)]
+    df = df.reset_index(drop=True)
+
+    if 'fecha' in df.columns:
+        df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns:
+            df[columna] = df[columna].astype('string').astype('category')
+    for columna, tipo in TIPOS_COMPACTOS.items():
+        if columna not in df.columns:
+            continue
+        valores = pd.to_numeric(df[columna], errors='coerce')
+        if np.issubdtype(tipo, np.integer):
+            valores = valores.fillna(-1)
+        df[columna] = valores.astype(tipo)
+    # El resto de las columnas de texto se guardan como texto para que el esquema sea estable
+    for columna in df.columns:
+        if df[columna].dtype == object:
+            df[columna] = df[columna].astype('string')
+    return df
+
+
+def huella_delitos(df):
+    """sha256 de latitud, longitud y fecha (las que estén) de un grupo de delitos, en su orden."""
+    sha = hashlib.sha256()
+    for columna in COLUMNAS_HUELLA:
+        if columna not in df.columns:
+            continue
+        valores = df[columna]
+        if columna == 'fecha':
+            valores = pd.to_datetime(valores).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        else:
+            valores = valores.to_numpy(dtype=np.float64)
+        sha.update(columna.encode('utf-8'))
+        sha.update(np.ascontiguousarray(valores).tobytes())
+    return sha.hexdigest()
+
+
+def _particionado():
+    # Particiones estilo hive: anio=2023/tipo=Robo/part-0.arrow
+    return ds.partitioning(pa.schema([('anio', pa.int16()), ('tipo', pa.string())]), flavor='hive')
+
+
+def guardar_artefacto(df, ruta_artefacto):
+    """Escribe el DataFrame tipado particionado por anio y tipo.
+
+    Cada partición es un archivo Arrow IPC sin compresión, así se puede abrir memory-mapped.
+    Junto a las particiones se guarda la huella de cada año (huella_delitos): el almacén se
+    reescribe completo en cada ingesta, y así se sabe qué años cambiaron sin leerlos.
+    """
+    df = df.assign(tipo=df['tipo'].astype('string').fillna('Sin dato'))
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    temporal = ruta_artefacto + '.tmp'
+    if os.path.exists(temporal):
+        shutil.rmtree(temporal)
+    ds.write_dataset(tabla, temporal, format='ipc', partitioning=_particionado(),
+                     basename_template='parte-{i}.arrow')
+    columnas = [c for c in COLUMNAS_HUELLA if c in df.columns]
+    huellas = {str(anio): huella_delitos(df[columnas].iloc[posiciones])
+               for anio, posiciones in df.groupby('anio', sort=True).indices.items()}
+    with open(os.path.join(temporal, HUELLAS_ANIO), 'w', encoding='utf-8') as f:
+        json.dump(huellas, f, indent=2)
+    # Marca de escritura completa (su fecha se usa para saber si el almacén está vigente)
+    open(os.path.join(temporal, MARCA_COMPLETO), 'w').close()
+    if os.path.exists(ruta_artefacto):
+        shutil.rmtree(ruta_artefacto)
+    os.replace(temporal, ruta_artefacto)
+
+
+def construir_artefacto(ruta_csv, ruta_artefacto=None):
+    """Lee el CSV consolidado una sola vez, lo valida y guarda el almacén particionado."""
+    ruta_artefacto = ruta_artefacto or ruta_artefacto_de(ruta_csv)
+    print(f"Construyendo almacén particionado de delitos desde: {ruta_csv}")
+    dtype = {columna: 'string' for columna in COLUMNAS_CATEGORICAS}
+    df = pd.read_csv(ruta_csv, dtype=dtype)
+    df = tipar_delitos(df)
+    guardar_artefacto(df, ruta_artefacto)
+    print(f"Almacén guardado en: {ruta_artefacto} ({len(df)} registros)")
+    return ruta_artefacto
+
+
+def artefacto_vigente(ruta_csv, ruta_artefacto):
+    """True si el almacén se terminó de escribir y es más nuevo que el CSV del que se generó."""
+    marca = os.path.join(ruta_artefacto, MARCA_COMPLETO)
+    if not os.path.exists(marca):
+        return False
+    if not os.path.exists(ruta_csv):
+        return True
+    return os.path.getmtime(marca) >= os.path.getmtime(ruta_csv)
+
+
+def abrir_almacen(ruta_csv):
+    """Dataset de pyarrow sobre el almacén particionado (lo genera si falta o quedó viejo)."""
+    ruta_artefacto = ruta_artefacto_de(ruta_csv)
+    if not artefacto_vigente(ruta_csv, ruta_artefacto):
+        construir_artefacto(ruta_csv, ruta_artefacto)
+    return ds.dataset(ruta_artefacto, format='ipc', partitioning=_particionado(),
+                      filesystem=fs.LocalFileSystem(use_mmap=True),
+                      exclude_invalid_files=True)
+
+
+def huellas_anio(ruta_csv):
+    """{anio: huella} guardado con el almacén ({} si el almacén es de una versión anterior)."""
+    abrir_almacen(ruta_csv)
+    ruta = os.path.join(ruta_artefacto_de(ruta_csv), HUELLAS_ANIO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return {int(anio): huella for anio, huella in json.load(f).items()}
+
+
+def valores_particion(ruta_csv, columna):
+    """Valores de anio o tipo presentes en el almacén, leídos de los nombres de las particiones."""
+    dataset = abrir_almacen(ruta_csv)
+    valores = set()
+    for fragmento in dataset.get_fragments():
+        valor = ds.get_partition_keys(fragmento.partition_expression).get(columna)
+        if valor is not None:
+            valores.add(valor)
+    return sorted(valores)
+
+
+def cargar_delitos(ruta_csv, columnas=None, anios=None, tipos=None):
+    """Devuelve el consolidado de delitos ya limpio y tipado.
+
+    La primera vez (o si el CSV cambió) se genera el almacén particionado; después se abre
+    memory-mapped. Los filtros anios/tipos sólo leen las particiones que corresponden y
+    columnas limita las columnas leídas.
+    """
+    dataset = abrir_almacen(ruta_csv)
+    filtro = None
+    if anios is not None:
+        filtro = ds.field('anio').isin([int(a) for a in anios])
+    if tipos is not None:
+        filtro_tipo = ds.field('tipo').isin([str(t) for t in tipos])
+        filtro = filtro_tipo if filtro is None else filtro & filtro_tipo
+    tabla = dataset.to_table(columns=columnas, filter=filtro)
+    df = tabla.to_pandas(split_blocks=True)
+    # Las columnas de partición vuelven como texto/int32: se restablecen los tipos compactos
+    if 'tipo' in df.columns:
+        df['tipo'] = df['tipo'].astype('category')
+    if 'anio' in df.columns:
+        df['anio'] = df['anio'].astype(np.int16)
+    return df
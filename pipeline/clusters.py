@@ -0,0 +1,37 @@
+# Persistencia del DBSCAN de alojamientos y asignación de clúster a puntos nuevos
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def guardar_clusters(ruta, db):
+    """Guarda las muestras núcleo del DBSCAN ajustado, sus etiquetas y el eps usado (.npz)."""
+    nucleos = np.asarray(db.components_, dtype=np.float64)
+    etiquetas = np.asarray(db.labels_)[db.core_sample_indices_]
+    np.savez(ruta, nucleos=nucleos, etiquetas=etiquetas, eps=np.array(db.eps))
+
+
+def cargar_clusters(ruta):
+    """Lee el archivo de guardar_clusters y arma el índice espacial de las muestras núcleo."""
+    with np.load(ruta) as datos:
+        nucleos, etiquetas, eps = datos['nucleos'], datos['etiquetas'], float(datos['eps'])
+    return {'arbol': cKDTree(nucleos) if len(nucleos) else None, 'etiquetas': etiquetas, 'eps': eps}
+
+
+def asignar_clusters(clusters, lat, lon):
+    """Etiqueta DBSCAN para puntos nuevos: la de la muestra núcleo más cercana si está a menos de eps.
+
+    Es el mismo criterio (distancia <= eps) con el que DBSCAN etiqueta los puntos de borde; el resto
+    queda como ruido (-1).
+    Las coordenadas van en el mismo orden (latitud, longitud) con el que se ajustó el modelo.
+    """
+    puntos = np.column_stack([np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)])
+    resultado = np.full(len(puntos), -1, dtype=np.int64)
+    if clusters['arbol'] is None or len(puntos) == 0:
+        return resultado
+    # Las coordenadas faltantes quedan como ruido
+    validos = np.flatnonzero(np.isfinite(puntos).all(axis=1))
+    distancia, indice = clusters['arbol'].query(puntos[validos], k=1,
+                                                distance_upper_bound=np.nextafter(clusters['eps'], np.inf))
+    encontrado = np.isfinite(distancia)
+    resultado[validos[encontrado]] = clusters['etiquetas'][indice[encontrado]]
+    return resultado
@@ -0,0 +1,222 @@
+# Modelo compilado a arreglos de NumPy: se carga en milisegundos y puntúa sin sklearn
+import numpy as np
+
+# Filas por bloque al recorrer los árboles (acota la memoria de los índices de nodo)
+FILAS_POR_BLOQUE = 4096
+
+# Diferencia máxima de probabilidad con sklearn para dar por buena la compilación
+TOLERANCIA_PARIDAD = 1e-9
+
+
+def _plegar_escalado(scaler, n_features):
+    # media y escala del StandardScaler (sin scaler: identidad)
+    if scaler is None:
+        return np.zeros(n_features), np.ones(n_features)
+    media = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    escala = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    return np.asarray(media, dtype=np.float64), np.asarray(escala, dtype=np.float64)
+
+
+def _compilar_bosque(modelo, media, escala):
+    # Todos los árboles en arreglos planos; las hojas apuntan a sí mismas y siempre van a la izquierda.
+    # El escalado no se pliega en los umbrales: sklearn compara X escalado y pasado a float32, y
+    # un umbral llevado a la escala original no reproduce ese redondeo en los bordes
+    features, umbrales, izquierdos, derechos, valores, raices = [], [], [], [], [], []
+    desplazamiento = profundidad = 0
+    for arbol in modelo.estimators_:
+        t = arbol.tree_
+        hoja = t.children_left < 0
+        propio = np.arange(t.node_count) + desplazamiento
+        feature = np.where(hoja, 0, t.feature)
+        umbral = np.where(hoja, np.inf, t.threshold)
+        valor = t.value[:, 0, :]
+        features.append(feature.astype(np.int32))
+        umbrales.append(umbral)
+        izquierdos.append(np.where(hoja, propio, t.children_left + desplazamiento).astype(np.int32))
+        derechos.append(np.where(hoja, propio, t.children_right + desplazamiento).astype(np.int32))
+        valores.append(valor / valor.sum(axis=1, keepdims=True))
+        raices.append(desplazamiento)
+        desplazamiento += t.node_count
+        profundidad = max(profundidad, t.max_depth)
+    return {
+        'tipo': 'bosque',
+        'raices': np.array(raices, dtype=np.int32),
+        'feature': np.concatenate(features),
+        'umbral': np.concatenate(umbrales),
+        'izquierdo': np.concatenate(izquierdos),
+        'derecho': np.concatenate(derechos),
+        'valor': np.concatenate(valores),
+        'profundidad': np.int32(profundidad),
+        'media': media,
+        'escala': escala,
+    }
+
+
+def _compilar_red(modelo, media, escala):
+    # La primera capa absorbe el escalado: (x - m) / s @ W + b = x @ (W / s) + (b - (m / s) @ W)
+    compilado = {
+        'tipo': 'red',
+        'capas': np.int32(len(modelo.coefs_)),
+        'activacion': np.array(modelo.activation),
+        'activacion_salida': np.array(modelo.out_activation_),
+    }
+    for i, (pesos, sesgo) in enumerate(zip(modelo.coefs_, modelo.intercepts_)):
+        if i == 0:
+            sesgo = sesgo - (media / escala) @ pesos
+            pesos = pesos / escala[:, None]
+        compilado[f'pesos_{i}'] = np.ascontiguousarray(pesos, dtype=np.float64)
+        compilado[f'sesgo_{i}'] = np.asarray(sesgo, dtype=np.float64)
+    return compilado
+
+
+def _compilar_bayes(modelo, media, escala):
+    # Medias y varianzas llevadas a la escala original: la verosimilitud cambia en una constante
+    # igual para todas las clases, así que las probabilidades no cambian
+    varianza = modelo.var_ * escala ** 2
+    return {
+        'tipo': 'bayes',
+        'media': modelo.theta_ * escala + media,
+        'inversa_varianza': 1.0 / varianza,
+        'constante': np.log(modelo.class_prior_) - 0.5 * np.log(2 * np.pi * varianza).sum(axis=1),
+    }
+
+
+COMPILADORES = {
+    'RandomForestClassifier': _compilar_bosque,
+    'MLPClassifier': _compilar_red,
+    'GaussianNB': _compilar_bayes,
+}
+
+
+def compilar_modelo(paquete):
+    """Convierte el paquete de mejor_modelo.pkl (modelo, scaler, label encoder) en arreglos.
+
+    El escalado queda plegado en los pesos o medias del modelo (en el bosque se aplica antes de
+    recorrer los árboles, como en sklearn), así que el compilado recibe las features sin escalar.
+    Devuelve un dict de arreglos listo para guardar_compilado.
+    """
+    modelo = paquete['modelo']
+    clase = type(modelo).__name__
+    if clase not in COMPILADORES:
+        raise ValueError(f"Modelo no soportado: {clase} (usar {', '.join(COMPILADORES)})")
+    n_features = modelo.n_features_in_
+    media, escala = _plegar_escalado(paquete.get('scaler'), n_features)
+    compilado = COMPILADORES[clase](modelo, media, escala)
+    compilado['clases'] = np.asarray(paquete['label_encoder'].classes_).astype(str)
+    features = paquete.get('features') or [f'x{i}' for i in range(n_features)]
+    compilado['features'] = np.array(features, dtype=str)
+    entorno = paquete.get('entorno')
+    if entorno:
+        compilado['entorno_capas'] = np.array(list(entorno['capas']), dtype=str)
+        compilado['entorno_radios'] = np.asarray(entorno['radios'], dtype=np.float64)
+        for nombre, coordenadas in entorno['capas'].items():
+            compilado[f'entorno_{nombre}'] = np.asarray(coordenadas, dtype=np.float64)
+    return compilado
+
+
+def guardar_compilado(ruta, compilado):
+    """Guarda el compilado como .npz sin pickle (sólo arreglos numéricos y de texto)."""
+    np.savez(ruta, **{clave: np.asarray(valor) for clave, valor in compilado.items()})
+
+
+def cargar_compilado(ruta):
+    """Lee un compilado guardado; no importa sklearn."""
+    with np.load(ruta, allow_pickle=False) as datos:
+        compilado = {clave: datos[clave] for clave in datos.files}
+    for clave in ('tipo', 'activacion', 'activacion_salida'):
+        if clave in compilado:
+            compilado[clave] = str(compilado[clave])
+    return compilado
+
+
+def entorno_compilado(compilado):
+    """{'capas': {capa: coordenadas}, 'radios': [...]} guardado en el compilado, o None."""
+    if 'entorno_capas' not in compilado:
+        return None
+    capas = {str(nombre): compilado[f'entorno_{nombre}'] for nombre in compilado['entorno_capas']}
+    return {'capas': capas, 'radios': compilado['entorno_radios'].tolist()}
+
+
+def _probabilidades_bosque(c, X):
+    # Igual que StandardScaler.transform y la conversión a float32 de los árboles de sklearn
+    X = ((X - c['media']) / c['escala']).astype(np.float32)
+    filas = np.arange(len(X))[:, None]
+    nodo = np.repeat(c['raices'][None, :], len(X), axis=0)
+    for _ in range(int(c['profundidad'])):
+        izquierda = X[filas, c['feature'][nodo]] <= c['umbral'][nodo]
+        nodo = np.where(izquierda, c['izquierdo'][nodo], c['derecho'][nodo])
+    return c['valor'][nodo].mean(axis=1)
+
+
+def _activar(z, activacion):
+    if activacion == 'relu':
+        return np.maximum(z, 0)
+    if activacion == 'tanh':
+        return np.tanh(z)
+    if activacion == 'logistic':
+        return 1.0 / (1.0 + np.exp(-z))
+    return z
+
+
+def _probabilidades_red(c, X):
+    a = X
+    capas = int(c['capas'])
+    for i in range(capas):
+        a = a @ c[f'pesos_{i}'] + c[f'sesgo_{i}']
+        if i < capas - 1:
+            a = _activar(a, c['activacion'])
+    if c['activacion_salida'] == 'softmax':
+        a = np.exp(a - a.max(axis=1, keepdims=True))
+        return a / a.sum(axis=1, keepdims=True)
+    # Dos clases: una sola salida logística
+    p = _activar(a, 'logistic')[:, 0]
+    return np.column_stack([1 - p, p])
+
+
+def _probabilidades_bayes(c, X):
+    diferencia = X[:, None, :] - c['media'][None, :, :]
+    verosimilitud = c['constante'] - 0.5 * (diferencia ** 2 * c['inversa_varianza']).sum(axis=2)
+    verosimilitud -= verosimilitud.max(axis=1, keepdims=True)
+    p = np.exp(verosimilitud)
+    return p / p.sum(axis=1, keepdims=True)
+
+
+EVALUADORES = {
+    'bosque': _probabilidades_bosque,
+    'red': _probabilidades_red,
+    'bayes': _probabilidades_bayes,
+}
+
+
+def predecir_proba(compilado, X):
+    """Probabilidades de cada clase (en el orden de compilado['clases']) para una fila o un lote.
+
+    X son las features sin escalar, en el orden de compilado['features'].
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[None, :]
+    evaluar = EVALUADORES[compilado['tipo']]
+    if len(X) <= FILAS_POR_BLOQUE:
+        return evaluar(compilado, X)
+    return np.concatenate([evaluar(compilado, X[i:i + FILAS_POR_BLOQUE])
+                           for i in range(0, len(X), FILAS_POR_BLOQUE)])
+
+
+def predecir(compilado, X):
+    """Clase más probable de cada fila."""
+    return compilado['clases'][np.argmax(predecir_proba(compilado, X), axis=1)]
+
+
+def paridad(paquete, compilado, X, tolerancia=TOLERANCIA_PARIDAD):
+    """Compara el compilado con el paquete de sklearn sobre las filas de X (features sin escalar).
+
+    Devuelve (correcto, filas con otra clase, diferencia máxima de probabilidad).
+    """
+    # X se pasa tal cual a sklearn (un DataFrame conserva los nombres de columna del scaler)
+    scaler = paquete.get('scaler')
+    esperado = paquete['modelo'].predict_proba(scaler.transform(X) if scaler is not None else X)
+    obtenido = predecir_proba(compilado, np.asarray(X, dtype=np.float64))
+    diferencia = float(np.abs(esperado - obtenido).max()) if len(esperado) else 0.0
+    distintas = int((esperado.argmax(axis=1) != obtenido.argmax(axis=1)).sum())
+    return distintas == 0 and diferencia <= tolerancia, distintas, diferencia
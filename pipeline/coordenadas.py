@@ -0,0 +1,51 @@
+# Corrección vectorizada de coordenadas geográficas de los delitos
+import numpy as np
+import pandas as pd
+
+# Rango válido para CABA
+LAT_MIN, LAT_MAX = -34.7, -34.5
+LON_MIN, LON_MAX = -58.6, -58.3
+
+
+def corregir_coordenadas_vectorizado(latitudes, longitudes):
+    """Versión columnar de corregir_coordenadas: recibe columnas completas en lugar de una fila.
+
+    Devuelve (lat, lon, conteos). Las coordenadas que no se pueden convertir a número o que
+    siguen fuera de CABA después de la corrección quedan en NaN, igual que en la versión por fila.
+    """
+    # Conversión explícita a float (lo que no se puede convertir queda como NaN)
+    lat = pd.to_numeric(pd.Series(latitudes), errors='coerce').to_numpy(dtype=np.float64, copy=True)
+    lon = pd.to_numeric(pd.Series(longitudes), errors='coerce').to_numpy(dtype=np.float64, copy=True)
+    no_convertibles = np.isnan(lat) | np.isnan(lon)
+
+    # Si la latitud o longitud están fuera de rango y parecen escaladas, dividir por 1e6
+    escalar_lat = ~((lat >= LAT_MIN) & (lat <= LAT_MAX)) & (np.abs(lat) > 90)
+    escalar_lon = ~((lon >= LON_MIN) & (lon <= LON_MAX)) & (np.abs(lon) > 180)
+    lat[escalar_lat] /= 1e6
+    lon[escalar_lon] /= 1e6
+
+    # Si después de la corrección sigue fuera de rango, se descarta
+    en_rango = (lat >= LAT_MIN) & (lat <= LAT_MAX) & (lon >= LON_MIN) & (lon <= LON_MAX)
+    fuera_de_rango = ~no_convertibles & ~en_rango
+    lat[~en_rango] = np.nan
+    lon[~en_rango] = np.nan
+
+    conteos = {
+        'total': int(len(lat)),
+        'reescaladas': int((escalar_lat | escalar_lon).sum()),
+        'no_convertibles': int(no_convertibles.sum()),
+        'fuera_de_rango': int(fuera_de_rango.sum()),
+        'validas': int(en_rango.sum()),
+    }
+    return lat, lon, conteos
+
+
+def limpiar_coordenadas(df):
+    """Corrige latitud/longitud de un DataFrame de delitos y elimina las filas inválidas.
+
+    Devuelve el DataFrame limpio y los conteos de calidad de datos del archivo.
+    """
+    lat, lon, conteos = corregir_coordenadas_vectorizado(df['latitud'], df['longitud'])
+    df = df.assign(latitud=lat, longitud=lon)
+    df = df[~np.isnan(lat)]
+    return df, conteos
@@ -0,0 +1,148 @@
+# Cubo de agregados de delitos: conteo por celda x tipo x subtipo x franja x año x arma x moto
+import numpy as np
+import pandas as pd
+
+from pipeline.carga import cargar_delitos, valores_particion
+from pipeline.grilla import Grilla, asignar_celdas, asignar_celdas_semiabiertas, densidad_en_puntos, grid_id_a_raster
+
+# Dimensiones del cubo además de la celda (en este orden)
+DIMENSIONES = ['tipo', 'subtipo', 'franja', 'anio', 'uso_arma', 'uso_moto']
+
+SIN_DATO = 'Sin dato'
+
+
+def _factorizar(valores):
+    # Códigos y etiquetas de una columna (los faltantes van a SIN_DATO)
+    codigos, etiquetas = pd.factorize(pd.Series(valores).astype('string').fillna(SIN_DATO), sort=True)
+    return codigos.astype(np.int64), [str(e) for e in etiquetas]
+
+
+def _agregar(claves, conteos):
+    # Suma los conteos de las claves repetidas
+    claves_unicas, inverso = np.unique(claves, return_inverse=True)
+    return claves_unicas, np.bincount(inverso, weights=conteos).astype(np.float64)
+
+
+def _separar(clave, tamanios):
+    # Clave lineal -> (celda, código de cada dimensión)
+    codigos = []
+    for tamanio in reversed(tamanios):
+        codigos.append(clave % tamanio)
+        clave = clave // tamanio
+    return clave, codigos[::-1]
+
+
+def construir_cubo(ruta_csv, grilla, bordes='estricto'):
+    """Arma el cubo disperso leyendo el almacén año por año (memoria acotada al año más grande).
+
+    Cada entrada del cubo es una combinación con al menos un delito: la celda, el código de
+    cada dimensión y la cantidad de delitos.
+    """
+    columnas = ['latitud', 'longitud'] + DIMENSIONES
+    asignar = asignar_celdas if bordes == 'estricto' else asignar_celdas_semiabiertas
+    parciales = []
+    for anio in valores_particion(ruta_csv, 'anio'):
+        df = cargar_delitos(ruta_csv, columnas=columnas, anios=[anio])
+        posiciones, celdas = asignar(grilla, df['latitud'], df['longitud'])
+        # Códigos locales del año; se llevan a etiquetas comunes cuando estén todos los años
+        clave, tamanios, etiquetas = celdas.astype(np.int64), [], []
+        for dim in DIMENSIONES:
+            codigos, etiquetas_dim = _factorizar(df[dim].to_numpy()[posiciones])
+            tamanio = max(len(etiquetas_dim), 1)
+            clave = clave * tamanio + codigos
+            tamanios.append(tamanio)
+            etiquetas.append(etiquetas_dim)
+        clave, conteo = _agregar(clave, np.ones(len(clave)))
+        celda, codigos = _separar(clave, tamanios)
+        parciales.append((celda, codigos, etiquetas, conteo))
+        print(f"Cubo: año {anio} con {len(df)} delitos en {len(clave)} combinaciones")
+
+    # Etiquetas comunes de cada dimensión y traducción de los códigos de cada año
+    etiquetas_globales = {dim: sorted({e for p in parciales for e in p[2][i]}) for i, dim in enumerate(DIMENSIONES)}
+    celdas = [p[0] for p in parciales]
+    codigos_globales = {dim: [] for dim in DIMENSIONES}
+    for _, codigos, etiquetas, _ in parciales:
+        for i, dim in enumerate(DIMENSIONES):
+            indice = {e: c for c, e in enumerate(etiquetas_globales[dim])}
+            traduccion = np.array([indice[e] for e in etiquetas[i]] or [0], dtype=np.int16)
+            codigos_globales[dim].append(traduccion[codigos[i]])
+
+    def unir(partes, dtype):
+        return np.concatenate(partes).astype(dtype) if partes else np.empty(0, dtype=dtype)
+
+    # Los años no se solapan (anio es dimensión), así que las entradas ya son únicas
+    return {
+        'grilla': grilla,
+        'celda': unir(celdas, np.int32),
+        'conteo': unir([p[3] for p in parciales], np.float32),
+        'codigos': {dim: unir(codigos_globales[dim], np.int16) for dim in DIMENSIONES},
+        'etiquetas': etiquetas_globales,
+    }
+
+
+def guardar_cubo(ruta, cubo):
+    """Guarda el cubo en formato .npz comprimido."""
+    g = cubo['grilla']
+    datos = {
+        'extension': np.array([g.xmin, g.ymin, g.xmax, g.ymax, g.cell_size]),
+        'celda': cubo['celda'],
+        'conteo': cubo['conteo'],
+    }
+    for dim in DIMENSIONES:
+        datos[f'codigo_{dim}'] = cubo['codigos'][dim]
+        datos[f'etiquetas_{dim}'] = np.array(cubo['etiquetas'][dim], dtype=str)
+    np.savez_compressed(ruta, **datos)
+
+
+def cargar_cubo(ruta):
+    """Lee un cubo guardado con guardar_cubo."""
+    with np.load(ruta) as datos:
+        grilla = Grilla(*datos['extension'].tolist())
+        return {
+            'grilla': grilla,
+            'celda': datos['celda'],
+            'conteo': datos['conteo'],
+            'codigos': {dim: datos[f'codigo_{dim}'] for dim in DIMENSIONES},
+            'etiquetas': {dim: datos[f'etiquetas_{dim}'].tolist() for dim in DIMENSIONES},
+        }
+
+
+def _mascara(cubo, dim, valores):
+    # Entradas cuyo valor en la dimensión está entre los pedidos (se comparan como texto)
+    pedidos = {str(v) for v in valores}
+    codigos_validos = [c for c, etiqueta in enumerate(cubo['etiquetas'][dim]) if str(etiqueta) in pedidos]
+    return np.isin(cubo['codigos'][dim], codigos_validos)
+
+
+def consultar_cubo(cubo, tipos=None, subtipos=None, franjas=None, anios=None, anio_desde=None,
+                   uso_arma=None, uso_moto=None, pesos_anio=None):
+    """Suma las porciones del cubo que cumplen los filtros y devuelve un ráster (ny, nx).
+
+    Por ejemplo, robos nocturnos con arma desde 2021:
+    consultar_cubo(cubo, tipos=['Robo'], franjas=range(20, 24), anio_desde=2021, uso_arma=['SI']).
+    Con pesos_anio ({anio: peso}) cada año se pondera como en la grilla de densidad.
+    """
+    mascara = np.ones(len(cubo['conteo']), dtype=bool)
+    filtros = {'tipo': tipos, 'subtipo': subtipos, 'franja': franjas, 'anio': anios,
+               'uso_arma': uso_arma, 'uso_moto': uso_moto}
+    for dim, valores in filtros.items():
+        if valores is not None:
+            mascara &= _mascara(cubo, dim, valores)
+    if anio_desde is not None:
+        anios_validos = [a for a in cubo['etiquetas']['anio'] if str(a).lstrip('-').isdigit() and int(a) >= anio_desde]
+        mascara &= _mascara(cubo, 'anio', anios_validos)
+
+    pesos = cubo['conteo'][mascara].astype(np.float64)
+    if pesos_anio is not None:
+        factor = np.array([pesos_anio.get(int(a), 0.0) if str(a).lstrip('-').isdigit() else 0.0
+                           for a in cubo['etiquetas']['anio']])
+        pesos = pesos * factor[cubo['codigos']['anio'][mascara]]
+    grilla = cubo['grilla']
+    total = np.bincount(cubo['celda'][mascara], weights=pesos, minlength=grilla.nx * grilla.ny)
+    return grid_id_a_raster(grilla, total)
+
+
+def densidad_franja(cubo, lat, lon, franjas, **filtros):
+    """Densidad de los delitos de las franjas horarias pedidas en la celda de cada punto."""
+    raster = consultar_cubo(cubo, franjas=franjas, **filtros)
+    return densidad_en_puntos(cubo['grilla'], raster, lat, lon)
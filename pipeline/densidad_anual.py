@@ -0,0 +1,82 @@
+# Rásters de densidad por año, recalculados sólo cuando cambian los datos de ese año
+import os
+
+import numpy as np
+
+from pipeline.carga import (COLUMNAS_HUELLA, abrir_almacen, cargar_delitos, huella_delitos, huellas_anio,
+                            valores_particion)
+from pipeline.grilla import densidad_grilla
+from pipeline.pesos import anio_decimal
+
+
+def _clave_configuracion(grilla, bordes, vida_media):
+    return np.array([grilla.xmin, grilla.ymin, grilla.xmax, grilla.ymax, grilla.cell_size,
+                     1.0 if bordes == 'inferior' else 0.0, vida_media or 0.0])
+
+
+def _columnas_binneo(vida_media):
+    return ['latitud', 'longitud'] + (['fecha'] if vida_media else [])
+
+
+def _binnear(df, anio, grilla, bordes, vida_media):
+    rasters = {'conteo': densidad_grilla(grilla, df['latitud'], df['longitud'], bordes=bordes)}
+    if vida_media:
+        # Factor 2 ** ((t - inicio del año) / vida_media): va de 1 (1 de enero) a 2 ** (1 / vida_media)
+        tiempos = anio_decimal(df['fecha'], np.full(len(df), anio))
+        intra = np.power(2.0, (tiempos - anio) / vida_media)
+        rasters['intra'] = densidad_grilla(grilla, df['latitud'], df['longitud'], intra, bordes=bordes)
+    return rasters
+
+
+def raster_anual(ruta_csv, anio, grilla, bordes='estricto', vida_media=None):
+    """Conteo de delitos del año por celda y, con vida_media, el conteo ponderado dentro del año."""
+    df = cargar_delitos(ruta_csv, columnas=_columnas_binneo(vida_media), anios=[anio])
+    return _binnear(df, anio, grilla, bordes, vida_media)
+
+
+def actualizar_rasters_anuales(ruta_csv, directorio, grilla, bordes='estricto', vida_media=None):
+    """Devuelve {anio: rásters} y vuelve a binnear sólo los años nuevos o con datos cambiados.
+
+    Cada año se identifica por la huella de sus coordenadas y fechas que se guarda con el almacén
+    (huellas_anio), así sólo se leen los años que cambiaron aunque el almacén se haya reescrito
+    completo. Con un almacén sin huellas, la huella se calcula leyendo el año.
+
+    Con vida_media se omite la partición anio=-1 (año faltante): el factor dentro del año no
+    tiene sentido sin año y 2 ** ((t + 1) / vida_media) desborda a inf.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    huellas = huellas_anio(ruta_csv)  # genera el almacén si hace falta
+    # Sin huellas guardadas se lee el año con las columnas de la huella (incluyen las del binneo)
+    columnas_huella = [c for c in COLUMNAS_HUELLA if c in abrir_almacen(ruta_csv).schema.names]
+    clave = _clave_configuracion(grilla, bordes, vida_media)
+    resultado = {}
+    for anio in valores_particion(ruta_csv, 'anio'):
+        if vida_media and anio < 0:
+            continue
+        ruta = os.path.join(directorio, f'anio_{anio}.npz')
+        df = None
+        huella = huellas.get(anio)
+        if huella is None:
+            df = cargar_delitos(ruta_csv, columnas=columnas_huella, anios=[anio])
+            huella = huella_delitos(df)
+        if os.path.exists(ruta):
+            with np.load(ruta) as datos:
+                if str(datos['huella']) == huella and np.array_equal(datos['clave'], clave):
+                    resultado[anio] = {k: datos[k] for k in datos.files if k not in ('huella', 'clave')}
+                    continue
+        print(f"Calculando ráster del año {anio}...")
+        if df is None:
+            df = cargar_delitos(ruta_csv, columnas=_columnas_binneo(vida_media), anios=[anio])
+        rasters = _binnear(df, anio, grilla, bordes, vida_media)
+        np.savez(ruta, huella=np.array(huella), clave=clave, **rasters)
+        resultado[anio] = rasters
+    return resultado
+
+
+def combinar_rasters(rasters_anuales, factores, clave='conteo', por_defecto=0.0):
+    """Superficie ponderada = suma de los rásters anuales por el factor de cada año."""
+    total = None
+    for anio, rasters in rasters_anuales.items():
+        termino = rasters[clave] * factores.get(anio, por_defecto)
+        total = termino if total is None else total + termino
+    return total
@@ -0,0 +1,114 @@
+# Features de entorno: distancia al servicio más cercano y cantidad dentro de radios, por capa
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from pipeline.coordenadas import LAT_MIN, LAT_MAX, LON_MIN, LON_MAX
+from pipeline.ingesta import huella_archivo
+
+# Radio medio de la Tierra (el mismo que usa la distancia haversine)
+RADIO_TIERRA_M = 6371008.8
+
+# Capas del dataset: archivo, columna de latitud y columna de longitud
+CAPAS = {
+    'cajeros': ('cajeros-automaticos.csv', 'lat', 'long'),
+    'estaciones_tren': ('estaciones-de-ferrocarril.csv', 'lat', 'long'),
+    'paradas_colectivo': ('paradas-de-colectivo.xlsx', 'coord_Y', 'coord_X'),
+    'bus_turistico': ('paradas_bus_turistico.csv', 'lat', 'long'),
+    'comisarias': ('comisarias-policia-de-la-ciudad.xlsx', 'lat', 'long'),
+    'gastronomia': ('oferta_gastronomica.xlsx', 'lat', 'long'),
+}
+
+# Radios (metros) para contar servicios alrededor de cada punto
+RADIOS_M = (250, 500, 1000)
+
+
+def _leer_coordenadas(ruta, col_lat, col_lon):
+    # Coordenadas válidas de una capa (algunos archivos usan coma decimal)
+    df = pd.read_csv(ruta) if ruta.endswith('.csv') else pd.read_excel(ruta)
+    lat = pd.to_numeric(df[col_lat].astype(str).str.replace(',', '.'), errors='coerce').to_numpy()
+    lon = pd.to_numeric(df[col_lon].astype(str).str.replace(',', '.'), errors='coerce').to_numpy()
+    validas = (lat >= LAT_MIN) & (lat <= LAT_MAX) & (lon >= LON_MIN) & (lon <= LON_MAX)
+    return np.column_stack([lat[validas], lon[validas]])
+
+
+def leer_capas(dataset_dir, capas=None, dir_cache=None):
+    """{capa: array (n, 2) de latitud, longitud} de cada capa presente en dataset_dir.
+
+    Las coordenadas se guardan en caché (.npz por capa) y sólo se vuelven a leer los archivos
+    que cambiaron (tamaño o fecha de modificación); las planillas .xlsx son lentas de leer.
+    """
+    dir_cache = dir_cache or os.path.join(dataset_dir, 'cache_entorno')
+    os.makedirs(dir_cache, exist_ok=True)
+    resultado = {}
+    for nombre in capas or CAPAS:
+        archivo, col_lat, col_lon = CAPAS[nombre]
+        ruta = os.path.join(dataset_dir, archivo)
+        if not os.path.exists(ruta):
+            print(f"Capa {nombre}: no se encuentra {archivo}, se omite")
+            continue
+        huella = huella_archivo(ruta, calcular_hash=False)
+        ruta_cache = os.path.join(dir_cache, f'{nombre}.npz')
+        if os.path.exists(ruta_cache):
+            with np.load(ruta_cache) as datos:
+                if datos['huella'].tolist() == [huella['tamanio'], huella['mtime']]:
+                    resultado[nombre] = datos['coordenadas']
+                    continue
+        coordenadas = _leer_coordenadas(ruta, col_lat, col_lon)
+        np.savez(ruta_cache, huella=np.array([huella['tamanio'], huella['mtime']]), coordenadas=coordenadas)
+        resultado[nombre] = coordenadas
+    return resultado
+
+
+def cartesianas(lat, lon):
+    # Puntos sobre la esfera unitaria: la distancia euclídea (cuerda) crece con la distancia
+    # sobre la superficie, así que vecino más cercano y radios coinciden con los de haversine
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def cuerda(metros):
+    # Distancia sobre la superficie (m) -> cuerda en la esfera unitaria
+    return 2 * np.sin(np.asarray(metros, dtype=np.float64) / (2 * RADIO_TIERRA_M))
+
+
+def indexar_capas(coordenadas_capas):
+    """Índice KD-tree de cada capa (en coordenadas de la esfera); se arma una vez y se reutiliza."""
+    return {nombre: cKDTree(cartesianas(coordenadas[:, 0], coordenadas[:, 1]))
+            for nombre, coordenadas in coordenadas_capas.items() if len(coordenadas)}
+
+
+def nombres_features(capas, radios=RADIOS_M):
+    """Columnas que genera features_entorno, en el mismo orden."""
+    nombres = []
+    for nombre in capas:
+        nombres.append(f'dist_{nombre}_m')
+        nombres.extend(f'n_{nombre}_{int(r)}m' for r in radios)
+    return nombres
+
+
+def features_entorno(indices, lat, lon, radios=RADIOS_M):
+    """Distancia (m) al punto más cercano de cada capa y cantidad de puntos dentro de cada radio.
+
+    Las distancias son de gran círculo (equivalentes a haversine). Todos los puntos se consultan
+    juntos contra el índice de cada capa. Los puntos sin coordenadas quedan con NaN.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    validos = np.isfinite(lat) & np.isfinite(lon)
+    consulta = cartesianas(lat[validos], lon[validos])
+    columnas = {}
+    for nombre, arbol in indices.items():
+        distancia = np.full(len(lat), np.nan)
+        if len(consulta):
+            c = np.minimum(arbol.query(consulta, k=1, workers=-1)[0], 2.0)
+            distancia[validos] = 2 * RADIO_TIERRA_M * np.arcsin(c / 2)
+        columnas[f'dist_{nombre}_m'] = distancia
+        for radio in radios:
+            cantidad = np.full(len(lat), np.nan)
+            if len(consulta):
+                cantidad[validos] = arbol.query_ball_point(consulta, cuerda(radio), return_length=True, workers=-1)
+            columnas[f'n_{nombre}_{int(radio)}m'] = cantidad
+    return pd.DataFrame(columnas, columns=nombres_features(indices, radios))
@@ -0,0 +1,94 @@
+# Entrenamiento en paralelo: cada (modelo, fold) es una tarea del pool de procesos
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+from pipeline.metricas import medir_memoria
+
+FOLDS = 5
+
+
+def ajustar_fold(modelo, X, y, entrenamiento, prueba):
+    """Ajusta una copia del modelo en un fold y predice el resto (se ejecuta en un proceso del pool).
+
+    Devuelve las predicciones del fold, la exactitud en entrenamiento, el tiempo y cuánto subió la
+    memoria del proceso durante el ajuste (el pico absoluto depende de lo que dejaron las tareas
+    anteriores en el mismo proceso del pool).
+    """
+    with medir_memoria() as memoria:
+        inicio = time.perf_counter()
+        ajustado = clone(modelo).fit(X[entrenamiento], y[entrenamiento])
+        prediccion = ajustado.predict(X[prueba])
+        tiempo = time.perf_counter() - inicio
+    return {
+        'prediccion': prediccion,
+        'acc_train': float(ajustado.score(X[entrenamiento], y[entrenamiento])),
+        'tiempo': tiempo,
+        'memoria_pico': memoria['pico'],
+        'memoria_incremento': memoria['incremento'],
+    }
+
+
+def particiones(y, folds=FOLDS, semilla=42):
+    """Índices (entrenamiento, prueba) de cada fold estratificado."""
+    return list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=semilla).split(np.zeros(len(y)), y))
+
+
+def resumir_folds(y, cortes, por_fold):
+    """Une los resultados de los folds de un modelo: predicción fuera de fold y métricas."""
+    prediccion = np.empty(len(y), dtype=y.dtype)
+    for (_, prueba), fold in zip(cortes, por_fold):
+        prediccion[prueba] = fold['prediccion']
+    return {
+        'prediccion': prediccion,
+        'acc_folds': np.array([np.mean(fold['prediccion'] == y[prueba]) for (_, prueba), fold in zip(cortes, por_fold)]),
+        'acc_train': float(np.mean([fold['acc_train'] for fold in por_fold])),
+        'tiempo': float(sum(fold['tiempo'] for fold in por_fold)),
+        'memoria_pico': max(fold['memoria_pico'] for fold in por_fold),
+        'memoria_incremento': max(fold['memoria_incremento'] for fold in por_fold),
+    }
+
+
+def evaluar_modelos(modelos, X, y, folds=FOLDS, procesos=None, semilla=42):
+    """Validación cruzada de todos los modelos a la vez: cada (modelo, fold) va a un proceso.
+
+    Cada modelo se ajusta una vez por fold y las predicciones fuera de fold se reutilizan como
+    predicciones de prueba, así no hace falta un ajuste aparte para las métricas. Devuelve
+    {nombre: resultado} con la predicción fuera de fold, la exactitud de cada fold, la exactitud
+    media en entrenamiento, el tiempo total de ajuste y la memoria del peor fold.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    cortes = particiones(y, folds, semilla)
+    procesos = procesos or os.cpu_count()
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = {
+            (nombre, k): pool.submit(ajustar_fold, modelo, X, y, entrenamiento, prueba)
+            for nombre, modelo in modelos.items()
+            for k, (entrenamiento, prueba) in enumerate(cortes)
+        }
+        resultados = {
+            nombre: resumir_folds(y, cortes, [futuros[(nombre, k)].result() for k in range(len(cortes))])
+            for nombre in modelos
+        }
+    print(f"Validación cruzada de {len(modelos)} modelos x {len(cortes)} folds en "
+          f"{time.perf_counter() - inicio:.1f} s con {procesos} procesos")
+    return resultados
+
+
+def ajustar_final(modelo, X, y):
+    """Ajuste final del modelo elegido con todos los datos; devuelve (modelo, tiempo, memoria usada por el ajuste)."""
+    modelo = clone(modelo)
+    if 'n_jobs' in modelo.get_params():
+        # Fuera del pool el Random Forest puede usar todos los núcleos
+        modelo.set_params(n_jobs=-1)
+    with medir_memoria() as memoria:
+        inicio = time.perf_counter()
+        modelo.fit(X, y)
+        tiempo = time.perf_counter() - inicio
+    return modelo, tiempo, memoria['incremento']
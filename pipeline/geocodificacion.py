@@ -0,0 +1,125 @@
+# Geocodificación de direcciones con caché en disco (SQLite) y avance guardado por lotes
+import re
+import sqlite3
+import time
+import unicodedata
+
+import numpy as np
+
+# Cantidad de direcciones geocodificadas entre cada guardado en la caché
+TAMANIO_LOTE = 25
+
+SUFIJO_CONSULTA = ", Buenos Aires, Argentina"
+
+
+def reparar_texto(texto):
+    """Deshace el texto UTF-8 leído como latin-1 (por ejemplo 'CÃ³rdoba' -> 'Córdoba')."""
+    texto = str(texto)
+    if 'Ã' in texto or 'Â' in texto:
+        try:
+            return texto.encode('latin1').decode('utf-8')
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return texto
+
+
+def normalizar_direccion(direccion):
+    """Clave de la caché: sin acentos, en minúsculas, sin puntuación y con espacios simples.
+
+    'Av. Córdoba  1234', 'AV CORDOBA 1234' y 'Av. CÃ³rdoba 1234' dan la misma clave.
+    """
+    texto = unicodedata.normalize('NFKD', reparar_texto(direccion))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r'[^\w\s]', ' ', texto.lower())
+    return ' '.join(texto.split())
+
+
+def abrir_cache(ruta):
+    """Abre (o crea) la caché de geocodificación."""
+    conexion = sqlite3.connect(ruta)
+    conexion.execute(
+        "CREATE TABLE IF NOT EXISTS geocodigos ("
+        " clave TEXT PRIMARY KEY, direccion TEXT, latitud REAL, longitud REAL, fuente TEXT, fecha REAL)"
+    )
+    conexion.commit()
+    return conexion
+
+
+def buscar_en_cache(conexion, claves):
+    """{clave: (latitud, longitud)} de las claves ya geocodificadas (None si no se encontraron)."""
+    encontradas = {}
+    claves = list(claves)
+    # SQLite limita la cantidad de parámetros por consulta
+    for inicio in range(0, len(claves), 500):
+        parte = claves[inicio:inicio + 500]
+        marcas = ','.join('?' * len(parte))
+        for clave, lat, lon in conexion.execute(
+                f"SELECT clave, latitud, longitud FROM geocodigos WHERE clave IN ({marcas})", parte):
+            encontradas[clave] = (lat, lon)
+    return encontradas
+
+
+def guardar_en_cache(conexion, filas, fuente='nominatim'):
+    """Guarda [(clave, dirección, latitud, longitud)] y confirma la transacción."""
+    ahora = time.time()
+    conexion.executemany(
+        "INSERT OR REPLACE INTO geocodigos (clave, direccion, latitud, longitud, fuente, fecha) VALUES (?, ?, ?, ?, ?, ?)",
+        [(clave, direccion, lat, lon, fuente, ahora) for clave, direccion, lat, lon in filas],
+    )
+    conexion.commit()
+
+
+def geocodificar_direcciones(direcciones, geocode, ruta_cache, lote=TAMANIO_LOTE, sufijo=SUFIJO_CONSULTA,
+                             reintentar_no_encontradas=False):
+    """Coordenadas de cada dirección, consultando al geocodificador sólo las que no están en la caché.
+
+    Cada dirección distinta (según normalizar_direccion) se consulta una sola vez. El avance se
+    guarda cada `lote` consultas, así una corrida interrumpida retoma donde quedó. Las direcciones
+    sin resultado también se guardan (como nulas) para no repetirlas; los errores del servicio no,
+    para que se reintenten en la próxima corrida. Devuelve (latitud, longitud, conteos).
+    """
+    claves = [normalizar_direccion(d) if isinstance(d, str) and d.strip() else None for d in direcciones]
+    conexion = abrir_cache(ruta_cache)
+    filas = []
+    try:
+        unicas = {}
+        for clave, direccion in zip(claves, direcciones):
+            if clave is not None and clave not in unicas:
+                unicas[clave] = reparar_texto(direccion).strip()
+        cache = buscar_en_cache(conexion, unicas)
+        pendientes = [c for c in unicas if c not in cache
+                      or (reintentar_no_encontradas and cache[c][0] is None)]
+        conteos = {'direcciones': len(unicas), 'en_cache': len(unicas) - len(pendientes),
+                   'consultadas': 0, 'no_encontradas': 0, 'errores': 0}
+        print(f"Direcciones distintas: {len(unicas)} | en caché: {conteos['en_cache']} | a geocodificar: {len(pendientes)}")
+
+        for i, clave in enumerate(pendientes, start=1):
+            direccion = unicas[clave]
+            try:
+                location = geocode(direccion + sufijo)
+            except Exception as e:
+                print(f"Error al geocodificar: {direccion} -> {e}")
+                conteos['errores'] += 1
+                continue
+            conteos['consultadas'] += 1
+            if location:
+                resultado = (location.latitude, location.longitude)
+            else:
+                resultado = (None, None)
+                conteos['no_encontradas'] += 1
+            cache[clave] = resultado
+            filas.append((clave, direccion, *resultado))
+            if len(filas) >= lote:
+                guardar_en_cache(conexion, filas)
+                filas = []
+                print(f"Avance guardado: {i}/{len(pendientes)}")
+    finally:
+        # También si la corrida se interrumpe: lo ya consultado queda guardado
+        if filas:
+            guardar_en_cache(conexion, filas)
+        conexion.close()
+
+    coordenadas = [cache.get(c, (None, None)) if c is not None else (None, None) for c in claves]
+    lat = np.array([np.nan if la is None else la for la, _ in coordenadas], dtype=np.float64)
+    lon = np.array([np.nan if lo is None else lo for _, lo in coordenadas], dtype=np.float64)
+    return lat, lon, conteos
@@ -0,0 +1,243 @@
+# Grilla regular de densidad delictiva calculada con aritmética de índices (sin join espacial)
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Extensión y tamaño de celda usados en los scripts de densidad
+EXTENSION_CABA = (-58.6, -34.7, -58.3, -34.5)
+TAMANIO_CELDA = 0.005
+
+
+@dataclass(frozen=True)
+class Grilla:
+    """Grilla regular en grados, con las mismas celdas que el doble bucle de Polygon de los scripts.
+
+    El grid_id de una celda es ix * ny + iy (x en el bucle externo, y en el interno).
+    """
+    xmin: float = EXTENSION_CABA[0]
+    ymin: float = EXTENSION_CABA[1]
+    xmax: float = EXTENSION_CABA[2]
+    ymax: float = EXTENSION_CABA[3]
+    cell_size: float = TAMANIO_CELDA
+
+    @property
+    def x_coords(self):
+        return np.arange(self.xmin, self.xmax, self.cell_size)
+
+    @property
+    def y_coords(self):
+        return np.arange(self.ymin, self.ymax, self.cell_size)
+
+    @property
+    def nx(self):
+        return len(self.x_coords)
+
+    @property
+    def ny(self):
+        return len(self.y_coords)
+
+    @property
+    def forma(self):
+        # Forma del ráster: filas = y (de sur a norte), columnas = x (de oeste a este)
+        return (self.ny, self.nx)
+
+
+def _candidatos(valores, coords, tamanio):
+    """Índices de celda en un eje, respetando el "contains" estricto de shapely.
+
+    El índice se calcula con floor y se revisan también las celdas vecinas, porque los bordes
+    x + cell_size de una celda y x del siguiente valor de arange pueden diferir en el último bit.
+    Un punto exactamente sobre un borde no queda contenido en ninguna celda, igual que en el sjoin.
+    """
+    n = len(coords)
+    with np.errstate(invalid='ignore'):
+        base = np.floor((valores - coords[0]) / tamanio)
+    base = np.nan_to_num(base, nan=-2).astype(np.int64)
+    salida = []
+    for desplazamiento in (-1, 0, 1):
+        indice = base + desplazamiento
+        valido = (indice >= 0) & (indice < n)
+        inferior = coords[np.where(valido, indice, 0)]
+        dentro = valido & (valores > inferior) & (valores < inferior + tamanio)
+        if dentro.any():
+            salida.append((indice, dentro))
+    return salida
+
+
+def asignar_celdas(grilla, lat, lon):
+    """Devuelve (posiciones, grid_id) de cada par punto-celda con el punto dentro de la celda."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    ny = grilla.ny
+    posiciones, ids = [], []
+    for ix, en_x in _candidatos(lon, grilla.x_coords, grilla.cell_size):
+        for iy, en_y in _candidatos(lat, grilla.y_coords, grilla.cell_size):
+            dentro = en_x & en_y
+            if dentro.any():
+                pos = np.flatnonzero(dentro)
+                posiciones.append(pos)
+                ids.append(ix[pos] * ny + iy[pos])
+    if not ids:
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio
+    return np.concatenate(posiciones), np.concatenate(ids)
+
+
+def asignar_celdas_semiabiertas(grilla, lat, lon):
+    """Como asignar_celdas pero con celdas [x, x + cell_size): cada punto de la extensión cae en una celda."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        ix = np.floor((lon - grilla.x_coords[0]) / grilla.cell_size)
+        iy = np.floor((lat - grilla.y_coords[0]) / grilla.cell_size)
+    valido = (ix >= 0) & (ix < grilla.nx) & (iy >= 0) & (iy < grilla.ny)
+    posiciones = np.flatnonzero(valido)
+    ids = ix[posiciones].astype(np.int64) * grilla.ny + iy[posiciones].astype(np.int64)
+    return posiciones, ids
+
+
+def densidad_grilla(grilla, lat, lon, peso=None, bordes='estricto'):
+    """Suma ponderada de delitos por celda, devuelta como ráster (ny, nx).
+
+    Con bordes='estricto' equivale a gpd.sjoin(grid, delitos, predicate="contains") +
+    groupby('grid_id')['peso'].sum(). Con bordes='inferior' cada punto cae en la celda
+    semiabierta [x, x + cell_size) y no se pierden los puntos sobre los bordes.
+    """
+    if bordes == 'estricto':
+        posiciones, ids = asignar_celdas(grilla, lat, lon)
+    elif bordes == 'inferior':
+        posiciones, ids = asignar_celdas_semiabiertas(grilla, lat, lon)
+    else:
+        raise ValueError(f"Valor de bordes no reconocido: {bordes!r} (usar 'estricto' o 'inferior')")
+    pesos = None
+    if peso is not None:
+        pesos = np.asarray(peso, dtype=np.float64)[posiciones]
+    conteo = np.bincount(ids, weights=pesos, minlength=grilla.nx * grilla.ny).astype(np.float64)
+    return grid_id_a_raster(grilla, conteo)
+
+
+def grid_id_a_raster(grilla, valores):
+    """Valores ordenados por grid_id -> ráster (ny, nx)."""
+    return np.asarray(valores).reshape(grilla.nx, grilla.ny).T
+
+
+def raster_a_grid_id(grilla, raster):
+    """Ráster (ny, nx) -> valores ordenados por grid_id."""
+    return np.asarray(raster).T.reshape(-1)
+
+
+def tabla_densidad(grilla, raster):
+    """Tabla grid_id / densidad con el mismo formato que el groupby de los scripts."""
+    densidad = raster_a_grid_id(grilla, raster)
+    return pd.DataFrame({'grid_id': np.arange(len(densidad)), 'densidad': densidad})
+
+
+def grilla_geodataframe(grilla, raster=None, crs=None):
+    """GeoDataFrame de la grilla (grid_id, geometry y densidad si se pasa el ráster).
+
+    Los polígonos tienen los mismos vértices que los que armaban los scripts con el doble bucle.
+    """
+    import geopandas as gpd
+    import shapely
+
+    cs = grilla.cell_size
+    x, y = np.meshgrid(grilla.x_coords, grilla.y_coords, indexing='ij')
+    x, y = x.reshape(-1), y.reshape(-1)
+    anillos = np.stack([
+        np.stack([x, y], axis=1),
+        np.stack([x + cs, y], axis=1),
+        np.stack([x + cs, y + cs], axis=1),
+        np.stack([x, y + cs], axis=1),
+        np.stack([x, y], axis=1),
+    ], axis=1)
+    grid = gpd.GeoDataFrame({'grid_id': np.arange(len(x))}, geometry=shapely.polygons(anillos), crs=crs)
+    if raster is not None:
+        grid['densidad'] = raster_a_grid_id(grilla, raster)
+    return grid
+
+
+def densidad_en_puntos(grilla, raster, lat, lon, bordes='estricto', fuera=0.0, interpolar=False):
+    """Densidad de la celda de cada punto, calculada por índice sobre el ráster (sin recorrer la grilla).
+
+    bordes='estricto' reproduce grid[grid.contains(punto)]: un punto sobre un borde no está
+    dentro de ninguna celda y recibe el valor `fuera`. bordes='inferior' usa celdas semiabiertas
+    [x, x + cell_size), así los puntos sobre bordes internos toman la celda del este/norte.
+    Con interpolar=True se interpola bilinealmente entre los centros de las celdas vecinas.
+    Los puntos fuera de la extensión de la grilla (o con coordenadas NaN) reciben `fuera`.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    raster = np.asarray(raster, dtype=np.float64)
+    resultado = np.full(lat.shape, fuera, dtype=np.float64)
+    cs = grilla.cell_size
+    x0, y0 = grilla.x_coords[0], grilla.y_coords[0]
+    dentro = (lon >= x0) & (lon <= x0 + grilla.nx * cs) & (lat >= y0) & (lat <= y0 + grilla.ny * cs)
+
+    if interpolar:
+        # Posición continua respecto de los centros de celda, recortada a la grilla
+        fx = np.clip((lon[dentro] - x0) / cs - 0.5, 0, grilla.nx - 1)
+        fy = np.clip((lat[dentro] - y0) / cs - 0.5, 0, grilla.ny - 1)
+        ix0 = np.minimum(np.floor(fx).astype(np.int64), max(grilla.nx - 2, 0))
+        iy0 = np.minimum(np.floor(fy).astype(np.int64), max(grilla.ny - 2, 0))
+        ix1 = np.minimum(ix0 + 1, grilla.nx - 1)
+        iy1 = np.minimum(iy0 + 1, grilla.ny - 1)
+        tx, ty = fx - ix0, fy - iy0
+        resultado[dentro] = (
+            raster[iy0, ix0] * (1 - tx) * (1 - ty) + raster[iy0, ix1] * tx * (1 - ty)
+            + raster[iy1, ix0] * (1 - tx) * ty + raster[iy1, ix1] * tx * ty
+        )
+        return resultado
+
+    if bordes == 'estricto':
+        posiciones, ids = asignar_celdas(grilla, lat, lon)
+        # Si por redondeo un punto queda en dos celdas, se toma la de menor grid_id (como .iloc[0])
+        orden = np.lexsort((ids, posiciones))
+        posiciones, ids = posiciones[orden], ids[orden]
+        primero = np.ones(len(posiciones), dtype=bool)
+        primero[1:] = posiciones[1:] != posiciones[:-1]
+        posiciones, ids = posiciones[primero], ids[primero]
+        resultado[posiciones] = raster_a_grid_id(grilla, raster)[ids]
+        return resultado
+    if bordes == 'inferior':
+        ix = np.floor((lon[dentro] - x0) / cs).astype(np.int64)
+        iy = np.floor((lat[dentro] - y0) / cs).astype(np.int64)
+        valido = (ix < grilla.nx) & (iy < grilla.ny)
+        valores = np.full(ix.shape, fuera, dtype=np.float64)
+        valores[valido] = raster[iy[valido], ix[valido]]
+        resultado[dentro] = valores
+        return resultado
+    raise ValueError(f"Valor de bordes no reconocido: {bordes!r} (usar 'estricto' o 'inferior')")
+
+
+def guardar_raster(ruta, grilla, raster):
+    """Guarda el ráster de densidad junto con la definición de la grilla (formato binario .npz)."""
+    np.savez(ruta, raster=np.asarray(raster, dtype=np.float64),
+             extension=np.array([grilla.xmin, grilla.ymin, grilla.xmax, grilla.ymax, grilla.cell_size]))
+
+
+def cargar_raster(ruta):
+    """Lee un ráster guardado con guardar_raster (.npz) o la grilla GeoJSON de 4- y devuelve (grilla, raster)."""
+    if ruta.endswith('.geojson'):
+        return _raster_desde_geojson(ruta)
+    with np.load(ruta) as datos:
+        xmin, ymin, xmax, ymax, cell_size = datos['extension'].tolist()
+        raster = datos['raster']
+    grilla = Grilla(xmin, ymin, xmax, ymax, cell_size)
+    if raster.shape != grilla.forma:
+        raise ValueError(f"El ráster de {ruta} tiene forma {raster.shape} y la grilla espera {grilla.forma}")
+    return grilla, raster
+
+
+def _raster_desde_geojson(ruta):
+    # La grilla se reconstruye a partir de la primera celda (esquina y tamaño) y de la extensión total
+    import geopandas as gpd
+
+    grid = gpd.read_file(ruta).sort_values('grid_id')
+    xmin, ymin, xmax, ymax = grid.total_bounds
+    x0, y0, x1, _ = grid.geometry.iloc[0].bounds
+    cell_size = round(x1 - x0, 12)
+    grilla = Grilla(float(x0), float(y0), float(xmax - cell_size / 2), float(ymax - cell_size / 2), cell_size)
+    if grilla.nx * grilla.ny != len(grid):
+        raise ValueError(f"{ruta} no es una grilla regular completa ({len(grid)} celdas)")
+    return grilla, grid_id_a_raster(grilla, grid['densidad'].to_numpy(dtype=np.float64))
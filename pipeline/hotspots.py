@@ -0,0 +1,213 @@
+# Hotspots delictivos: delitos binneados en celdas finas y DBSCAN ponderado sobre las celdas
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from pipeline.carga import cargar_delitos, valores_particion
+from pipeline.entorno import RADIO_TIERRA_M, cartesianas, cuerda
+from pipeline.grilla import EXTENSION_CABA, Grilla, asignar_celdas_semiabiertas, densidad_en_puntos, grid_id_a_raster
+from pipeline.pesos import pesos_por_anio
+
+# Celda del pre-binneo (~50 m): el DBSCAN trabaja con celdas ocupadas, no con cada delito
+CELDA_HOTSPOT = 0.0005
+
+# Radio de vecindad (metros) del DBSCAN
+EPS_M = 150
+
+# Sin un peso mínimo explícito, una celda es núcleo si el peso dentro del radio llega a
+# FACTOR_MINIMO veces el esperado si los delitos del grupo se repartieran en toda la ciudad...
+FACTOR_MINIMO = 3.0
+
+# ... y por lo menos a la cantidad de delitos (de peso medio) que, con el reparto uniforme, algún
+# círculo de la ciudad alcanzaría sólo con probabilidad ALFA_UNIFORME (en grupos chicos lo esperado es casi 0)
+ALFA_UNIFORME = 0.05
+
+# Superficie de CABA (m²)
+AREA_CABA_M2 = 203e6
+
+# Metros por grado de latitud (para el área aproximada de cada hotspot)
+METROS_POR_GRADO = np.pi * RADIO_TIERRA_M / 180
+
+
+def grilla_hotspots(cell_size=CELDA_HOTSPOT):
+    """Grilla fina sobre la extensión de CABA usada para el pre-binneo."""
+    return Grilla(*EXTENSION_CABA, cell_size)
+
+
+def sumar_celdas(grilla, lat, lon, peso=None):
+    """(peso, conteo) de los delitos por grid_id, con celdas semiabiertas (ningún punto se pierde)."""
+    posiciones, ids = asignar_celdas_semiabiertas(grilla, lat, lon)
+    n = grilla.nx * grilla.ny
+    pesos = np.ones(len(posiciones)) if peso is None else np.asarray(peso, dtype=np.float64)[posiciones]
+    return np.bincount(ids, weights=pesos, minlength=n), np.bincount(ids, minlength=n).astype(np.int64)
+
+
+def centros_celdas(grilla, ids):
+    """Latitud y longitud del centro de cada celda."""
+    ix, iy = np.divmod(np.asarray(ids, dtype=np.int64), grilla.ny)
+    return grilla.y_coords[0] + (iy + 0.5) * grilla.cell_size, grilla.x_coords[0] + (ix + 0.5) * grilla.cell_size
+
+
+def peso_minimo_automatico(peso, conteo, eps_m=EPS_M, factor=FACTOR_MINIMO, alfa=ALFA_UNIFORME,
+                           area_m2=AREA_CABA_M2):
+    """Peso mínimo para que una celda sea núcleo: FACTOR_MINIMO veces el peso esperado en un círculo
+    de eps_m si los delitos del grupo se repartieran uniforme en la ciudad, y no menos que el cuantil
+    de Poisson que ningún círculo alcanzaría por azar (con probabilidad alfa en toda la ciudad).
+    Así el umbral se adapta a cada tipo de delito y a cada año.
+
+    La densidad se toma sobre toda la ciudad y no sobre las celdas ocupadas: en un grupo chico
+    casi cada celda ocupada tiene un solo delito y el umbral quedaría fijo en unas 3 veces la
+    cantidad de celdas del círculo, sin importar el tamaño del grupo.
+    """
+    from scipy.stats import poisson
+
+    total, delitos = float(peso.sum()), int(conteo.sum())
+    if not delitos:
+        return 1.0
+    circulo = np.pi * eps_m ** 2
+    esperados = delitos / area_m2 * circulo
+    # alfa repartido entre los círculos disjuntos que entran en la ciudad
+    azar = poisson.isf(alfa * circulo / area_m2, esperados) + 1
+    return max(factor * esperados, azar) * total / delitos
+
+
+def agrupar_celdas(grilla, peso, conteo, eps_m=EPS_M, peso_minimo=None):
+    """DBSCAN de las celdas ocupadas, con el peso de cada celda como sample_weight.
+
+    Las celdas se pasan a la esfera unitaria y el radio a la cuerda equivalente: los vecinos son
+    los de la distancia haversine (salvo redondeo en el borde del radio: un par a casi exactamente
+    eps_m puede quedar de un lado con la cuerda y del otro con haversine), pero con un KD-tree
+    euclídeo. Una celda es núcleo si el peso dentro de eps_m llega a peso_minimo (por defecto,
+    peso_minimo_automatico). Devuelve {'ids', 'etiquetas', 'peso', 'conteo', 'peso_minimo'} de las
+    celdas que quedaron en algún hotspot (etiquetas 0..k-1).
+    """
+    from sklearn.cluster import DBSCAN
+
+    ids = np.flatnonzero(conteo)
+    etiquetas = np.full(len(ids), -1, dtype=np.int64)
+    if peso_minimo is None:
+        peso_minimo = peso_minimo_automatico(peso, conteo, eps_m)
+    if len(ids):
+        lat, lon = centros_celdas(grilla, ids)
+        # DBSCAN pide un min_samples entero: los pesos se pasan a delitos de peso medio, así el
+        # redondeo es de menos de un delito aunque los pesos sean chicos (0.15 en años viejos)
+        escala = peso[ids].sum() / conteo[ids].sum()
+        min_samples = max(int(np.ceil(peso_minimo / escala - 1e-9)), 1)
+        db = DBSCAN(eps=float(cuerda(eps_m)), min_samples=min_samples, algorithm='kd_tree')
+        etiquetas = db.fit(cartesianas(lat, lon), sample_weight=peso[ids] / escala).labels_
+    en_hotspot = etiquetas >= 0
+    ids = ids[en_hotspot]
+    return {'ids': ids, 'etiquetas': etiquetas[en_hotspot], 'peso': peso[ids], 'conteo': conteo[ids],
+            'peso_minimo': float(peso_minimo)}
+
+
+def poligonos_hotspots(grilla, celdas):
+    """Tabla de hotspots: un polígono por hotspot (unión de sus celdas) con peso, delitos y área."""
+    import shapely
+
+    etiquetas = celdas['etiquetas']
+    k = int(etiquetas.max()) + 1 if len(etiquetas) else 0
+    lat, lon = centros_celdas(grilla, celdas['ids'])
+    # Bordes calculados igual para las dos celdas que los comparten (si no, no coinciden en el último bit)
+    ix, iy = np.divmod(celdas['ids'], grilla.ny)
+    x0, y0, cs = grilla.x_coords[0], grilla.y_coords[0], grilla.cell_size
+    cajas = shapely.box(x0 + ix * cs, y0 + iy * cs, x0 + (ix + 1) * cs, y0 + (iy + 1) * cs)
+    orden = np.argsort(etiquetas, kind='stable')
+    cortes = np.searchsorted(etiquetas[orden], np.arange(1, k))
+    # Las celdas no se superponen y comparten bordes exactos: alcanza con la unión de cobertura
+    geometrias = [shapely.coverage_union_all(grupo) for grupo in np.split(cajas[orden], cortes)] if k else []
+    peso = np.bincount(etiquetas, weights=celdas['peso'], minlength=k)
+    area_celda = (grilla.cell_size * METROS_POR_GRADO) ** 2 * np.cos(np.radians(lat)) / 1e6
+    return pd.DataFrame({
+        'hotspot': np.arange(k),
+        'peso': peso,
+        'delitos': np.bincount(etiquetas, weights=celdas['conteo'], minlength=k).astype(np.int64),
+        'celdas': np.bincount(etiquetas, minlength=k),
+        'area_km2': np.bincount(etiquetas, weights=area_celda, minlength=k),
+        # Centro ponderado por el peso de las celdas
+        'latitud': np.bincount(etiquetas, weights=lat * celdas['peso'], minlength=k) / np.maximum(peso, 1e-12),
+        'longitud': np.bincount(etiquetas, weights=lon * celdas['peso'], minlength=k) / np.maximum(peso, 1e-12),
+        'geometry': geometrias,
+    })
+
+
+def hotspots_grupo(ruta_csv, grilla, anio=None, tipo=None, eps_m=EPS_M, peso_minimo=None):
+    """Hotspots de un grupo (todos los delitos, un año, un tipo o un año y tipo).
+
+    Los delitos se leen año por año y sólo se acumulan las sumas por celda, así la memoria no
+    depende del tamaño de la tabla. Cada delito pesa según su año (pesos_por_anio).
+    """
+    peso = np.zeros(grilla.nx * grilla.ny)
+    conteo = np.zeros(grilla.nx * grilla.ny, dtype=np.int64)
+    anios = [anio] if anio is not None else valores_particion(ruta_csv, 'anio')
+    for a in anios:
+        delitos = cargar_delitos(ruta_csv, columnas=['latitud', 'longitud'], anios=[a],
+                                 tipos=None if tipo is None else [tipo])
+        p, c = sumar_celdas(grilla, delitos['latitud'], delitos['longitud'], pesos_por_anio(np.full(len(delitos), a)))
+        peso += p
+        conteo += c
+    celdas = agrupar_celdas(grilla, peso, conteo, eps_m, peso_minimo)
+    tabla = poligonos_hotspots(grilla, celdas)
+    tabla.insert(1, 'tipo', tipo)
+    tabla.insert(2, 'anio', anio)
+    return {'tipo': tipo, 'anio': anio, 'celdas': celdas, 'tabla': tabla}
+
+
+def detectar_hotspots(ruta_csv, grilla=None, por_tipo=False, por_anio=False, eps_m=EPS_M,
+                      peso_minimo=None, procesos=None):
+    """Hotspots de todos los delitos o de cada tipo y/o año; cada grupo es una tarea del pool.
+
+    Devuelve la lista de resultados de hotspots_grupo (celdas de cada hotspot y su tabla).
+    """
+    grilla = grilla or grilla_hotspots()
+    tipos = valores_particion(ruta_csv, 'tipo') if por_tipo else [None]
+    anios = valores_particion(ruta_csv, 'anio') if por_anio else [None]
+    grupos = list(itertools.product(anios, tipos))
+    if len(grupos) == 1:
+        return [hotspots_grupo(ruta_csv, grilla, *grupos[0], eps_m, peso_minimo)]
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count()) as pool:
+        futuros = [pool.submit(hotspots_grupo, ruta_csv, grilla, anio, tipo, eps_m, peso_minimo)
+                   for anio, tipo in grupos]
+        return [f.result() for f in futuros]
+
+
+def guardar_celdas(ruta, grilla, celdas, tabla):
+    """Guarda las celdas de los hotspots de un grupo y el peso de cada hotspot (.npz)."""
+    np.savez(ruta, ids=celdas['ids'], etiquetas=celdas['etiquetas'], peso_hotspot=tabla['peso'].to_numpy(),
+             extension=np.array([grilla.xmin, grilla.ymin, grilla.xmax, grilla.ymax, grilla.cell_size]))
+
+
+def cargar_celdas(ruta):
+    """Lee guardar_celdas y arma el ráster de etiquetas y el índice de las celdas en hotspots."""
+    with np.load(ruta) as datos:
+        grilla = Grilla(*datos['extension'].tolist())
+        ids, etiquetas, peso_hotspot = datos['ids'], datos['etiquetas'], datos['peso_hotspot']
+    raster = np.full(grilla.nx * grilla.ny, -1.0)
+    raster[ids] = etiquetas
+    lat, lon = centros_celdas(grilla, ids)
+    return {
+        'grilla': grilla,
+        'raster': grid_id_a_raster(grilla, raster),
+        'arbol': cKDTree(cartesianas(lat, lon)) if len(ids) else None,
+        'peso_hotspot': peso_hotspot,
+    }
+
+
+def features_hotspots(hotspots, lat, lon):
+    """Hotspot que contiene cada punto (-1 si ninguno), su peso y la distancia (m) al centro de la
+    celda de hotspot más cercana."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    hotspot = densidad_en_puntos(hotspots['grilla'], hotspots['raster'], lat, lon,
+                                 bordes='inferior', fuera=-1).astype(np.int64)
+    peso = np.append(hotspots['peso_hotspot'], 0.0)[hotspot]
+    distancia = np.full(len(lat), np.nan)
+    validos = np.isfinite(lat) & np.isfinite(lon)
+    if hotspots['arbol'] is not None and validos.any():
+        c = np.minimum(hotspots['arbol'].query(cartesianas(lat[validos], lon[validos]), k=1, workers=-1)[0], 2.0)
+        distancia[validos] = 2 * RADIO_TIERRA_M * np.arcsin(c / 2)
+    return pd.DataFrame({'hotspot': hotspot, 'peso_hotspot': peso, 'dist_hotspot_m': distancia})
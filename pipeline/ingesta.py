@@ -0,0 +1,157 @@
+# Ingesta incremental y en paralelo de los archivos anuales delitos_YYYY.xlsx
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from pipeline.coordenadas import limpiar_coordenadas
+
+# Tipos de OGR (.vrt) a tipos de pandas
+TIPOS_VRT = {
+    'Integer': 'Int64',
+    'Integer64': 'Int64',
+    'Real': 'float64',
+    'String': 'string',
+    'Date': 'datetime64[ns]',
+    'DateTime': 'datetime64[ns]',
+}
+
+MANIFIESTO = 'manifiesto.json'
+
+
+def leer_esquema_vrt(ruta_vrt):
+    """Lee los campos declarados en un .vrt de OGR y devuelve {columna: tipo de pandas}."""
+    raiz = ET.parse(ruta_vrt).getroot()
+    esquema = {}
+    for campo in raiz.iter('Field'):
+        esquema[campo.get('name')] = TIPOS_VRT.get(campo.get('type'), 'string')
+    return esquema
+
+
+def aplicar_esquema(df, esquema):
+    """Convierte las columnas presentes en el DataFrame a los tipos del esquema."""
+    for columna, tipo in esquema.items():
+        if columna not in df.columns:
+            continue
+        if tipo == 'Int64':
+            df[columna] = pd.to_numeric(df[columna], errors='coerce').round().astype('Int64')
+        elif tipo == 'float64':
+            df[columna] = pd.to_numeric(df[columna], errors='coerce')
+        elif tipo.startswith('datetime'):
+            df[columna] = pd.to_datetime(df[columna], errors='coerce')
+        else:
+            df[columna] = df[columna].astype('string')
+    # Columnas fuera del esquema: se guardan como texto para que el archivo columnar sea consistente
+    for columna in df.columns:
+        if columna not in esquema and df[columna].dtype == object:
+            df[columna] = df[columna].astype('string')
+    return df
+
+
+def huella_archivo(ruta, calcular_hash=True):
+    """Tamaño, fecha de modificación y (opcionalmente) sha256 del archivo fuente."""
+    info = os.stat(ruta)
+    huella = {'tamanio': info.st_size, 'mtime': info.st_mtime}
+    if calcular_hash:
+        sha = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloque)
+        huella['sha256'] = sha.hexdigest()
+    return huella
+
+
+def procesar_archivo(ruta_xlsx, ruta_parte, esquema):
+    """Lee un archivo anual, limpia las coordenadas y guarda el resultado en formato columnar.
+
+    Se ejecuta dentro de un proceso del pool, por eso recibe y devuelve sólo datos simples.
+    """
+    # Las columnas de texto se leen como texto para no depender de la inferencia de tipos
+    dtype = {col: str for col, tipo in esquema.items() if tipo == 'string'}
+    df = pd.read_excel(ruta_xlsx, dtype=dtype)
+    df = aplicar_esquema(df, esquema)
+    df, conteos = limpiar_coordenadas(df)
+    df = df.reset_index(drop=True)
+    df.to_parquet(ruta_parte, index=False)
+    return conteos
+
+
+def _leer_manifiesto(dir_cache):
+    ruta = os.path.join(dir_cache, MANIFIESTO)
+    if os.path.exists(ruta):
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def _guardar_manifiesto(dir_cache, manifiesto):
+    ruta = os.path.join(dir_cache, MANIFIESTO)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def archivos_a_procesar(dataset_dir, archivos, dir_cache, manifiesto, forzar=False):
+    """Devuelve los archivos cuya parte en caché falta o quedó desactualizada.
+
+    Si tamaño y mtime coinciden con el manifiesto se reutiliza la parte sin leer el archivo;
+    si cambiaron, se compara el sha256 para no reprocesar archivos sólo "tocados".
+    """
+    pendientes = []
+    for archivo in archivos:
+        ruta = os.path.join(dataset_dir, archivo)
+        ruta_parte = os.path.join(dir_cache, os.path.splitext(archivo)[0] + '.parquet')
+        entrada = manifiesto.get(archivo)
+        if forzar or entrada is None or not os.path.exists(ruta_parte):
+            pendientes.append(archivo)
+            continue
+        huella = huella_archivo(ruta, calcular_hash=False)
+        if huella['tamanio'] == entrada['tamanio'] and huella['mtime'] == entrada['mtime']:
+            continue
+        huella = huella_archivo(ruta)
+        if huella['sha256'] == entrada.get('sha256'):
+            entrada.update(huella)
+            continue
+        pendientes.append(archivo)
+    return pendientes
+
+
+def ingerir_delitos(dataset_dir, archivos, ruta_esquema, dir_cache=None, procesos=None, forzar=False):
+    """Carga incremental de los archivos de delitos.
+
+    Sólo se vuelven a leer los archivos nuevos o modificados (en paralelo); el resto se toma
+    de la caché columnar. Devuelve el DataFrame consolidado y los conteos por archivo.
+    """
+    dir_cache = dir_cache or os.path.join(dataset_dir, 'cache_delitos')
+    os.makedirs(dir_cache, exist_ok=True)
+    esquema = leer_esquema_vrt(ruta_esquema)
+    manifiesto = _leer_manifiesto(dir_cache)
+
+    pendientes = archivos_a_procesar(dataset_dir, archivos, dir_cache, manifiesto, forzar)
+    print(f"Archivos en caché: {len(archivos) - len(pendientes)} | a procesar: {len(pendientes)}")
+
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = {}
+            for archivo in pendientes:
+                ruta = os.path.join(dataset_dir, archivo)
+                ruta_parte = os.path.join(dir_cache, os.path.splitext(archivo)[0] + '.parquet')
+                futuros[archivo] = pool.submit(procesar_archivo, ruta, ruta_parte, esquema)
+            for archivo, futuro in futuros.items():
+                conteos = futuro.result()
+                manifiesto[archivo] = {**huella_archivo(os.path.join(dataset_dir, archivo)), 'conteos': conteos}
+                print(f"Procesado: {archivo} ({conteos['validas']} registros válidos)")
+        _guardar_manifiesto(dir_cache, manifiesto)
+    elif manifiesto:
+        # Puede haber huellas actualizadas (mismo hash, distinto mtime)
+        _guardar_manifiesto(dir_cache, manifiesto)
+
+    # Reconstrucción del consolidado a partir de las partes en caché
+    partes = [pd.read_parquet(os.path.join(dir_cache, os.path.splitext(a)[0] + '.parquet')) for a in archivos]
+    delitos_total = pd.concat(partes, ignore_index=True)
+    conteos_por_archivo = {a: manifiesto[a].get('conteos', {}) for a in archivos}
+    return delitos_total, conteos_por_archivo
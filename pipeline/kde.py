@@ -0,0 +1,66 @@
+# Superficie de riesgo suavizada: estimación de densidad por núcleos (KDE) con convolución FFT
+import numpy as np
+from scipy.signal import fftconvolve
+
+from pipeline.grilla import densidad_grilla
+
+# Metros por grado de latitud (aproximación esférica, suficiente para la escala de CABA)
+METROS_POR_GRADO = 111320.0
+
+NUCLEOS = ('gaussiano', 'epanechnikov')
+
+
+def nucleo_discreto(grilla, ancho_banda_m, nucleo='gaussiano'):
+    """Núcleo muestreado en los centros de celda de la grilla, normalizado para sumar 1.
+
+    El ancho de banda en metros se convierte a celdas por separado en cada eje, porque a la
+    latitud de CABA un grado de longitud mide menos metros que uno de latitud.
+    """
+    if nucleo not in NUCLEOS:
+        raise ValueError(f"Núcleo no reconocido: {nucleo!r} (usar {', '.join(NUCLEOS)})")
+    lat_centro = (grilla.ymin + grilla.ymax) / 2
+    celda_y_m = grilla.cell_size * METROS_POR_GRADO
+    celda_x_m = celda_y_m * np.cos(np.radians(lat_centro))
+    # El gaussiano se corta en 4 desvíos; el Epanechnikov tiene soporte finito igual al ancho de banda
+    alcance = 4 * ancho_banda_m if nucleo == 'gaussiano' else ancho_banda_m
+    rx = int(np.ceil(alcance / celda_x_m))
+    ry = int(np.ceil(alcance / celda_y_m))
+    dy, dx = np.meshgrid(np.arange(-ry, ry + 1) * celda_y_m, np.arange(-rx, rx + 1) * celda_x_m, indexing='ij')
+    u2 = (dx ** 2 + dy ** 2) / ancho_banda_m ** 2
+    if nucleo == 'gaussiano':
+        pesos = np.exp(-0.5 * u2)
+    else:
+        pesos = np.clip(1 - u2, 0, None)
+    total = pesos.sum()
+    if total == 0:
+        # Ancho de banda menor que media celda: el núcleo se reduce a la propia celda
+        pesos = np.zeros_like(pesos)
+        pesos[ry, rx] = 1.0
+        return pesos
+    return pesos / total
+
+
+def densidad_kde(grilla, lat, lon, peso=None, ancho_banda_m=250.0, nucleo='gaussiano', celda_referencia=None):
+    """Densidad delictiva suavizada sobre la grilla, como ráster (ny, nx).
+
+    Los delitos se agrupan primero en las celdas de la grilla y después se convoluciona el
+    conteo con el núcleo por FFT, en lugar de evaluar el núcleo delito por delito.
+    El resultado está en delitos ponderados por celda de la grilla; con celda_referencia (en
+    grados) se reescala a delitos por celda de ese tamaño, por ejemplo 0.005 para que los
+    umbrales de clasificar_seguridad sigan valiendo con una grilla más fina.
+    """
+    conteo = densidad_grilla(grilla, lat, lon, peso, bordes='inferior')
+    return suavizar_raster(grilla, conteo, ancho_banda_m, nucleo, celda_referencia)
+
+
+def suavizar_raster(grilla, conteo, ancho_banda_m=250.0, nucleo='gaussiano', celda_referencia=None):
+    """Convolución FFT de un ráster de conteos ya binneado (ver densidad_kde).
+
+    Como la convolución es lineal, se puede aplicar a una combinación de rásters anuales.
+    """
+    suavizado = fftconvolve(conteo, nucleo_discreto(grilla, ancho_banda_m, nucleo), mode='same')
+    # La FFT deja residuos numéricos negativos muy chicos donde no hay delitos
+    suavizado = np.clip(suavizado, 0, None)
+    if celda_referencia is not None:
+        suavizado *= (celda_referencia / grilla.cell_size) ** 2
+    return suavizado
@@ -0,0 +1,152 @@
+# Capas de calor pre-agregadas para los mapas de folium
+import math
+import os
+
+import numpy as np
+
+from pipeline.grilla import EXTENSION_CABA, Grilla, densidad_en_puntos, densidad_grilla
+
+# Celda para agregar los puntos del mapa de calor (~50 m, por debajo del radio de 8 px a zoom 12-14)
+CELDA_CALOR = 0.0005
+
+TAMANIO_TESELA = 256
+
+
+def puntos_calor_agregados(lat, lon, peso=None, cell_size=CELDA_CALOR, extension=EXTENSION_CABA):
+    """Un punto [lat, lon, peso] por celda no vacía, en el centro de la celda.
+
+    Reemplaza a miles de puntos crudos por uno ponderado sin descartar registros. Los pesos se
+    normalizan a [0, 1] respecto de la celda más cargada, que es la escala que usa Leaflet.heat.
+    """
+    grilla = Grilla(*extension, cell_size)
+    raster = densidad_grilla(grilla, lat, lon, peso, bordes='inferior')
+    iy, ix = np.nonzero(raster)
+    if len(iy) == 0:
+        return []
+    valores = raster[iy, ix]
+    lat_centro = grilla.y_coords[iy] + cell_size / 2
+    lon_centro = grilla.x_coords[ix] + cell_size / 2
+    return np.column_stack([lat_centro, lon_centro, valores / valores.max()]).round(6).tolist()
+
+
+def _tesela_a_grados(x, y, zoom):
+    # Esquina noroeste de la tesela (x, y) en Web Mercator, en grados
+    n = 2 ** zoom
+    lon = x / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / n))))
+    return lat, lon
+
+
+def _grados_a_tesela(lat, lon, zoom):
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+def generar_teselas(grilla, raster, directorio, zooms=range(10, 16), cmap='YlOrRd', escala_log=True):
+    """Pre-renderiza teselas PNG {z}/{x}/{y}.png del ráster para usarlas en un TileLayer local.
+
+    Cada píxel toma el valor de la celda en la que cae su centro; las celdas vacías quedan
+    transparentes. Devuelve la plantilla de URL relativa al directorio padre de `directorio`.
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    colores = matplotlib.colormaps[cmap]
+    valores = np.log1p(raster) if escala_log else np.asarray(raster, dtype=np.float64)
+    maximo = valores.max() or 1.0
+    x0, y0 = grilla.x_coords[0], grilla.y_coords[0]
+    x1, y1 = x0 + grilla.nx * grilla.cell_size, y0 + grilla.ny * grilla.cell_size
+    # Centros de los píxeles dentro de la tesela (en fracciones de tesela)
+    fraccion = (np.arange(TAMANIO_TESELA) + 0.5) / TAMANIO_TESELA
+    cantidad = 0
+    for zoom in zooms:
+        tx0, ty0 = _grados_a_tesela(y1, x0, zoom)
+        tx1, ty1 = _grados_a_tesela(y0, x1, zoom)
+        for tx in range(tx0, tx1 + 1):
+            for ty in range(ty0, ty1 + 1):
+                _, lon = _tesela_a_grados(tx + fraccion, ty, zoom)
+                lat, _ = _tesela_a_grados(tx, ty + fraccion, zoom)
+                lon_px, lat_px = np.meshgrid(lon, lat)
+                pixeles = densidad_en_puntos(grilla, valores, lat_px.ravel(), lon_px.ravel(), bordes='inferior')
+                pixeles = pixeles.reshape(TAMANIO_TESELA, TAMANIO_TESELA)
+                if not pixeles.any():
+                    continue
+                rgba = colores(pixeles / maximo)
+                rgba[..., 3] = np.where(pixeles > 0, 0.75, 0.0)
+                ruta = os.path.join(directorio, str(zoom), str(tx))
+                os.makedirs(ruta, exist_ok=True)
+                plt.imsave(os.path.join(ruta, f'{ty}.png'), rgba)
+                cantidad += 1
+    print(f"Teselas generadas: {cantidad} en {directorio}")
+    return os.path.basename(os.path.normpath(directorio)) + '/{z}/{x}/{y}.png'
+
+
+# Colores de los marcadores según la categoría de seguridad (2- densidad.py)
+COLORES_SEGURIDAD = {'Muy Seguro': 'green', 'Seguro': 'blue', 'Moderado': 'orange', 'Riesgoso': 'red'}
+
+COLOR_POR_DEFECTO = 'gray'
+
+
+def grilla_topojson(grilla, raster, objeto='grilla'):
+    """TopoJSON compacto del ráster: sólo celdas no vacías, coordenadas enteras y bordes compartidos.
+
+    Las coordenadas se cuantizan a índices de la grilla (el transform las vuelve a grados) y
+    cada borde entre dos celdas vecinas se guarda una sola vez como arco. Las propiedades de
+    cada celda son grid_id (ix * ny + iy, como en grilla_geodataframe) y densidad.
+    """
+    iy, ix = np.nonzero(raster)
+    ancho = grilla.nx + 1
+    # Clave de un borde unitario: vértice inicial y orientación (0 horizontal, 1 vertical)
+    def borde(x, y, orientacion):
+        return (y * ancho + x) * 2 + orientacion
+    # Bordes de cada celda en sentido antihorario: abajo, derecha, arriba (invertido), izquierda (invertido)
+    bordes = np.column_stack([borde(ix, iy, 0), borde(ix + 1, iy, 1), borde(ix, iy + 1, 0), borde(ix, iy, 1)])
+    claves, arcos = np.unique(bordes, return_inverse=True)
+    arcos = arcos.reshape(bordes.shape)
+    arcos[:, 2:] = ~arcos[:, 2:]
+
+    inicio = claves // 2
+    es_vertical = (claves % 2).astype(int)
+    x0, y0 = inicio % ancho, inicio // ancho
+    geometrias = [
+        {'type': 'Polygon', 'arcs': [fila], 'properties': {'grid_id': gid, 'densidad': valor}}
+        for fila, gid, valor in zip(arcos.tolist(), (ix * grilla.ny + iy).tolist(), raster[iy, ix].tolist())
+    ]
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [grilla.cell_size, grilla.cell_size],
+                      'translate': [float(grilla.x_coords[0]), float(grilla.y_coords[0])]},
+        'objects': {objeto: {'type': 'GeometryCollection', 'geometries': geometrias}},
+        # Arcos delta-codificados: punto inicial y un paso de una celda
+        'arcs': [[[x, y], [1 - v, v]] for x, y, v in zip(x0.tolist(), y0.tolist(), es_vertical.tolist())],
+    }
+
+
+def capa_alojamientos(lat, lon, nombres=None, categorias=None, colores=COLORES_SEGURIDAD, nombre='Alojamientos'):
+    """Capa de marcadores agrupados en el navegador, armada desde arrays (sin un Marker por fila).
+
+    Con categorias cada marcador toma el color de su categoría de seguridad.
+    """
+    from folium.plugins import FastMarkerCluster
+
+    lat = np.asarray(lat, dtype=np.float64).round(6)
+    lon = np.asarray(lon, dtype=np.float64).round(6)
+    nombres = ['Alojamiento'] * len(lat) if nombres is None else [str(n) for n in nombres]
+    if categorias is None:
+        color = [COLORES_SEGURIDAD['Muy Seguro']] * len(lat)
+        etiqueta = nombres
+    else:
+        color = [colores.get(c, COLOR_POR_DEFECTO) for c in categorias]
+        etiqueta = [f'{n} ({c})' for n, c in zip(nombres, categorias)]
+    datos = [list(fila) for fila in zip(lat.tolist(), lon.tolist(), etiqueta, color)]
+    callback = """
+    function (row) {
+        var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+            {radius: 6, color: row[3], fillColor: row[3], fillOpacity: 0.8, weight: 1});
+        marker.bindPopup(row[2]);
+        return marker;
+    };
+    """
+    return FastMarkerCluster(datos, callback=callback, name=nombre)
@@ -0,0 +1,193 @@
+# Métricas por etapa (tiempo, CPU, memoria y filas) en JSON lines, con resumen y perfil opcional
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Cada cuánto se mide la memoria del proceso durante una etapa (segundos)
+INTERVALO_MEMORIA = 0.005
+
+# Variables de entorno: archivo JSON lines (vacío para no escribir) y etapa a perfilar con cProfile
+VARIABLE_ARCHIVO = 'METRICAS_ARCHIVO'
+VARIABLE_PERFIL = 'METRICAS_PERFIL'
+ARCHIVO_POR_DEFECTO = 'metricas.jsonl'
+
+# Funciones que se muestran del perfil de una etapa
+LINEAS_PERFIL = 25
+
+_configuracion = {
+    'archivo': os.environ.get(VARIABLE_ARCHIVO, ARCHIVO_POR_DEFECTO),
+    'perfil': os.environ.get(VARIABLE_PERFIL) or None,
+    'resumen': True,
+}
+_CAMPOS_BASE = {'ejecucion', 'script', 'etapa', 'inicio', 'filas_entrada', 'filas_salida', 'segundos',
+                'cpu_segundos', 'memoria_inicio_mib', 'memoria_pico_mib', 'memoria_incremento_mib', 'perfil'}
+_registros = []
+_ejecucion = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+_resumen_pendiente = False
+
+
+@contextmanager
+def medir_memoria():
+    """Memoria residente (bytes) del proceso al empezar el bloque (medida['inicio']), su pico
+    mientras dura (medida['pico']) y cuánto subió sobre la inicial (medida['incremento']).
+
+    El incremento es lo que reservó el bloque; el pico incluye el intérprete, las bibliotecas y lo
+    que dejaron tareas anteriores del mismo proceso (p. ej. un proceso reutilizado del pool).
+    Con psutil se muestrea la memoria del proceso desde un hilo (costo despreciable); sin psutil
+    se usa tracemalloc, que sólo ve lo reservado desde Python y hace bastante más lento el bloque.
+    """
+    medida = {'inicio': 0, 'pico': 0, 'incremento': 0}
+    try:
+        import psutil
+    except ImportError:
+        tracemalloc.start()
+        try:
+            yield medida
+        finally:
+            medida['pico'] = medida['incremento'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return
+
+    proceso = psutil.Process()
+    medida['inicio'] = medida['pico'] = proceso.memory_info().rss
+    terminado = threading.Event()
+
+    def muestrear():
+        while True:
+            medida['pico'] = max(medida['pico'], proceso.memory_info().rss)
+            if terminado.wait(INTERVALO_MEMORIA):
+                return
+
+    hilo = threading.Thread(target=muestrear, daemon=True)
+    hilo.start()
+    try:
+        yield medida
+    finally:
+        terminado.set()
+        hilo.join()
+        medida['pico'] = max(medida['pico'], proceso.memory_info().rss)
+        medida['incremento'] = medida['pico'] - medida['inicio']
+
+
+def configurar(archivo=None, perfil=None, resumen=None):
+    """Cambia el archivo JSON lines ('' para no escribir), la etapa a perfilar ('' para ninguna)
+    o si se imprime el resumen al salir; lo que queda en None no cambia.
+
+    Por defecto se toman de las variables de entorno METRICAS_ARCHIVO y METRICAS_PERFIL, así se
+    puede perfilar una etapa de cualquier script sin editarlo.
+    """
+    if archivo is not None:
+        _configuracion['archivo'] = archivo
+    if perfil is not None:
+        _configuracion['perfil'] = perfil or None
+    if resumen is not None:
+        _configuracion['resumen'] = resumen
+
+
+def _tiempo_cpu():
+    # Incluye los procesos hijos ya terminados (los del pool, al cerrarse dentro de la etapa)
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _escribir(registro):
+    archivo = _configuracion['archivo']
+    if not archivo:
+        return
+    with open(archivo, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+
+@contextmanager
+def etapa(nombre, filas_entrada=None, **campos):
+    """Mide una etapa: tiempo de reloj, tiempo de CPU, memoria residente y filas.
+
+    De la memoria se guarda la del proceso al empezar, el pico y cuánto subió sobre la inicial
+    (lo que reservó la etapa, sin el intérprete ni lo que dejaron las etapas anteriores).
+
+    El bloque recibe el registro y puede completar registro['filas_salida']. Al terminar, el
+    registro se agrega al archivo JSON lines y al resumen del final de la ejecución. Si la etapa
+    es la pedida en METRICAS_PERFIL, se perfila con cProfile y se guarda perfil_<etapa>.prof.
+    """
+    global _resumen_pendiente
+    if _configuracion['resumen'] and not _resumen_pendiente:
+        atexit.register(imprimir_resumen)
+        _resumen_pendiente = True
+    registro = {
+        'ejecucion': _ejecucion,
+        'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+        'etapa': nombre,
+        **campos,
+        'inicio': datetime.now().isoformat(timespec='seconds'),
+        'filas_entrada': None if filas_entrada is None else int(filas_entrada),
+        'filas_salida': None,
+    }
+    perfil = cProfile.Profile() if _configuracion['perfil'] == nombre else None
+    with medir_memoria() as memoria:
+        inicio, cpu = time.perf_counter(), _tiempo_cpu()
+        if perfil is not None:
+            perfil.enable()
+        try:
+            yield registro
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            registro['segundos'] = time.perf_counter() - inicio
+            registro['cpu_segundos'] = _tiempo_cpu() - cpu
+    registro['memoria_inicio_mib'] = memoria['inicio'] / 2**20
+    registro['memoria_pico_mib'] = memoria['pico'] / 2**20
+    registro['memoria_incremento_mib'] = memoria['incremento'] / 2**20
+    if registro['filas_salida'] is not None:
+        registro['filas_salida'] = int(registro['filas_salida'])
+    if perfil is not None:
+        registro['perfil'] = _guardar_perfil(perfil, nombre)
+    _registros.append(registro)
+    _escribir(registro)
+
+
+def _guardar_perfil(perfil, nombre):
+    ruta = f"perfil_{nombre}.prof"
+    perfil.dump_stats(ruta)
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).sort_stats('cumulative').print_stats(LINEAS_PERFIL)
+    print(f"\nPerfil de la etapa '{nombre}' (guardado en {ruta}; abrir con snakeviz o pstats):")
+    print(texto.getvalue())
+    return ruta
+
+
+def registros():
+    """Registros de las etapas medidas en esta ejecución, en orden."""
+    return list(_registros)
+
+
+def _etiqueta(registro):
+    # Nombre de la etapa con los campos extra (p. ej. el año), para distinguir etapas repetidas
+    extra = [f"{k}={v}" for k, v in registro.items() if k not in _CAMPOS_BASE]
+    return f"{registro['etapa']} [{', '.join(extra)}]" if extra else registro['etapa']
+
+
+def imprimir_resumen():
+    """Tabla con el tiempo, la CPU, la memoria (pico y aumento) y las filas de cada etapa medida."""
+    if not _registros:
+        return
+    total = sum(r['segundos'] for r in _registros) or 1e-12
+    etiquetas = [_etiqueta(r) for r in _registros]
+    ancho = max(len(e) for e in etiquetas)
+    print(f"\nResumen por etapa ({_ejecucion}):")
+    print(f"{'etapa':<{ancho}} {'s':>9} {'%':>5} {'cpu s':>9} {'MiB pico':>9} {'MiB +':>9}  filas")
+    for r, etiqueta in zip(_registros, etiquetas):
+        filas = f"{r['filas_entrada'] if r['filas_entrada'] is not None else '-'} -> " \
+                f"{r['filas_salida'] if r['filas_salida'] is not None else '-'}"
+        print(f"{etiqueta:<{ancho}} {r['segundos']:9.3f} {100 * r['segundos'] / total:5.1f} "
+              f"{r['cpu_segundos']:9.3f} {r['memoria_pico_mib']:9.1f} {r['memoria_incremento_mib']:9.1f}  {filas}")
+    if _configuracion['archivo']:
+        print(f"Métricas en: {_configuracion['archivo']}")
@@ -0,0 +1,49 @@
+# Ponderación temporal de los delitos (por año o con decaimiento exponencial por vida media)
+import numpy as np
+import pandas as pd
+
+# Esquema histórico de asignar_peso: los años recientes pesan más
+PESOS_POR_ANIO = {2023: 1.0, 2022: 0.75, 2021: 0.50}
+PESO_POR_DEFECTO = 0.15
+
+
+def pesos_por_anio(anios, pesos=None, por_defecto=PESO_POR_DEFECTO):
+    """Peso de cada delito según su año (versión vectorizada de asignar_peso)."""
+    pesos = PESOS_POR_ANIO if pesos is None else pesos
+    anios = np.asarray(anios)
+    resultado = np.full(anios.shape, por_defecto, dtype=np.float64)
+    for anio, peso in pesos.items():
+        resultado[anios == anio] = peso
+    return resultado
+
+
+def anio_decimal(fechas=None, anios=None):
+    """Año con fracción (2023.5 = mitad de 2023) a partir de fecha; si falta, el inicio del año."""
+    base = np.asarray(anios, dtype=np.float64) if anios is not None else None
+    if fechas is None:
+        return base
+    fechas = pd.to_datetime(pd.Series(fechas), errors='coerce')
+    dias_anio = np.where(fechas.dt.is_leap_year, 366.0, 365.0)
+    decimal = (fechas.dt.year + (fechas.dt.dayofyear - 1) / dias_anio).to_numpy(dtype=np.float64)
+    if base is not None:
+        decimal = np.where(np.isnan(decimal), base, decimal)
+    return decimal
+
+
+def pesos_vida_media(tiempos, referencia, vida_media):
+    """Decaimiento exponencial: un delito de hace `vida_media` años pesa la mitad que uno en `referencia`.
+
+    tiempos y referencia van en años decimales (ver anio_decimal). No se recorta en 1 a los
+    tiempos posteriores a la referencia para que la ponderación siga siendo lineal por año.
+    """
+    return np.power(0.5, (referencia - np.asarray(tiempos, dtype=np.float64)) / vida_media)
+
+
+def factores_anuales_vida_media(anios, referencia, vida_media):
+    """Factor de cada año para combinar rásters anuales ponderados dentro del año.
+
+    Como 0.5 ** ((r - t) / h) = 0.5 ** ((r - y) / h) * 2 ** ((t - y) / h), la superficie
+    ponderada es la suma de los rásters anuales (con el factor intra-anual) por estos factores.
+    Los años faltantes (anio < 0) no tienen factor.
+    """
+    return {int(anio): float(0.5 ** ((referencia - anio) / vida_media)) for anio in anios if anio >= 0}
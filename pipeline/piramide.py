@@ -0,0 +1,99 @@
+# Pirámide de rásters de densidad (cada nivel suma bloques de 2x2 celdas del nivel anterior)
+import json
+import math
+import os
+
+import numpy as np
+
+from pipeline.grilla import Grilla
+
+META = 'meta.json'
+
+# Grados por píxel en el ecuador para el zoom 0 de los mapas web (teselas de 256 px)
+GRADOS_POR_PIXEL_Z0 = 360 / 256
+
+
+def _grilla_con_celdas(xmin, ymin, cell_size, nx, ny):
+    # Grilla cuyo arange da exactamente nx por ny celdas
+    return Grilla(xmin, ymin, xmin + (nx - 0.5) * cell_size, ymin + (ny - 0.5) * cell_size, cell_size)
+
+
+def construir_piramide(raster, niveles=None):
+    """Lista de rásters: el nivel 0 es el original y cada nivel suma bloques de 2x2 del anterior.
+
+    Si la cantidad de filas o columnas es impar se completa con ceros, así cada nivel conserva
+    el total de delitos. Se construye en una sola pasada desde el nivel más fino.
+    """
+    piramide = [np.asarray(raster, dtype=np.float64)]
+    while max(piramide[-1].shape) > 1 and (niveles is None or len(piramide) < niveles):
+        actual = piramide[-1]
+        ny, nx = actual.shape
+        relleno = np.pad(actual, ((0, ny % 2), (0, nx % 2)))
+        piramide.append(relleno.reshape(relleno.shape[0] // 2, 2, relleno.shape[1] // 2, 2).sum(axis=(1, 3)))
+    return piramide
+
+
+def guardar_piramide(directorio, grilla, raster, niveles=None):
+    """Guarda cada nivel como .npy (para abrirlo memory-mapped) y la descripción en meta.json."""
+    os.makedirs(directorio, exist_ok=True)
+    piramide = construir_piramide(raster, niveles)
+    for nivel, datos in enumerate(piramide):
+        np.save(os.path.join(directorio, f'nivel_{nivel}.npy'), datos)
+    meta = {
+        'xmin': float(grilla.x_coords[0]),
+        'ymin': float(grilla.y_coords[0]),
+        'cell_size': grilla.cell_size,
+        'formas': [list(datos.shape) for datos in piramide],
+    }
+    with open(os.path.join(directorio, META), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def abrir_piramide(directorio):
+    """Lee la descripción de la pirámide; los niveles se abren recién cuando se piden."""
+    with open(os.path.join(directorio, META), encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['directorio'] = directorio
+    return meta
+
+
+def grilla_nivel(piramide, nivel):
+    """Grilla (extensión y tamaño de celda) de un nivel de la pirámide."""
+    ny, nx = piramide['formas'][nivel]
+    return _grilla_con_celdas(piramide['xmin'], piramide['ymin'], piramide['cell_size'] * 2 ** nivel, nx, ny)
+
+
+def leer_nivel(piramide, nivel):
+    """Ráster completo de un nivel, memory-mapped (sólo se lee del disco lo que se usa)."""
+    return np.load(os.path.join(piramide['directorio'], f'nivel_{nivel}.npy'), mmap_mode='r')
+
+
+def leer_ventana(piramide, nivel, xmin, ymin, xmax, ymax):
+    """Recorte del nivel que cubre la ventana (en grados); devuelve (grilla de la ventana, ráster)."""
+    grilla = grilla_nivel(piramide, nivel)
+    cs = grilla.cell_size
+    ix0 = max(int(math.floor((xmin - piramide['xmin']) / cs)), 0)
+    iy0 = max(int(math.floor((ymin - piramide['ymin']) / cs)), 0)
+    ix1 = min(int(math.ceil((xmax - piramide['xmin']) / cs)), grilla.nx)
+    iy1 = min(int(math.ceil((ymax - piramide['ymin']) / cs)), grilla.ny)
+    if ix1 <= ix0 or iy1 <= iy0:
+        raise ValueError("La ventana pedida no se superpone con la pirámide")
+    ventana = np.array(leer_nivel(piramide, nivel)[iy0:iy1, ix0:ix1])
+    grilla_ventana = _grilla_con_celdas(piramide['xmin'] + ix0 * cs, piramide['ymin'] + iy0 * cs,
+                                        cs, ix1 - ix0, iy1 - iy0)
+    return grilla_ventana, ventana
+
+
+def nivel_para_escala(piramide, tamanio_grados):
+    """Nivel más fino cuya celda mide al menos tamanio_grados."""
+    for nivel in range(len(piramide['formas'])):
+        if piramide['cell_size'] * 2 ** nivel >= tamanio_grados:
+            return nivel
+    return len(piramide['formas']) - 1
+
+
+def nivel_para_zoom(piramide, zoom, pixeles_por_celda=16):
+    """Nivel cuya celda ocupa al menos pixeles_por_celda píxeles en un mapa web con ese zoom."""
+    grados_por_pixel = GRADOS_POR_PIXEL_Z0 / 2 ** zoom
+    return nivel_para_escala(piramide, grados_por_pixel * pixeles_por_celda)
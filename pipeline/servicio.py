@@ -0,0 +1,226 @@
+# Servicio de puntuación de seguridad: carga los artefactos una vez y responde consultas
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from pipeline.clusters import asignar_clusters, cargar_clusters
+from pipeline.compilado import cargar_compilado, entorno_compilado, predecir_proba
+from pipeline.entorno import features_entorno, indexar_capas
+from pipeline.grilla import cargar_raster, densidad_en_puntos
+
+# Categorías en el orden de salida del modelo LightGBM (igual que en 3- nuevo alojamiento.py)
+CATEGORIAS_LIGHTGBM = ['Muy Seguro', 'Seguro', 'Moderado', 'Riesgoso']
+
+# Cada cuánto se revisan las fechas de modificación de los artefactos (segundos)
+INTERVALO_RECARGA = 1.0
+
+
+def cargar_modelo(ruta):
+    """Carga modelo_lightgbm.txt, mejor_modelo.pkl o su versión compilada mejor_modelo.npz y
+    devuelve (función de probabilidades, clases).
+
+    La función recibe las columnas latitud, longitud, densidad y clúster; si el modelo se entrenó
+    con features de entorno, las calcula a partir de las capas guardadas junto al modelo.
+    """
+    if ruta.endswith('.txt'):
+        import lightgbm as lgb
+
+        booster = lgb.Booster(model_file=ruta)
+        return booster.predict, list(CATEGORIAS_LIGHTGBM)
+    if ruta.endswith('.npz'):
+        compilado = cargar_compilado(ruta)
+        entorno = entorno_compilado(compilado)
+        indices = indexar_capas(entorno['capas']) if entorno else None
+
+        def predecir_compilado(X):
+            if indices is not None:
+                extra = features_entorno(indices, X[:, 0], X[:, 1], entorno['radios'])
+                X = np.column_stack([X, extra.to_numpy()])
+            return predecir_proba(compilado, X)
+
+        return predecir_compilado, compilado['clases'].tolist()
+    import joblib
+
+    paquete = joblib.load(ruta)
+    modelo, scaler = paquete['modelo'], paquete['scaler']
+    features = paquete.get('features')
+    entorno = paquete.get('entorno')
+    indices = indexar_capas(entorno['capas']) if entorno else None
+
+    def predecir(X):
+        if indices is not None:
+            extra = features_entorno(indices, X[:, 0], X[:, 1], entorno['radios'])
+            X = np.column_stack([X, extra.to_numpy()])
+        if features is not None:
+            # Con los nombres de columna con los que se ajustó el scaler
+            X = pd.DataFrame(X, columns=features)
+        return modelo.predict_proba(scaler.transform(X))
+
+    return predecir, list(paquete['label_encoder'].classes_)
+
+
+class ServicioSeguridad:
+    """Mantiene en memoria el ráster de densidad y el modelo, y los recarga si cambian en disco."""
+
+    def __init__(self, ruta_raster, ruta_modelo, ruta_clusters=None, cluster=1, historial=10000):
+        self.ruta_raster = ruta_raster
+        self.ruta_modelo = ruta_modelo
+        # Sin el DBSCAN guardado por 2- densidad.py se usa un clúster fijo, como hacía 3- nuevo alojamiento.py
+        self.ruta_clusters = ruta_clusters
+        self.cluster = cluster
+        self.latencias = deque(maxlen=historial)
+        self.consultas = 0
+        self.recargas = 0
+        self._lock = threading.Lock()
+        self._ultima_revision = 0.0
+        self._mtimes = {}
+        self._cargar()
+
+    def _cargar(self):
+        grilla, raster = cargar_raster(self.ruta_raster)
+        predecir, clases = cargar_modelo(self.ruta_modelo)
+        clusters = cargar_clusters(self.ruta_clusters) if self.ruta_clusters else None
+        # Se reemplaza todo junto para que una consulta nunca mezcle artefactos viejos y nuevos
+        self._estado = (grilla, raster, predecir, clases, clusters)
+        rutas = [r for r in (self.ruta_raster, self.ruta_modelo, self.ruta_clusters) if r]
+        self._mtimes = {ruta: os.path.getmtime(ruta) for ruta in rutas}
+        print(f"Artefactos cargados: {self.ruta_raster}, {self.ruta_modelo}")
+
+    def revisar_recarga(self):
+        """Recarga los artefactos si su fecha de modificación cambió (como mucho una vez por segundo)."""
+        ahora = time.monotonic()
+        if ahora - self._ultima_revision < INTERVALO_RECARGA:
+            return False
+        with self._lock:
+            self._ultima_revision = ahora
+            try:
+                cambiados = [r for r, m in self._mtimes.items() if os.path.getmtime(r) != m]
+            except OSError:
+                # Un artefacto se está reescribiendo: se sigue con la versión en memoria
+                return False
+            if not cambiados:
+                return False
+            try:
+                self._cargar()
+            except Exception as e:
+                print(f"No se pudieron recargar los artefactos ({e}); se mantiene la versión anterior")
+                return False
+            self.recargas += 1
+            return True
+
+    def puntuar(self, latitudes, longitudes):
+        """Categoría, probabilidades y densidad para arrays de coordenadas."""
+        inicio = time.perf_counter()
+        self.revisar_recarga()
+        grilla, raster, predecir, clases, clusters = self._estado
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        densidad = densidad_en_puntos(grilla, raster, lat, lon)
+        if clusters is not None:
+            cluster = asignar_clusters(clusters, lat, lon)
+        else:
+            cluster = np.full(len(lat), self.cluster)
+        X = np.column_stack([lat, lon, densidad, cluster])
+        probabilidades = np.asarray(predecir(X))
+        resultado = [
+            {
+                'latitud': float(la),
+                'longitud': float(lo),
+                'densidad': float(d),
+                'cluster': int(c),
+                'categoria': clases[int(np.argmax(p))],
+                'probabilidades': {clase: float(v) for clase, v in zip(clases, p)},
+            }
+            for la, lo, d, c, p in zip(lat, lon, densidad, cluster, probabilidades)
+        ]
+        latencia = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            self.latencias.append(latencia)
+            self.consultas += 1
+        return resultado, latencia
+
+    def metricas(self):
+        """Cantidad de consultas, recargas y percentiles de latencia (ms) de las últimas consultas."""
+        with self._lock:
+            latencias = np.array(self.latencias)
+        metricas = {'consultas': self.consultas, 'recargas': self.recargas}
+        if len(latencias):
+            metricas.update({
+                'latencia_media_ms': float(latencias.mean()),
+                'latencia_p50_ms': float(np.percentile(latencias, 50)),
+                'latencia_p95_ms': float(np.percentile(latencias, 95)),
+                'latencia_p99_ms': float(np.percentile(latencias, 99)),
+                'latencia_max_ms': float(latencias.max()),
+            })
+        return metricas
+
+    def responder(self, consulta):
+        """Atiende una consulta JSON: {"latitud", "longitud"} o {"puntos": [[lat, lon], ...]}."""
+        if not isinstance(consulta, dict):
+            raise TypeError(f"La consulta tiene que ser un objeto JSON, no {type(consulta).__name__}")
+        if 'puntos' in consulta:
+            puntos = np.asarray(consulta['puntos'], dtype=np.float64).reshape(-1, 2)
+            resultado, latencia = self.puntuar(puntos[:, 0], puntos[:, 1])
+            return {'resultados': resultado, 'latencia_ms': latencia}
+        resultado, latencia = self.puntuar([consulta['latitud']], [consulta['longitud']])
+        return {**resultado[0], 'latencia_ms': latencia}
+
+
+def atender_stdin(servicio, entrada, salida):
+    """Modo worker: una consulta JSON por línea en la entrada, una respuesta JSON por línea en la salida."""
+    for linea in entrada:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            consulta = json.loads(linea)
+            if isinstance(consulta, dict) and consulta.get('metricas'):
+                respuesta = servicio.metricas()
+            else:
+                respuesta = servicio.responder(consulta)
+        except (ValueError, KeyError, TypeError) as e:
+            respuesta = {'error': str(e)}
+        salida.write(json.dumps(respuesta, ensure_ascii=False) + '\n')
+        salida.flush()
+
+
+def crear_servidor_http(servicio, host='127.0.0.1', puerto=8000):
+    """Servidor HTTP local: POST /puntuar con la consulta JSON y GET /metricas."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Manejador(BaseHTTPRequestHandler):
+        def _enviar(self, codigo, cuerpo):
+            datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_GET(self):
+            if self.path == '/metricas':
+                self._enviar(200, servicio.metricas())
+            else:
+                self._enviar(404, {'error': f"Ruta desconocida: {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/puntuar':
+                self._enviar(404, {'error': f"Ruta desconocida: {self.path}"})
+                return
+            try:
+                largo = int(self.headers.get('Content-Length', 0))
+                consulta = json.loads(self.rfile.read(largo) or b'{}')
+                self._enviar(200, servicio.responder(consulta))
+            except (ValueError, KeyError, TypeError) as e:
+                self._enviar(400, {'error': str(e)})
+
+        def log_message(self, formato, *args):
+            # Sin un print por consulta: la latencia se consulta en /metricas
+            pass
+
+    return ThreadingHTTPServer((host, puerto), Manejador)
@@ -1,65 +1,89 @@
 # Análisis Exploratorio de Datos (EDA) con Folium
-import pandas as pd
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import folium
 from folium.plugins import HeatMap
-import os
+from pipeline.carga import cargar_delitos
+from pipeline.coordenadas import LAT_MIN, LAT_MAX, LON_MIN, LON_MAX
+from pipeline.mapas import puntos_calor_agregados
+from pipeline.metricas import etapa
 
-# Crear la carpeta "EDA" si no existe
+# Carpeta de salida de los mapas
 output_dir = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/EDA'
-os.makedirs(output_dir, exist_ok=True)
 
-# Cargar el archivo consolidado de delitos
-delitos_total = pd.read_csv('C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv')
+# Consolidado de delitos (almacén particionado por anio y tipo, ya filtrado a coordenadas válidas)
+delitos_path = 'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/dataset/delitos_total.csv'
 
-# Filtrar datos con coordenadas válidas
-delitos_total['latitud'] = pd.to_numeric(delitos_total['latitud'], errors='coerce')
-delitos_total['longitud'] = pd.to_numeric(delitos_total['longitud'], errors='coerce')
-delitos_total = delitos_total.dropna(subset=['latitud', 'longitud'])
-delitos_total = delitos_total[(delitos_total['latitud'] != 0) & (delitos_total['longitud'] != 0)]
 
-# Obtener los tipos de delitos únicos
-tipos_delitos = delitos_total['tipo'].unique()
+def generar_mapa(output_path, heat_data):
+    """Crea y guarda un mapa de calor (se ejecuta en un proceso del pool)."""
+    # Crear el mapa base
+    mapa_delitos = folium.Map(location=[-34.6083, -58.3712], zoom_start=12)
 
-# Generar un mapa de calor para cada tipo de delito
-for tipo in tipos_delitos:
-    print(f"Generando mapa de calor para el delito: {tipo}")
+    # Añadir el mapa de calor sin gradiente personalizado
+    HeatMap(heat_data, radius=8, blur=15, max_zoom=12).add_to(mapa_delitos)
 
-    # Filtrar el dataset por el tipo de delito
-    df_tipo = delitos_total[delitos_total['tipo'] == tipo]
+    # Guardar el mapa
+    mapa_delitos.save(output_path)
+    return output_path
 
-    # Verificar si hay datos suficientes para generar el mapa
-    if df_tipo.empty:
-        print(f"No hay datos para el tipo de delito: {tipo}")
-        continue
 
-    # Crear el mapa base
-    mapa_delitos = folium.Map(location=[-34.6083, -58.3712], zoom_start=12)
+def nombre_mapa(clave):
+    """mapa_delitos_{tipo}.html, o mapa_delitos_{tipo}_{anio}... con claves adicionales."""
+    valores = clave if isinstance(clave, tuple) else (clave,)
+    return 'mapa_delitos_' + '_'.join(str(v) for v in valores) + '.html'
 
-    # Crear la lista de coordenadas para el mapa de calor
-    heat_data = []
-    for _, row in df_tipo.iterrows():
-        try:
-            lat = float(row['latitud'])
-            lon = float(row['longitud'])
-            if not (lat >= -34.7 and lat <= -34.5 and lon >= -58.6 and lon <= -58.3):
-                continue
-            heat_data.append([lat, lon])
-        except (ValueError, TypeError):
-            continue
 
-    print(f"Cantidad de puntos en el mapa de calor ({tipo}): {len(heat_data)}")
+# El bloque principal es necesario para usar el pool de procesos en Windows
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mapas de calor por tipo de delito")
+    parser.add_argument('--claves', nargs='*', default=[],
+                        help="Columnas adicionales para agrupar además de tipo (por ejemplo: anio franja)")
+    parser.add_argument('--procesos', type=int, default=None, help="Cantidad de procesos para generar los mapas")
+    parser.add_argument('--puntos-crudos', action='store_true',
+                        help="Incrustar cada delito en el mapa en lugar de un punto ponderado por celda")
+    args = parser.parse_args()
 
-    # Verificar si la lista de puntos está vacía
-    if len(heat_data) == 0:
-        print(f"No hay puntos válidos para el mapa de calor del tipo de delito: {tipo}")
-        continue
+    # Crear la carpeta "EDA" si no existe
+    os.makedirs(output_dir, exist_ok=True)
+    claves = ['tipo'] + [c for c in args.claves if c != 'tipo']
 
-    # Añadir el mapa de calor sin gradiente personalizado
-    HeatMap(heat_data, radius=8, blur=15, max_zoom=12).add_to(mapa_delitos)
+    # Cargar una sola vez las columnas necesarias
+    with etapa('carga_delitos') as registro:
+        delitos_total = cargar_delitos(delitos_path, columnas=claves + ['latitud', 'longitud'])
+        registro['filas_salida'] = len(delitos_total)
 
-    # Guardar el mapa con el nombre del tipo de delito
-    output_path = f'C:/Users/digni/OneDrive/Documents/GitHub/Tesis/EDA/mapa_delitos_{tipo}.html'
-    mapa_delitos.save(output_path)
-    print(f"Mapa de calor guardado como {output_path}")
+    # Filtrar el rango válido para CABA de forma vectorizada
+    lat = delitos_total['latitud'].to_numpy(dtype=np.float64)
+    lon = delitos_total['longitud'].to_numpy(dtype=np.float64)
+    validos = (lat >= LAT_MIN) & (lat <= LAT_MAX) & (lon >= LON_MIN) & (lon <= LON_MAX)
+    delitos_total = delitos_total[validos]
+    coordenadas = np.column_stack([lat[validos], lon[validos]])
+
+    # Separar los datos en una sola pasada: posiciones de cada grupo (tipo y claves adicionales)
+    grupos = delitos_total.groupby(claves if len(claves) > 1 else claves[0], observed=True).indices
+
+    with etapa('mapas_por_grupo', len(delitos_total)) as registro, ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        futuros = []
+        for clave, posiciones in grupos.items():
+            if len(posiciones) == 0:
+                print(f"No hay puntos válidos para el mapa de calor: {clave}")
+                continue
+            if args.puntos_crudos:
+                # Lista de coordenadas construida directamente desde el array
+                heat_data = coordenadas[posiciones].tolist()
+            else:
+                # Un punto ponderado por celda no vacía: todos los registros, mucho menos HTML
+                heat_data = puntos_calor_agregados(coordenadas[posiciones, 0], coordenadas[posiciones, 1])
+            print(f"Cantidad de puntos en el mapa de calor ({clave}): {len(heat_data)}")
+            output_path = os.path.join(output_dir, nombre_mapa(clave))
+            futuros.append(pool.submit(generar_mapa, output_path, heat_data))
+
+        for futuro in futuros:
+            print(f"Mapa de calor guardado como {futuro.result()}")
+        registro['filas_salida'] = len(futuros)
 
-print("Mapas de calor generados para todos los tipos de delitos.")
+    print(f"Mapas de calor generados para {len(futuros)} grupos ({' x '.join(claves)}).")
@@ -0,0 +1,78 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from pipeline.compilado import cargar_compilado, compilar_modelo, guardar_compilado, paridad, predecir
+
+
+def _alojamientos(n=3000, semilla=0):
+    # Features sin escalar con la forma de las del entrenamiento (latitud, longitud, densidad, cluster)
+    rng = np.random.default_rng(semilla)
+    X = pd.DataFrame({
+        'latitud': rng.uniform(-34.70, -34.53, n),
+        'longitud': rng.uniform(-58.53, -58.35, n),
+        'densidad': rng.gamma(2.0, 50.0, n),
+        'cluster': rng.integers(-1, 20, n).astype(np.float64),
+    })
+    cortes = np.quantile(X['densidad'], [0.25, 0.5, 0.75])
+    seguridad = np.array(['Muy Seguro', 'Seguro', 'Moderado', 'Riesgoso'])[np.searchsorted(cortes, X['densidad'])]
+    return X, seguridad
+
+
+@pytest.mark.parametrize('modelo', [
+    RandomForestClassifier(n_estimators=30, random_state=0),
+    MLPClassifier(hidden_layer_sizes=(20, 10), max_iter=300, random_state=0),
+    GaussianNB(),
+], ids=lambda m: type(m).__name__)
+def test_paridad_con_sklearn(modelo, tmp_path):
+    X, seguridad = _alojamientos()
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(seguridad)
+    scaler = StandardScaler().fit(X)
+    with warnings.catch_warnings():
+        # A la red le alcanza con pocas iteraciones para la prueba
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        modelo.fit(scaler.transform(X), y)
+    paquete = {'modelo': modelo, 'scaler': scaler, 'label_encoder': label_encoder, 'features': list(X.columns)}
+
+    ruta = tmp_path / 'modelo.npz'
+    guardar_compilado(ruta, compilar_modelo(paquete))
+    compilado = cargar_compilado(ruta)
+
+    # Filas de entrenamiento (muchas caen justo en los umbrales de los árboles) y filas nuevas
+    for filas in (X, _alojamientos(semilla=1)[0]):
+        correcto, distintas, diferencia = paridad(paquete, compilado, filas)
+        assert correcto, (distintas, diferencia)
+    esperado = label_encoder.inverse_transform(modelo.predict(scaler.transform(X)))
+    assert (predecir(compilado, X.to_numpy()) == esperado).all()
+
+
+def test_bosque_en_los_umbrales():
+    # Filas con una feature justo en un umbral (llevado a la escala original): sklearn decide con
+    # X escalado en float32, y el compilado tiene que tomar la misma rama
+    X, seguridad = _alojamientos()
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(seguridad)
+    scaler = StandardScaler().fit(X)
+    modelo = RandomForestClassifier(n_estimators=30, random_state=0).fit(scaler.transform(X), y)
+    paquete = {'modelo': modelo, 'scaler': scaler, 'label_encoder': label_encoder, 'features': list(X.columns)}
+
+    filas = []
+    for arbol in modelo.estimators_:
+        t = arbol.tree_
+        internos = t.children_left >= 0
+        for feature, umbral in zip(t.feature[internos], t.threshold[internos]):
+            fila = X.iloc[len(filas) % len(X)].to_numpy(copy=True)
+            fila[feature] = umbral * scaler.scale_[feature] + scaler.mean_[feature]
+            filas.append(fila)
+    filas = pd.DataFrame(filas, columns=X.columns)
+
+    correcto, distintas, diferencia = paridad(paquete, compilar_modelo(paquete), filas)
+    assert correcto, (distintas, diferencia)
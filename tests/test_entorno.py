@@ -0,0 +1,18 @@
+import numpy as np
+
+from pipeline.entorno import RADIO_TIERRA_M, features_entorno, indexar_capas, nombres_features
+
+
+def test_features_entorno_distancias_y_conteos():
+    # Dos cajeros a ~111 m y ~333 m (0.001 y 0.003 grados de latitud) del primer punto
+    capas = {'cajeros': np.array([[-34.601, -58.40], [-34.603, -58.40]])}
+    indices = indexar_capas(capas)
+    features = features_entorno(indices, [-34.600, np.nan], [-58.40, -58.40], radios=(250, 500))
+
+    assert list(features.columns) == nombres_features(indices, (250, 500))
+    metros_por_grado = np.pi * RADIO_TIERRA_M / 180
+    assert np.isclose(features.loc[0, 'dist_cajeros_m'], 0.001 * metros_por_grado)
+    assert features.loc[0, 'n_cajeros_250m'] == 1
+    assert features.loc[0, 'n_cajeros_500m'] == 2
+    # Sin coordenadas: NaN en todas las columnas
+    assert features.loc[1].isna().all()